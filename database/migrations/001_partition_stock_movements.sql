@@ -0,0 +1,150 @@
+-- Migrasi 001: Partisi bulanan (RANGE pada movement_date) untuk stock_movements
+-- Dialek: PostgreSQL 12+
+--
+-- Sebelum: satu heap dengan 4 index B-tree (product_id, warehouse_id,
+-- movement_date, reference). Setiap INSERT memelihara semuanya dan scan
+-- rentang tanggal (ekstraksi incremental, trend) mengenai seluruh tabel.
+--
+-- Sesudah:
+--   * stock_movements = tabel induk ter-partisi per bulan
+--     (stock_movements_pYYYY_MM) + partisi DEFAULT untuk tanggal di luar
+--     rentang yang sudah dibuat (misal data DQ 'future_date').
+--   * Index tanggal memakai BRIN (sangat kecil, murah dipelihara; dalam satu
+--     partisi bulanan data hampir terurut waktu). Query dengan filter
+--     movement_date dipangkas (partition pruning) ke partisi yang relevan.
+--   * Index B-tree warehouse_id dihapus (hanya ~10 nilai, tidak selektif).
+--     product_id & reference tetap B-tree untuk lookup per produk / per dokumen.
+--   * Primary key menjadi (movement_id, movement_date) karena PK di tabel
+--     ter-partisi wajib memuat kolom partisi. movement_id tetap unik karena
+--     berasal dari sequence yang sama.
+--
+-- Partisi baru dibuat dengan create_stock_movement_partitions(); jadwalkan
+-- (cron / orchestrator) minimal sebulan sekali, misal:
+--   SELECT create_stock_movement_partitions();  -- bulan ini + 3 bulan ke depan
+--
+-- Jalankan SETELAH schema.sql (dan data load), sebelum functions.sql / triggers.sql
+-- atau sesudahnya (fungsi & trigger tidak bergantung pada struktur fisik tabel).
+-- Seluruh migrasi berjalan dalam satu transaksi.
+
+BEGIN;
+
+-- ###############################################################
+-- 1. Fungsi pembuat partisi bulanan
+-- ###############################################################
+-- Membuat partisi untuk setiap bulan dari p_from_month sampai bulan
+-- (CURRENT_DATE + p_months_ahead). Partisi yang sudah ada dilewati.
+-- Baris yang sudah terlanjur masuk partisi DEFAULT untuk bulan tersebut
+-- dipindahkan dulu, karena ATTACH PARTITION gagal jika DEFAULT berisi
+-- baris dalam rentang partisi baru.
+-- Mengembalikan jumlah partisi yang dibuat.
+CREATE OR REPLACE FUNCTION create_stock_movement_partitions(
+    p_from_month DATE DEFAULT CURRENT_DATE,
+    p_months_ahead INT DEFAULT 3
+)
+RETURNS INT AS $$
+DECLARE
+    v_month DATE := date_trunc('month', p_from_month)::DATE;
+    v_last_month DATE := date_trunc('month', CURRENT_DATE + make_interval(months => p_months_ahead))::DATE;
+    v_partition TEXT;
+    v_created INT := 0;
+BEGIN
+    WHILE v_month <= v_last_month LOOP
+        v_partition := format('stock_movements_p%s', to_char(v_month, 'YYYY_MM'));
+
+        IF to_regclass(v_partition) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE stock_movements INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                v_partition
+            );
+
+            -- Pindahkan baris bulan ini dari partisi DEFAULT (jika ada)
+            IF to_regclass('stock_movements_default') IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (
+                         DELETE FROM stock_movements_default
+                         WHERE movement_date >= %L AND movement_date < %L
+                         RETURNING *
+                     )
+                     INSERT INTO %I SELECT * FROM moved',
+                    v_month, (v_month + INTERVAL '1 month')::DATE, v_partition
+                );
+            END IF;
+
+            -- Index partisi dibuat otomatis dari index tabel induk saat ATTACH
+            EXECUTE format(
+                'ALTER TABLE stock_movements ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                v_partition, v_month, (v_month + INTERVAL '1 month')::DATE
+            );
+            v_created := v_created + 1;
+        END IF;
+
+        v_month := (v_month + INTERVAL '1 month')::DATE;
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ###############################################################
+-- 2. Tabel lama disimpan sementara, sequence dilepas darinya
+-- ###############################################################
+ALTER TABLE stock_movements RENAME TO stock_movements_unpartitioned;
+ALTER SEQUENCE stock_movements_movement_id_seq OWNED BY NONE;
+
+DROP INDEX IF EXISTS idx_movements_product_id;
+DROP INDEX IF EXISTS idx_movements_warehouse_id;
+DROP INDEX IF EXISTS idx_movements_movement_date;
+DROP INDEX IF EXISTS idx_movements_reference;
+
+
+-- ###############################################################
+-- 3. Tabel induk ter-partisi (kolom sama dengan schema.sql)
+-- ###############################################################
+CREATE TABLE stock_movements (
+  movement_id BIGINT NOT NULL DEFAULT nextval('stock_movements_movement_id_seq'),
+  product_id INT NOT NULL REFERENCES products(product_id),
+  warehouse_id INT NOT NULL REFERENCES warehouses(warehouse_id),
+  movement_type movement_type NOT NULL,
+  quantity INT NOT NULL, -- Kuantitas pergerakan (bisa positif/negatif)
+  reference_type reference_type, -- Jenis referensi (PO, SO, dll)
+  reference_id INT, -- ID dari PO, SO, dll.
+  movement_date TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  notes TEXT,
+
+  CONSTRAINT check_quantity CHECK (quantity != 0)
+) PARTITION BY RANGE (movement_date);
+
+ALTER SEQUENCE stock_movements_movement_id_seq OWNED BY stock_movements.movement_id;
+
+CREATE TABLE stock_movements_default PARTITION OF stock_movements DEFAULT;
+
+
+-- ###############################################################
+-- 4. Partisi untuk rentang data yang ada + bulan-bulan mendatang,
+--    lalu salin data (urut tanggal agar BRIN efektif)
+-- ###############################################################
+SELECT create_stock_movement_partitions(
+    COALESCE((SELECT MIN(movement_date) FROM stock_movements_unpartitioned)::DATE, CURRENT_DATE)
+) AS partitions_created;
+
+INSERT INTO stock_movements
+SELECT * FROM stock_movements_unpartitioned
+ORDER BY movement_date;
+
+DROP TABLE stock_movements_unpartitioned;
+
+
+-- ###############################################################
+-- 5. Primary key & index dibuat SETELAH data disalin (build sekali,
+--    lebih cepat dan lebih ringkas daripada dipelihara per baris).
+--    Diwariskan ke setiap partisi, termasuk partisi yang dibuat nanti.
+-- ###############################################################
+ALTER TABLE stock_movements ADD PRIMARY KEY (movement_id, movement_date);
+CREATE INDEX idx_movements_product_id ON stock_movements(product_id);
+CREATE INDEX idx_movements_movement_date ON stock_movements USING BRIN (movement_date) WITH (pages_per_range = 32);
+CREATE INDEX idx_movements_reference ON stock_movements(reference_type, reference_id);
+
+COMMIT;
+
+ANALYZE stock_movements;
@@ -0,0 +1,33 @@
+-- Migrasi 002: Covering index (product_id, warehouse_id, movement_date DESC)
+-- untuk stock_movements
+-- Dialek: PostgreSQL 12+
+--
+-- Dipakai find_dead_stock() (database_function/functions.sql Task 3.8):
+-- "apakah (produk, gudang) ini bergerak setelah tanggal X" dan "kapan
+-- pergerakan terakhirnya" dijawab dengan index-only scan (satu descent
+-- B-tree per baris 'stock', per partisi jika tabel ter-partisi), tanpa
+-- membaca heap stock_movements dan tanpa mengagregasi seluruh histori.
+--
+-- idx_movements_product_id dihapus: kolom product_id adalah prefix index baru,
+-- sehingga lookup per produk tetap memakai index ini, dan setiap INSERT cukup
+-- memelihara satu index B-tree produk, bukan dua.
+--
+-- Berlaku untuk tabel biasa maupun ter-partisi; jika migrasi 001 dipakai,
+-- jalankan SETELAH-nya (001 membuat ulang tabel beserta index-nya). Pada tabel
+-- ter-partisi index dibuat di setiap partisi (dan otomatis di partisi yang
+-- dibuat nanti). Pada tabel biasa, ganti dengan CREATE INDEX CONCURRENTLY di
+-- luar transaksi jika tabel tidak boleh terkunci selama build.
+--
+-- Index-only scan hanya efektif jika visibility map terisi: jalankan VACUUM
+-- (atau andalkan autovacuum) setelah load data besar.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_movements_product_warehouse_date
+    ON stock_movements (product_id, warehouse_id, movement_date DESC);
+
+DROP INDEX IF EXISTS idx_movements_product_id;
+
+COMMIT;
+
+VACUUM ANALYZE stock_movements;
@@ -0,0 +1,40 @@
+-- Migrasi 003: Tabel metrik per tahap pipeline ETL (etl_run_metrics)
+-- Dialek: PostgreSQL 12+
+--
+-- Diisi oleh etl_pipeline/instrumentation.py di akhir setiap run (append):
+-- satu baris per span (tahap, sub-tahap, penulisan file, render chart,
+-- panggilan narasi). span_id unik dalam satu run; parent_id menunjuk span
+-- induknya (NULL untuk span 'pipeline'). Jika tabel belum ada, pandas
+-- membuatnya sendiri dengan tipe generik (details TEXT, tanpa primary key);
+-- jalankan migrasi ini sebelum run pertama.
+--
+-- Contoh: durasi TRANSFORM per hari
+--   SELECT started_at::date, avg(wall_seconds)
+--   FROM etl_run_metrics WHERE span = 'transform' GROUP BY 1 ORDER BY 1;
+-- Throughput ekstraksi per run
+--   SELECT run_id, rows_per_second FROM etl_run_metrics WHERE span = 'extract.data_quality';
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS etl_run_metrics (
+    run_id          TEXT NOT NULL,
+    span_id         INT NOT NULL,
+    parent_id       INT,
+    span            TEXT NOT NULL,
+    started_at      TIMESTAMPTZ NOT NULL,
+    wall_seconds    DOUBLE PRECISION NOT NULL,
+    cpu_seconds     DOUBLE PRECISION NOT NULL,
+    rows_in         BIGINT,
+    rows_out        BIGINT,
+    rows_per_second DOUBLE PRECISION,
+    peak_rss_mb     DOUBLE PRECISION,
+    status          TEXT NOT NULL CHECK (status IN ('ok', 'error')),
+    details         JSONB,
+    PRIMARY KEY (run_id, span_id)
+);
+
+-- Riwayat satu tahap lintas run ("berapa lama TRANSFORM Selasa lalu")
+CREATE INDEX IF NOT EXISTS idx_etl_run_metrics_span_started
+    ON etl_run_metrics (span, started_at);
+
+COMMIT;
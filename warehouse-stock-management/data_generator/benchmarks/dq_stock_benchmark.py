@@ -0,0 +1,170 @@
+"""
+Benchmark injeksi isu data quality & snapshot 'stock': implementasi lama (loop
+`df.loc` per baris dan `stock.apply` per baris) vs versi berbasis array.
+
+Untuk setiap ukuran, stock_movements di-generate sekali lalu kedua implementasi
+dijalankan pada salinan yang sama. Selain waktu, dicek juga bahwa semantiknya sama:
+  - jumlah baris bermasalah = dq_issue_percent * n, dibagi rata ke tiga jenis isu;
+  - 'invalid_qty' hanya mengenai baris IN/RETURN, 'future_date' 30-365 hari ke depan;
+  - snapshot 'stock' berisi semua produk x gudang dengan reorder_point 10-50 dan
+    5 <= safety_stock <= reorder_point.
+
+Implementasi lama (`legacy_*`) disalin di sini sebagai pembanding.
+Hasil disimpan di `benchmarks/results/dq_stock_benchmark.json`.
+
+Cara pakai (dari direktori data_generator/):
+    python benchmarks/dq_stock_benchmark.py --sizes 100000 500000 2000000
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+GENERATOR_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(GENERATOR_DIR))
+
+import numpy as np
+import pandas as pd
+import generate_data as gen
+
+RESULTS_PATH = Path(__file__).resolve().parent / 'results' / 'dq_stock_benchmark.json'
+
+
+def legacy_inject_dq_issues(df_movements, settings):
+    """Implementasi lama: satu `df.loc` per baris bermasalah."""
+    n_issues = int(len(df_movements) * settings['dq_issue_percent'])
+    issue_indices = df_movements.sample(n=n_issues).index
+    dq_issue_types = ['bad_reference_id', 'invalid_qty', 'future_date']
+    for idx in issue_indices:
+        issue_type = random.choice(dq_issue_types)
+        if issue_type == 'bad_reference_id':
+            df_movements.loc[idx, 'reference_id'] = 9999999
+        elif issue_type == 'invalid_qty':
+            if df_movements.loc[idx, 'movement_type'] in ['IN', 'RETURN']:
+                df_movements.loc[idx, 'quantity'] = -abs(df_movements.loc[idx, 'quantity'])
+        elif issue_type == 'future_date':
+            df_movements.loc[idx, 'movement_date'] = datetime.now() + timedelta(days=random.randint(30, 365))
+    return df_movements
+
+
+def legacy_build_current_stock(stock_quantities, master_data):
+    """Implementasi lama: reorder_point/safety_stock dengan `apply` per baris."""
+    stock = stock_quantities.reset_index().rename(columns={'quantity': 'quantity_on_hand'})
+    stock = stock[stock['quantity_on_hand'] != 0]
+    stock['reorder_point'] = stock.apply(lambda _: random.randint(10, 50), axis=1)
+    stock['safety_stock'] = stock.apply(lambda row: random.randint(5, int(row['reorder_point'])), axis=1)
+    stock.loc[stock['quantity_on_hand'] <= stock['reorder_point'], 'quantity_on_hand'] = \
+        stock['reorder_point'] + random.randint(-5, 5)
+    stock['product_id'] = stock['product_id'].astype(int)
+    all_combinations = pd.MultiIndex.from_product([
+        master_data['products']['product_id'],
+        master_data['warehouses']['warehouse_id']
+    ], names=['product_id', 'warehouse_id']).to_frame(index=False)
+    df_stock = pd.merge(all_combinations, stock, on=['product_id', 'warehouse_id'], how='left')
+    df_stock = df_stock.fillna({'quantity_on_hand': 0, 'reorder_point': 10, 'safety_stock': 5})
+    int_cols = ['quantity_on_hand', 'reorder_point', 'safety_stock']
+    df_stock[int_cols] = df_stock[int_cols].astype(int)
+    return df_stock
+
+
+def check_dq_issues(before, after, settings):
+    """Verifikasi semantik injeksi DQ; mengembalikan jumlah baris yang berubah per isu."""
+    reference_date = pd.Timestamp(settings.get('reference_date') or date.today())
+    bad_reference = (after['reference_id'] == 9999999) & (before['reference_id'] != 9999999)
+    negated = (after['quantity'] != before['quantity']).to_numpy()
+    moved = (after['movement_date'] != before['movement_date']).to_numpy()
+
+    assert before.loc[negated, 'movement_type'].isin(['IN', 'RETURN']).all()
+    assert (after.loc[negated, 'quantity'] == -before.loc[negated, 'quantity']).all()
+    # Implementasi lama memakai datetime.now(); yang baru reference_date (tengah malam)
+    days_ahead = (after.loc[moved, 'movement_date'] - reference_date).dt.days
+    assert days_ahead.between(30, 366).all()
+    return {
+        'bad_reference_id': int(bad_reference.sum()),
+        'invalid_qty': int(negated.sum()),
+        'future_date': int(moved.sum()),
+    }
+
+
+def check_stock(df_stock, master_data):
+    """Verifikasi snapshot stok: semua kombinasi ada dan nilai dalam rentang."""
+    assert len(df_stock) == len(master_data['products']) * len(master_data['warehouses'])
+    has_stock = df_stock['quantity_on_hand'] != 0
+    assert df_stock.loc[has_stock, 'reorder_point'].between(10, 50).all()
+    assert (df_stock['safety_stock'] >= 5).all()
+    assert (df_stock['safety_stock'] <= df_stock['reorder_point']).all()
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def run_size(config, master_data, hot_product_ids, size, seed, legacy_max):
+    config = {**config, 'volumes': {**config['volumes'], 'stock_movements': size}}
+    settings = config['settings']
+    rng = np.random.default_rng(seed)
+    event_type = gen.draw_movement_types(size, rng)
+    df_base = gen.build_stock_movements(master_data, hot_product_ids, settings, event_type,
+                                        config['volumes']['purchase_orders'],
+                                        config['volumes']['sales_orders'], rng)
+    result = {'movements': len(df_base)}
+
+    df_new, result['dq_vectorized'] = timed(gen.inject_movement_dq_issues, df_base.copy(), settings, rng)
+    result['dq_issue_rows_vectorized'] = check_dq_issues(df_base, df_new, settings)
+    quantities = gen.summarize_stock_quantities(df_new)
+    df_stock, result['stock_vectorized'] = timed(gen.build_current_stock, quantities, master_data, rng)
+    check_stock(df_stock, master_data)
+
+    if len(df_base) <= legacy_max:
+        random.seed(seed)
+        df_old, result['dq_legacy'] = timed(legacy_inject_dq_issues, df_base.copy(), settings)
+        result['dq_issue_rows_legacy'] = check_dq_issues(df_base, df_old, settings)
+        df_stock_old, result['stock_legacy'] = timed(legacy_build_current_stock, quantities, master_data)
+        check_stock(df_stock_old, master_data)
+        result['dq_speedup'] = round(result['dq_legacy'] / max(result['dq_vectorized'], 1e-3), 1)
+        result['stock_speedup'] = round(result['stock_legacy'] / max(result['stock_vectorized'], 1e-3), 1)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark injeksi DQ & snapshot stok: loop vs array.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 500_000, 2_000_000],
+                        help="Jumlah kejadian stock_movements per percobaan.")
+    parser.add_argument('--legacy-max', type=int, default=1_500_000,
+                        help="Lewati implementasi lama di atas jumlah baris ini (terlalu lambat).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-save', action='store_true', help="Jangan tulis file hasil.")
+    args = parser.parse_args()
+
+    config = gen.load_config(GENERATOR_DIR / 'config.yaml')
+    gen.seed_everything(np.random.SeedSequence(args.seed))
+    master_data, hot_product_ids = gen.generate_master_data(config)
+
+    results = {}
+    for size in args.sizes:
+        print(f"\nBenchmarking {size} movement events...")
+        results[str(size)] = run_size(config, master_data, hot_product_ids, size, args.seed, args.legacy_max)
+
+    print(f"\n{'movements':>10} {'dq legacy':>10} {'dq array':>10} {'stock legacy':>13} {'stock array':>12}")
+    for entry in results.values():
+        print(f"{entry['movements']:>10} {entry.get('dq_legacy', '-'):>10} {entry['dq_vectorized']:>10} "
+              f"{entry.get('stock_legacy', '-'):>13} {entry['stock_vectorized']:>12}")
+
+    if not args.no_save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps({
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'products': len(master_data['products']),
+            'warehouses': len(master_data['warehouses']),
+            'dq_issue_percent': config['settings']['dq_issue_percent'],
+            'results': results,
+        }, indent=2) + '\n', encoding='utf-8')
+        print(f"Results saved to {RESULTS_PATH}")
@@ -1,3 +1,5 @@
+import argparse
+import json
 import pandas as pd
 import numpy as np
 import yaml
@@ -10,6 +12,64 @@ from datetime import datetime, timedelta, date
 # Inisialisasi Faker untuk data Indonesia
 fake = Faker('id_ID')
 
+# Bobot untuk musiman (1-12)
+# Bobot lebih tinggi untuk Juni(6), Juli(7), Nov(11), Des(12)
+MONTH_WEIGHTS = np.array([1.0, 1.0, 1.0, 1.0, 1.5, 2.0, 1.5, 1.0, 1.0, 1.0, 1.5, 2.5])
+
+# Distribusi tipe pergerakan stok
+MOVEMENT_TYPES = np.array(['IN', 'OUT', 'TRANSFER', 'ADJUSTMENT', 'RETURN'])
+MOVEMENT_TYPE_WEIGHTS = [0.35, 0.45, 0.1, 0.05, 0.05]
+
+# Jenis isu data quality yang disisipkan ke stock_movements
+DQ_ISSUE_TYPES = np.array(['bad_reference_id', 'invalid_qty', 'future_date'])
+
+# Distribusi status PO & SO
+ORDER_STATUSES = np.array(['PENDING', 'PROCESSING', 'SHIPPED', 'COMPLETED', 'CANCELLED'])
+ORDER_STATUS_WEIGHTS = [0.1, 0.1, 0.1, 0.6, 0.1]
+
+# Jumlah teks acak untuk kolom 'notes' (diambil ulang secara acak)
+NOTES_POOL_SIZE = 1000
+
+# Jumlah pasangan nama + alamat pelanggan unik untuk Sales Orders
+CUSTOMER_POOL_SIZE = 5000
+
+# Urutan load tabel (mengikuti foreign key)
+TABLE_ORDER = [
+    'categories', 
+    'suppliers', 
+    'warehouses', 
+    'products',
+    'purchase_orders', 
+    'purchase_order_details',
+    'sales_orders', 
+    'sales_order_details',
+    'stock', 
+    'stock_movements'
+]
+
+# Sequence SERIAL yang perlu disetel ulang setelah data load: (sequence, tabel, kolom)
+SEQUENCES = [
+    ('categories_category_id_seq', 'categories', 'category_id'),
+    ('suppliers_supplier_id_seq', 'suppliers', 'supplier_id'),
+    ('warehouses_warehouse_id_seq', 'warehouses', 'warehouse_id'),
+    ('products_product_id_seq', 'products', 'product_id'),
+    ('purchase_orders_po_id_seq', 'purchase_orders', 'po_id'),
+    ('purchase_order_details_po_detail_id_seq', 'purchase_order_details', 'po_detail_id'),
+    ('sales_orders_so_id_seq', 'sales_orders', 'so_id'),
+    ('sales_order_details_so_detail_id_seq', 'sales_order_details', 'so_detail_id'),
+    ('stock_movements_movement_id_seq', 'stock_movements', 'movement_id'),
+]
+
+# Jumlah baris per file part untuk format 'copy' & 'parquet'
+COPY_CHUNK_ROWS = 1_000_000
+
+# Format 'parquet': ukuran row group (unit terkecil yang bisa dilewati saat filter)
+PARQUET_ROW_GROUP_ROWS = 128_000
+# Kolom DATE di database (kolom datetime lain = TIMESTAMPTZ, disimpan sebagai UTC)
+DATE_COLUMNS = {'order_date', 'expected_delivery_date'}
+# Urutan baris di dalam file part agar statistik row group rapat untuk filter tanggal
+PARQUET_SORT_COLUMNS = {'stock_movements': 'movement_date'}
+
 def load_config(config_path='config.yaml'):
     """Memuat file konfigurasi YAML."""
     print(f"Memuat konfigurasi dari {config_path}...")
@@ -18,6 +78,13 @@ def load_config(config_path='config.yaml'):
     print("Konfigurasi berhasil dimuat.")
     return config
 
+def seed_everything(seed_sequence):
+    """Seed `random`, `np.random` global, dan Faker dari sebuah np.random.SeedSequence."""
+    seed = int(seed_sequence.generate_state(1)[0])
+    random.seed(seed)
+    np.random.seed(seed)
+    fake.seed_instance(seed)
+
 def create_output_directory(dir_name):
     """Membuat direktori output jika belum ada."""
     Path(dir_name).mkdir(parents=True, exist_ok=True)
@@ -35,12 +102,8 @@ def get_seasonal_date(start_date, end_date):
     random_day = random.randint(0, total_days)
     date = start + timedelta(days=random_day)
     
-    # Bobot untuk musiman (1-12)
-    # Bobot lebih tinggi untuk Juni(6), Juli(7), Nov(11), Des(12)
-    month_weights = [1.0, 1.0, 1.0, 1.0, 1.5, 2.0, 1.5, 1.0, 1.0, 1.0, 1.5, 2.5]
-    
     # Pilih bulan berdasarkan bobot
-    chosen_month = random.choices(range(1, 13), weights=month_weights, k=1)[0]
+    chosen_month = random.choices(range(1, 13), weights=MONTH_WEIGHTS, k=1)[0]
     
     # Ganti bulan dari tanggal yang di-generate
     try:
@@ -51,6 +114,26 @@ def get_seasonal_date(start_date, end_date):
         
     return date
 
+def get_seasonal_dates(start_date, end_date, size, rng):
+    """
+    Versi vektor dari `get_seasonal_date`: menghasilkan `size` tanggal sekaligus
+    dengan pola musiman yang sama (hari acak, lalu bulan diganti sesuai bobot).
+    """
+    start = np.datetime64(start_date, 'D')
+    total_days = int((np.datetime64(end_date, 'D') - start).astype(int))
+    dates = start + rng.integers(0, total_days + 1, size)
+    
+    chosen_month = rng.choice(np.arange(12), size=size, p=MONTH_WEIGHTS / MONTH_WEIGHTS.sum())
+    year_start = dates.astype('datetime64[Y]').astype('datetime64[M]')
+    month_start = year_start + chosen_month
+    day_of_month = (dates - dates.astype('datetime64[M]').astype('datetime64[D]')).astype(np.int64)
+    
+    # Menangani kasus seperti 31 Februari -> tanggal 1
+    days_in_month = ((month_start + 1).astype('datetime64[D]') - month_start.astype('datetime64[D]')).astype(np.int64)
+    day_of_month = np.where(day_of_month >= days_in_month, 0, day_of_month)
+    
+    return (month_start.astype('datetime64[D]') + day_of_month).astype('datetime64[ns]')
+
 def generate_master_data(config):
     """Menghasilkan data master (Categories, Suppliers, Warehouses, Products)."""
     
@@ -124,104 +207,135 @@ def generate_master_data(config):
         'products': df_products
     }, hot_product_ids
 
-def generate_orders(config, master_data, hot_product_ids):
-    """Menghasilkan Purchase Orders (PO) dan Sales Orders (SO) beserta detailnya."""
+def draw_unique_order_lines(order_ids, draw_combos, max_rounds=10):
+    """
+    Men-draw kode kombinasi (mis. produk atau produk x gudang) untuk setiap baris
+    detail order, lalu me-redraw baris yang duplikat dalam order yang sama sampai
+    unik. Baris yang masih duplikat setelah `max_rounds` dibuang.
+    Mengembalikan (mask baris yang dipakai, kode kombinasi).
+    """
+    codes = draw_combos(len(order_ids))
+    for _ in range(max_rounds):
+        duplicated = pd.DataFrame({'order_id': order_ids, 'code': codes}).duplicated().to_numpy()
+        if not duplicated.any():
+            break
+        codes[duplicated] = draw_combos(int(duplicated.sum()))
+    keep = ~pd.DataFrame({'order_id': order_ids, 'code': codes}).duplicated().to_numpy()
+    return keep, codes
+
+def draw_line_counts(n_orders, avg_per_order, max_lines, rng):
+    """Jumlah baris detail per order (Poisson + 1, minimal 1), dibatasi `max_lines`."""
+    return np.minimum(rng.poisson(avg_per_order - 1, n_orders) + 1, max_lines)
+
+def build_purchase_orders(master_data, settings, num_details, rng, first_po_id=1, first_detail_id=1):
+    """
+    Membuat header PO dan detailnya untuk `len(num_details)` PO berurutan mulai dari
+    `first_po_id`. ID detail dimulai dari `first_detail_id`.
+    """
+    product_ids = master_data['products']['product_id'].to_numpy()
+    supplier_ids = master_data['suppliers']['supplier_id'].to_numpy()
+    warehouse_ids = master_data['warehouses']['warehouse_id'].to_numpy()
+    
+    n_po = len(num_details)
+    po_ids = np.arange(first_po_id, first_po_id + n_po)
+    df_po = pd.DataFrame({
+        'po_id': po_ids,
+        'supplier_id': rng.choice(supplier_ids, n_po),
+        'warehouse_id': rng.choice(warehouse_ids, n_po),
+        'order_date': get_seasonal_dates(settings['start_date'], settings['end_date'], n_po, rng),
+        'status': rng.choice(ORDER_STATUSES, n_po, p=ORDER_STATUS_WEIGHTS).astype(object)
+    })
+    
+    # Perbaikan PO (Unique constraint): produk unik per PO
+    line_po_ids = np.repeat(po_ids, num_details)
+    keep, product_idx = draw_unique_order_lines(
+        line_po_ids, lambda size: rng.integers(0, len(product_ids), size)
+    )
+    n_po_lines = int(keep.sum())
+    df_po_details = pd.DataFrame({
+        'po_detail_id': np.arange(first_detail_id, first_detail_id + n_po_lines),
+        'po_id': line_po_ids[keep],
+        'product_id': product_ids[product_idx[keep]],
+        'quantity': rng.integers(50, 501, n_po_lines),
+        'unit_price': rng.uniform(5000, 500000, n_po_lines).round(2)
+    })
+    return df_po, df_po_details
+
+def build_sales_orders(master_data, hot_product_ids, settings, num_details, rng, first_so_id=1, first_detail_id=1):
+    """
+    Membuat header SO dan detailnya untuk `len(num_details)` SO berurutan mulai dari
+    `first_so_id`, dengan aturan 80/20 untuk produk. ID detail dimulai dari `first_detail_id`.
+    """
+    product_ids = master_data['products']['product_id'].to_numpy()
+    warehouse_ids = master_data['warehouses']['warehouse_id'].to_numpy()
+    
+    n_so = len(num_details)
+    so_ids = np.arange(first_so_id, first_so_id + n_so)
+    
+    # Nama & alamat pelanggan diambil dari pool yang dibuat sekali di awal
+    customer_names = np.array([fake.name() for _ in range(CUSTOMER_POOL_SIZE)], dtype=object)
+    customer_addresses = np.array([fake.address() for _ in range(CUSTOMER_POOL_SIZE)], dtype=object)
+    customer_idx = rng.integers(0, CUSTOMER_POOL_SIZE, n_so)
+    
+    df_so = pd.DataFrame({
+        'so_id': so_ids,
+        'customer_name': customer_names[customer_idx],
+        'order_date': get_seasonal_dates(settings['start_date'], settings['end_date'], n_so, rng),
+        'status': rng.choice(ORDER_STATUSES, n_so, p=ORDER_STATUS_WEIGHTS).astype(object),
+        'shipping_address': customer_addresses[customer_idx]
+    })
+    
+    # Perbaikan SO (Unique constraint): kombinasi (produk, gudang) unik per SO
+    line_so_ids = np.repeat(so_ids, num_details)
+    
+    hot_idx = np.flatnonzero(np.isin(product_ids, hot_product_ids))
+    other_idx = np.flatnonzero(~np.isin(product_ids, hot_product_ids))
+    
+    def draw_so_combos(size):
+        # Aturan 80/20: produk 'hot' dipilih dengan peluang pareto_volume
+        is_hot = rng.random(size) < settings['pareto_volume']
+        product_idx = np.where(
+            is_hot,
+            hot_idx[rng.integers(0, len(hot_idx), size)],
+            other_idx[rng.integers(0, len(other_idx), size)]
+        )
+        return product_idx * len(warehouse_ids) + rng.integers(0, len(warehouse_ids), size)
+    
+    keep, combo = draw_unique_order_lines(line_so_ids, draw_so_combos)
+    n_so_lines = int(keep.sum())
+    df_so_details = pd.DataFrame({
+        'so_detail_id': np.arange(first_detail_id, first_detail_id + n_so_lines),
+        'so_id': line_so_ids[keep],
+        'product_id': product_ids[combo[keep] // len(warehouse_ids)],
+        'warehouse_id': warehouse_ids[combo[keep] % len(warehouse_ids)],
+        'quantity': rng.integers(1, 11, n_so_lines),
+        'unit_price': rng.uniform(10000, 1000000, n_so_lines).round(2)
+    })
+    return df_so, df_so_details
+
+def generate_orders(config, master_data, hot_product_ids, rng=None):
+    """
+    Menghasilkan Purchase Orders (PO) dan Sales Orders (SO) beserta detailnya.
+    Header & baris detail di-draw sebagai array NumPy secara batch.
+    """
     
     vols = config['volumes']
     settings = config['settings']
+    rng = rng if rng is not None else np.random.default_rng()
     
-    product_ids = master_data['products']['product_id'].tolist()
-    supplier_ids = master_data['suppliers']['supplier_id'].tolist()
-    warehouse_ids = master_data['warehouses']['warehouse_id'].tolist()
+    n_products = len(master_data['products'])
+    n_warehouses = len(master_data['warehouses'])
     
     # 1. Purchase Orders (PO)
     print("Generating Purchase Orders...")
-    purchase_orders = []
-    po_details = []
-    po_detail_id_counter = 1
-    
-    for i in tqdm(range(vols['purchase_orders']), desc="Purchase Orders"):
-        po_id = i + 1
-        purchase_orders.append({
-            'po_id': po_id,
-            'supplier_id': random.choice(supplier_ids),
-            'warehouse_id': random.choice(warehouse_ids),
-            'order_date': get_seasonal_date(settings['start_date'], settings['end_date']).date(),
-            'status': random.choices(['PENDING', 'PROCESSING', 'SHIPPED', 'COMPLETED', 'CANCELLED'], weights=[0.1, 0.1, 0.1, 0.6, 0.1], k=1)[0]
-        })
-        
-        # Perbaikan PO (Unique constraint)
-        num_details = np.random.poisson(vols['po_details_avg_per_po'] - 1) + 1
-        num_details = min(num_details, len(product_ids))
-        
-        chosen_product_ids = random.sample(product_ids, k=num_details)
-        
-        for product_id in chosen_product_ids:
-            po_details.append({
-                'po_detail_id': po_detail_id_counter,
-                'po_id': po_id,
-                'product_id': product_id,
-                'quantity': random.randint(50, 500),
-                'unit_price': round(random.uniform(5000, 500000), 2)
-            })
-            po_detail_id_counter += 1
-            
-    df_po = pd.DataFrame(purchase_orders)
-    df_po_details = pd.DataFrame(po_details)
+    num_details = draw_line_counts(vols['purchase_orders'], vols['po_details_avg_per_po'], n_products, rng)
+    df_po, df_po_details = build_purchase_orders(master_data, settings, num_details, rng)
     print(f"Generated {len(df_po)} POs and {len(df_po_details)} PO Details.")
 
     # 2. Sales Orders (SO)
     print("Generating Sales Orders...")
-    sales_orders = []
-    so_details = []
-    so_detail_id_counter = 1
-    
-    other_product_ids = list(set(product_ids) - set(hot_product_ids))
-    
-    for i in tqdm(range(vols['sales_orders']), desc="Sales Orders"):
-        so_id = i + 1
-        sales_orders.append({
-            'so_id': so_id,
-            'customer_name': fake.name(),
-            'order_date': get_seasonal_date(settings['start_date'], settings['end_date']).date(),
-            'status': random.choices(['PENDING', 'PROCESSING', 'SHIPPED', 'COMPLETED', 'CANCELLED'], weights=[0.1, 0.1, 0.1, 0.6, 0.1], k=1)[0],
-            'shipping_address': fake.address()
-        })
-        
-        # Perbaikan SO (Unique constraint)
-        num_details = np.random.poisson(vols['so_details_avg_per_so'] - 1) + 1
-        max_combinations = len(product_ids) * len(warehouse_ids)
-        num_details = min(num_details, max_combinations)
-        
-        used_combos = set()
-        
-        for _ in range(num_details):
-            tries = 0
-            while tries < 10:
-                if random.random() < settings['pareto_volume']:
-                    product_id = random.choice(hot_product_ids)
-                else:
-                    product_id = random.choice(other_product_ids)
-                
-                warehouse_id = random.choice(warehouse_ids)
-                
-                if (product_id, warehouse_id) not in used_combos:
-                    used_combos.add((product_id, warehouse_id))
-                    so_details.append({
-                        'so_detail_id': so_detail_id_counter,
-                        'so_id': so_id,
-                        'product_id': product_id,
-                        'warehouse_id': warehouse_id,
-                        'quantity': random.randint(1, 10),
-                        'unit_price': round(random.uniform(10000, 1000000), 2)
-                    })
-                    so_detail_id_counter += 1
-                    break
-                
-                tries += 1
-            
-    df_so = pd.DataFrame(sales_orders)
-    df_so_details = pd.DataFrame(so_details)
+    num_details = draw_line_counts(vols['sales_orders'], vols['so_details_avg_per_so'], n_products * n_warehouses, rng)
+    df_so, df_so_details = build_sales_orders(master_data, hot_product_ids, settings, num_details, rng)
     print(f"Generated {len(df_so)} SOs and {len(df_so_details)} SO Details (applying 80/20 rule).")
     
     return {
@@ -231,158 +345,195 @@ def generate_orders(config, master_data, hot_product_ids):
         'sales_order_details': df_so_details
     }
 
-def generate_stock_movements(config, master_data, orders_data, hot_product_ids):
+def draw_movement_types(n, rng):
+    """Tipe pergerakan untuk `n` kejadian (TRANSFER nanti menjadi 2 baris)."""
+    return rng.choice(MOVEMENT_TYPES, size=n, p=MOVEMENT_TYPE_WEIGHTS)
+
+def count_movement_rows(event_type):
+    """Jumlah baris stock_movements yang dihasilkan dari array tipe kejadian."""
+    return len(event_type) + int((event_type == 'TRANSFER').sum())
+
+def build_stock_movements(master_data, hot_product_ids, settings, event_type, n_po, n_so, rng, first_movement_id=1):
     """
-    Menghasilkan data stock_movements.
-    Ini adalah inti logika, memastikan data realistis.
+    Membuat baris stock_movements untuk kejadian-kejadian `event_type`.
+    Referensi PO/SO di-draw dari rentang ID 1..n_po / 1..n_so.
+    Semua kolom di-draw sekaligus sebagai array NumPy (tanpa loop per baris).
     """
-    
-    print("Generating Stock Movements...")
-    vols = config['volumes']
-    settings = config['settings']
-    
-    product_ids = master_data['products']['product_id'].tolist()
-    warehouse_ids = master_data['warehouses']['warehouse_id'].tolist()
-    po_ids = orders_data['purchase_orders']['po_id'].tolist()
-    so_ids = orders_data['sales_orders']['so_id'].tolist()
-    other_product_ids = list(set(product_ids) - set(hot_product_ids))
-    
-    movements = []
-    
-    # Perbaikan 'movement_id' (Unique constraint)
-    movement_id_counter = 1 
-    
-    for i in tqdm(range(vols['stock_movements']), desc="Stock Movements"):
-        if random.random() < settings['pareto_volume']:
-            product_id = random.choice(hot_product_ids)
-        else:
-            product_id = random.choice(other_product_ids)
-            
-        movement_type = random.choices(
-            ['IN', 'OUT', 'TRANSFER', 'ADJUSTMENT', 'RETURN'], 
-            weights=[0.35, 0.45, 0.1, 0.05, 0.05], 
-            k=1
-        )[0]
-        
-        reference_type = None
-        reference_id = None
-        quantity = 0
-        
-        if movement_type == 'IN':
-            quantity = random.randint(50, 500)
-            reference_type = 'PURCHASE_ORDER'
-            reference_id = random.choice(po_ids)
-        elif movement_type == 'OUT':
-            quantity = -random.randint(1, 10) 
-            reference_type = 'SALES_ORDER'
-            reference_id = random.choice(so_ids)
-        elif movement_type == 'TRANSFER':
-            quantity = -random.randint(1, 50) 
-            reference_type = 'STOCK_TRANSFER'
-            reference_id = movement_id_counter 
-            
-            movements.append({
-                'movement_id': movement_id_counter, 
-                'product_id': product_id,
-                'warehouse_id': random.choice(warehouse_ids),
-                'movement_type': 'TRANSFER',
-                'quantity': quantity,
-                'reference_type': reference_type,
-                'reference_id': reference_id,
-                'movement_date': get_seasonal_date(settings['start_date'], settings['end_date']),
-                'notes': 'Transfer Out'
-            })
-            movement_id_counter += 1 
-            
-            from_warehouse_id = movements[-1]['warehouse_id']
-            to_warehouse_id = random.choice([w for w in warehouse_ids if w != from_warehouse_id])
-            
-            movements.append({
-                'movement_id': movement_id_counter, 
-                'product_id': product_id,
-                'warehouse_id': to_warehouse_id,
-                'movement_type': 'TRANSFER',
-                'quantity': -quantity, 
-                'reference_type': reference_type,
-                'reference_id': reference_id,
-                'movement_date': movements[-1]['movement_date'] + timedelta(minutes=30),
-                'notes': 'Transfer In'
-            })
-            movement_id_counter += 1 
-            
-            continue 
-            
-        elif movement_type == 'ADJUSTMENT':
-            quantity = random.randint(-5, 5)
-            if quantity == 0: quantity = 1
-            reference_type = 'MANUAL_ADJUSTMENT'
-            reference_id = None
-        elif movement_type == 'RETURN':
-            quantity = random.randint(1, 3)
-            reference_type = 'SALES_ORDER'
-            reference_id = random.choice(so_ids)
-
-        movements.append({
-            'movement_id': movement_id_counter,
-            'product_id': product_id,
-            'warehouse_id': random.choice(warehouse_ids),
-            'movement_type': movement_type,
-            'quantity': quantity,
-            'reference_type': reference_type,
-            'reference_id': reference_id,
-            'movement_date': get_seasonal_date(settings['start_date'], settings['end_date']),
-            'notes': fake.text(max_nb_chars=50)
-        })
-        movement_id_counter += 1 
+    product_ids = master_data['products']['product_id'].to_numpy()
+    warehouse_ids = master_data['warehouses']['warehouse_id'].to_numpy()
+    hot_ids = np.asarray(hot_product_ids)
+    other_product_ids = np.setdiff1d(product_ids, hot_ids)
+    
+    n = len(event_type)
+    
+    # 1. Draw per "kejadian" (satu TRANSFER nanti menjadi 2 baris: keluar & masuk)
+    is_hot = rng.random(n) < settings['pareto_volume']
+    event_product = np.where(
+        is_hot,
+        hot_ids[rng.integers(0, len(hot_ids), n)],
+        other_product_ids[rng.integers(0, len(other_product_ids), n)]
+    )
+    event_date = get_seasonal_dates(settings['start_date'], settings['end_date'], n, rng)
+    event_wh_idx = rng.integers(0, len(warehouse_ids), n)
+    
+    # Kuantitas & referensi sesuai tipe pergerakan
+    quantity = np.zeros(n, dtype=np.int64)
+    reference_id = np.full(n, -1, dtype=np.int64)  # -1 = NULL
+    reference_type = np.empty(n, dtype=object)
+    
+    is_in = event_type == 'IN'
+    quantity[is_in] = rng.integers(50, 501, is_in.sum())
+    reference_type[is_in] = 'PURCHASE_ORDER'
+    reference_id[is_in] = rng.integers(1, n_po + 1, is_in.sum())
+    
+    is_out = event_type == 'OUT'
+    quantity[is_out] = -rng.integers(1, 11, is_out.sum())
+    reference_type[is_out] = 'SALES_ORDER'
+    reference_id[is_out] = rng.integers(1, n_so + 1, is_out.sum())
+    is_transfer = event_type == 'TRANSFER'
+    quantity[is_transfer] = -rng.integers(1, 51, is_transfer.sum())
+    reference_type[is_transfer] = 'STOCK_TRANSFER'
+    
+    is_adjustment = event_type == 'ADJUSTMENT'
+    adjustment_qty = rng.integers(-5, 6, is_adjustment.sum())
+    quantity[is_adjustment] = np.where(adjustment_qty == 0, 1, adjustment_qty)
+    reference_type[is_adjustment] = 'MANUAL_ADJUSTMENT'
+    
+    is_return = event_type == 'RETURN'
+    quantity[is_return] = rng.integers(1, 4, is_return.sum())
+    reference_type[is_return] = 'SALES_ORDER'
+    reference_id[is_return] = rng.integers(1, n_so + 1, is_return.sum())
+    
+    # 2. Perluas TRANSFER menjadi pasangan baris (keluar, masuk) yang berurutan
+    rows_per_event = np.where(is_transfer, 2, 1)
+    row_event = np.repeat(np.arange(n), rows_per_event)
+    # Baris kedua dari pasangan transfer = 'Transfer In'
+    is_transfer_in = np.zeros(len(row_event), dtype=bool)
+    is_transfer_in[1:] = row_event[1:] == row_event[:-1]
+    is_transfer_out = is_transfer[row_event] & ~is_transfer_in
+    
+    movement_id = np.arange(first_movement_id, first_movement_id + len(row_event))
+    
+    # Gudang tujuan transfer: geser indeks gudang asal agar selalu berbeda
+    wh_idx = event_wh_idx[row_event]
+    wh_offset = rng.integers(1, len(warehouse_ids), is_transfer_in.sum())
+    wh_idx[is_transfer_in] = (wh_idx[is_transfer_in] + wh_offset) % len(warehouse_ids)
+    
+    row_quantity = quantity[row_event]
+    row_quantity[is_transfer_in] = -row_quantity[is_transfer_in]
+    
+    # reference_id transfer = movement_id baris 'Transfer Out'
+    row_reference_id = reference_id[row_event]
+    row_reference_id[is_transfer_out] = movement_id[is_transfer_out]
+    row_reference_id[is_transfer_in] = movement_id[is_transfer_out]
+    
+    row_date = event_date[row_event]
+    row_date[is_transfer_in] += np.timedelta64(30, 'm')
+    
+    # Notes diambil dari pool teks yang dibuat sekali di awal
+    notes_pool = np.array([fake.text(max_nb_chars=50) for _ in range(NOTES_POOL_SIZE)], dtype=object)
+    notes = notes_pool[rng.integers(0, NOTES_POOL_SIZE, len(row_event))]
+    notes[is_transfer_out] = 'Transfer Out'
+    notes[is_transfer_in] = 'Transfer In'
+    
+    df_movements = pd.DataFrame({
+        'movement_id': movement_id,
+        'product_id': event_product[row_event],
+        'warehouse_id': warehouse_ids[wh_idx],
+        'movement_type': event_type[row_event].astype(object),
+        'quantity': row_quantity,
+        'reference_type': reference_type[row_event],
+        'reference_id': pd.array(np.where(row_reference_id < 0, None, row_reference_id), dtype='Int64'),
+        'movement_date': row_date,
+        'notes': notes
+    })
+    return df_movements
 
-    df_movements = pd.DataFrame(movements)
-    
-    # --- PERBAIKAN LOGIKA 'DATA QUALITY ISSUE' DIMULAI DI SINI ---
+def inject_movement_dq_issues(df_movements, settings, rng=None):
+    """
+    Menyisipkan isu data quality ke sebagian baris stock_movements.
+    Baris & jenis isu di-draw sekaligus, lalu diterapkan per jenis dengan mask.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    # 'future_date' dihitung relatif terhadap reference_date (default: hari ini)
+    reference_date = pd.Timestamp(settings.get('reference_date') or date.today())
     print(f"Injecting {settings['dq_issue_percent']*100}% data quality issues...")
     n_issues = int(len(df_movements) * settings['dq_issue_percent'])
-    issue_indices = df_movements.sample(n=n_issues).index
+    issue_rows = rng.choice(len(df_movements), size=n_issues, replace=False)
     
     # Ganti 'missing_id' dengan 'bad_reference_id'
-    dq_issue_types = ['bad_reference_id', 'invalid_qty', 'future_date']
+    issue_type = rng.choice(DQ_ISSUE_TYPES, size=n_issues)
+    
+    # Ganti 'missing_id' (yang melanggar NOT NULL)
+    # dengan ID referensi yang tidak valid (tidak melanggar constraint)
+    bad_reference_rows = issue_rows[issue_type == 'bad_reference_id']
+    reference_id = df_movements['reference_id'].array.copy()
+    reference_id[bad_reference_rows] = 9999999
+    df_movements['reference_id'] = reference_id
+    
+    # Kuantitas negatif hanya untuk tipe yang seharusnya positif (IN/RETURN)
+    invalid_qty_rows = issue_rows[issue_type == 'invalid_qty']
+    invalid_qty_rows = invalid_qty_rows[
+        np.isin(df_movements['movement_type'].to_numpy()[invalid_qty_rows], ['IN', 'RETURN'])
+    ]
+    quantity = df_movements['quantity'].to_numpy().copy()
+    quantity[invalid_qty_rows] = -np.abs(quantity[invalid_qty_rows])
+    df_movements['quantity'] = quantity
+    
+    future_date_rows = issue_rows[issue_type == 'future_date']
+    movement_date = df_movements['movement_date'].to_numpy().copy()
+    movement_date[future_date_rows] = (
+        reference_date.to_datetime64()
+        + rng.integers(30, 366, len(future_date_rows)).astype('timedelta64[D]')
+    )
+    df_movements['movement_date'] = movement_date
     
-    for idx in tqdm(issue_indices, desc="Injecting DQ Issues"):
-        issue_type = random.choice(dq_issue_types)
-        
-        if issue_type == 'bad_reference_id':
-            # Ganti 'missing_id' (yang melanggar NOT NULL)
-            # dengan ID referensi yang tidak valid (tidak melanggar constraint)
-            df_movements.loc[idx, 'reference_id'] = 9999999
-            
-        elif issue_type == 'invalid_qty':
-            if df_movements.loc[idx, 'movement_type'] in ['IN', 'RETURN']:
-                df_movements.loc[idx, 'quantity'] = -abs(df_movements.loc[idx, 'quantity'])
-        elif issue_type == 'future_date':
-            df_movements.loc[idx, 'movement_date'] = datetime.now() + timedelta(days=random.randint(30, 365))
-    # --- PERBAIKAN LOGIKA 'DATA QUALITY ISSUE' BERAKHIR DI SINI ---
-            
-    print(f"Generated {len(df_movements)} stock movements (with DQ issues).")
     return df_movements
 
-def calculate_current_stock(config, df_movements, master_data):
+def generate_stock_movements(config, master_data, orders_data, hot_product_ids, rng=None):
     """
-    Menghitung snapshot 'stock' saat ini berdasarkan histori 'stock_movements'.
-    Ini memastikan data logis.
+    Menghasilkan data stock_movements.
+    Ini adalah inti logika, memastikan data realistis.
     """
-    print("Calculating current 'stock' table from movements...")
     
+    print("Generating Stock Movements...")
+    vols = config['volumes']
+    settings = config['settings']
+    rng = rng if rng is not None else np.random.default_rng()
+    
+    event_type = draw_movement_types(vols['stock_movements'], rng)
+    df_movements = build_stock_movements(
+        master_data, hot_product_ids, settings, event_type,
+        len(orders_data['purchase_orders']), len(orders_data['sales_orders']), rng
+    )
+    df_movements = inject_movement_dq_issues(df_movements, settings, rng)
+            
+    print(f"Generated {len(df_movements)} stock movements (with DQ issues).")
+    return df_movements
+
+def summarize_stock_quantities(df_movements):
+    """Total kuantitas per (produk, gudang). Hasil beberapa shard bisa dijumlahkan."""
     # 'product_id' tidak akan pernah NULL lagi, jadi dropna() tidak diperlukan
     # tapi kita biarkan untuk keamanan
     valid_movements = df_movements.dropna(subset=['product_id'])
-    
-    stock = valid_movements.groupby(['product_id', 'warehouse_id'])['quantity'].sum().reset_index()
+    return valid_movements.groupby(['product_id', 'warehouse_id'])['quantity'].sum()
+
+def build_current_stock(stock_quantities, master_data, rng=None):
+    """Membuat snapshot 'stock' dari total kuantitas per (produk, gudang)."""
+    rng = rng if rng is not None else np.random.default_rng()
+    stock = stock_quantities.reset_index()
     stock = stock.rename(columns={'quantity': 'quantity_on_hand'})
     
-    stock = stock[stock['quantity_on_hand'] != 0]
+    stock = stock[stock['quantity_on_hand'] != 0].copy()
     
-    stock['reorder_point'] = stock.apply(lambda _: random.randint(10, 50), axis=1)
-    stock['safety_stock'] = stock.apply(lambda row: random.randint(5, int(row['reorder_point'])), axis=1)
+    # reorder_point ~ U[10, 50], safety_stock ~ U[5, reorder_point] (inklusif)
+    reorder_point = rng.integers(10, 51, len(stock))
+    stock['reorder_point'] = reorder_point
+    stock['safety_stock'] = rng.integers(5, reorder_point + 1)
     
-    stock.loc[stock['quantity_on_hand'] <= stock['reorder_point'], 'quantity_on_hand'] = stock['reorder_point'] + random.randint(-5, 5)
+    # Stok di bawah reorder point dinaikkan ke reorder point (+ satu offset acak)
+    low_stock = stock['quantity_on_hand'].to_numpy() <= reorder_point
+    stock.loc[low_stock, 'quantity_on_hand'] = reorder_point[low_stock] + int(rng.integers(-5, 6))
     
     stock['product_id'] = stock['product_id'].astype(int)
     
@@ -404,6 +555,14 @@ def calculate_current_stock(config, df_movements, master_data):
     
     return df_stock_final
 
+def calculate_current_stock(config, df_movements, master_data, rng=None):
+    """
+    Menghitung snapshot 'stock' saat ini berdasarkan histori 'stock_movements'.
+    Ini memastikan data logis.
+    """
+    print("Calculating current 'stock' table from movements...")
+    return build_current_stock(summarize_stock_quantities(df_movements), master_data, rng)
+
 def df_to_sql_insert(df, table_name, file_handle, chunk_size=5000):
     """Menulis DataFrame sebagai statement INSERT SQL multi-baris ke file handle."""
     
@@ -440,8 +599,101 @@ def df_to_sql_insert(df, table_name, file_handle, chunk_size=5000):
         insert_statement = f"INSERT INTO {table_name} ({columns})\nVALUES\n{values_string};\n\n"
         file_handle.write(insert_statement)
 
+def df_to_copy_files(df, table_name, output_dir, chunk_size=COPY_CHUNK_ROWS, part_prefix="part", clean=True):
+    """
+    Menulis DataFrame sebagai file CSV kompatibel COPY (tanpa header, NULL = kosong),
+    dipecah menjadi file part per `chunk_size` baris. Mengembalikan list path part.
+    `part_prefix` membedakan file dari shard yang berbeda; `clean` menghapus part lama.
+    """
+    table_dir = Path(output_dir) / table_name
+    table_dir.mkdir(parents=True, exist_ok=True)
+    if clean:
+        for old_part in table_dir.glob('part-*.csv'):
+            old_part.unlink()
+    
+    print(f"    -> Writing {len(df)} rows as COPY files for table {table_name}...")
+    
+    parts = []
+    for part_no, i in enumerate(range(0, len(df), chunk_size)):
+        path = table_dir / f"{part_prefix}-{part_no:05d}.csv"
+        df.iloc[i:i + chunk_size].to_csv(path, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        parts.append(path)
+    return parts
+
+def to_database_types(df):
+    """Menyamakan tipe kolom tanggal dengan skema database (DATE / TIMESTAMPTZ UTC)."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            if col in DATE_COLUMNS:
+                df[col] = df[col].dt.date
+            elif df[col].dt.tz is None:
+                df[col] = df[col].dt.tz_localize('UTC')
+    return df
+
+def df_to_parquet_files(df, table_name, output_dir, chunk_size=COPY_CHUNK_ROWS, part_prefix="part", clean=True):
+    """
+    Menulis DataFrame sebagai dataset Parquet: satu folder per tabel berisi file part
+    per `chunk_size` baris. Part mengikuti urutan ID (filter ID melewati file), dan
+    isi part diurutkan menurut PARQUET_SORT_COLUMNS (filter tanggal melewati row group).
+    """
+    table_dir = Path(output_dir) / table_name
+    table_dir.mkdir(parents=True, exist_ok=True)
+    if clean:
+        for old_part in table_dir.glob('part-*.parquet'):
+            old_part.unlink()
+    
+    print(f"    -> Writing {len(df)} rows as Parquet files for table {table_name}...")
+    
+    df = to_database_types(df)
+    sort_column = PARQUET_SORT_COLUMNS.get(table_name)
+    parts = []
+    for part_no, i in enumerate(range(0, len(df), chunk_size)):
+        path = table_dir / f"{part_prefix}-{part_no:05d}.parquet"
+        chunk = df.iloc[i:i + chunk_size]
+        if sort_column:
+            chunk = chunk.sort_values(sort_column, kind='stable')
+        chunk.to_parquet(path, index=False, row_group_size=PARQUET_ROW_GROUP_ROWS)
+        parts.append(path)
+    return parts
+
+def write_sequence_reset(file_handle):
+    """Menulis statement setval untuk semua sequence SERIAL."""
+    # --- PERBAIKAN: Setel ulang sequence generator ---
+    # Setelah semua data di-load, kita perlu update sequence
+    # agar 'SERIAL' PKeys tidak bertabrakan dengan data yang di-load
+    file_handle.write("\n-- Menyesuaikan sequence generator setelah data load --\n")
+    for sequence, table_name, column in SEQUENCES:
+        file_handle.write(f"SELECT setval('{sequence}', (SELECT MAX({column}) FROM {table_name}));\n")
+
+def write_manifest(output_dir, manifest):
+    """Menulis manifest.json: {tabel: {columns, rows, parts}}."""
+    with open(Path(output_dir) / "manifest.json", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def write_copy_manifest(copy_dir, manifest):
+    """
+    Menulis manifest.json (dipakai bulk_load.py) dan skrip psql `load_copy.sql`
+    yang memakai \\copy untuk setiap file part.
+    """
+    copy_dir = Path(copy_dir)
+    write_manifest(copy_dir, manifest)
+    
+    with open(copy_dir / "load_copy.sql", 'w', encoding='utf-8') as f:
+        f.write("-- Data Ekspor (format COPY) untuk Warehouse Stock Management\n")
+        f.write("-- Jalankan dari direktori ini: psql -f load_copy.sql\n")
+        f.write("BEGIN;\n\n")
+        f.write("SET session_replication_role = 'replica';\n\n")
+        for table_name, entry in manifest.items():
+            columns = ', '.join(f'"{col}"' for col in entry['columns'])
+            for part in entry['parts']:
+                f.write(f"\\copy {table_name} ({columns}) FROM '{part}' WITH (FORMAT csv)\n")
+        f.write("\nSET session_replication_role = 'origin';\n")
+        write_sequence_reset(f)
+        f.write("\nCOMMIT;\n")
+
 def save_data(data_frames, output_dir, file_format="csv"):
-    """Menyimpan DataFrame ke file (CSV atau SQL Inserts)."""
+    """Menyimpan DataFrame ke file (CSV, SQL Inserts, file COPY + skrip load, atau dataset Parquet)."""
     
     print(f"Saving data to '{output_dir}' as {file_format}...")
     
@@ -452,19 +704,6 @@ def save_data(data_frames, output_dir, file_format="csv"):
             df.to_csv(path, index=False)
     
     elif file_format == 'sql':
-        table_order = [
-            'categories', 
-            'suppliers', 
-            'warehouses', 
-            'products',
-            'purchase_orders', 
-            'purchase_order_details',
-            'sales_orders', 
-            'sales_order_details',
-            'stock', 
-            'stock_movements'
-        ]
-        
         sql_file_path = Path(output_dir) / "all_data.sql"
         with open(sql_file_path, 'w', encoding='utf-8') as f:
             f.write("-- Data Ekspor untuk Warehouse Stock Management\n")
@@ -472,7 +711,7 @@ def save_data(data_frames, output_dir, file_format="csv"):
             f.write("BEGIN;\n\n") 
             f.write("SET session_replication_role = 'replica';\n\n")
             
-            for table_name in table_order:
+            for table_name in TABLE_ORDER:
                 if table_name in data_frames:
                     df = data_frames[table_name]
                     if not df.empty:
@@ -482,27 +721,57 @@ def save_data(data_frames, output_dir, file_format="csv"):
                         print(f"  -> Skipping empty table {table_name}")
             
             f.write("\nSET session_replication_role = 'origin';\n")
-            
-            # --- PERBAIKAN: Setel ulang sequence generator ---
-            # Setelah semua data di-load, kita perlu update sequence
-            # agar 'SERIAL' PKeys tidak bertabrakan dengan data yang di-load
-            f.write("\n-- Menyesuaikan sequence generator setelah data load --\n")
-            f.write("SELECT setval('categories_category_id_seq', (SELECT MAX(category_id) FROM categories));\n")
-            f.write("SELECT setval('suppliers_supplier_id_seq', (SELECT MAX(supplier_id) FROM suppliers));\n")
-            f.write("SELECT setval('warehouses_warehouse_id_seq', (SELECT MAX(warehouse_id) FROM warehouses));\n")
-            f.write("SELECT setval('products_product_id_seq', (SELECT MAX(product_id) FROM products));\n")
-            f.write("SELECT setval('purchase_orders_po_id_seq', (SELECT MAX(po_id) FROM purchase_orders));\n")
-            f.write("SELECT setval('purchase_order_details_po_detail_id_seq', (SELECT MAX(po_detail_id) FROM purchase_order_details));\n")
-            f.write("SELECT setval('sales_orders_so_id_seq', (SELECT MAX(so_id) FROM sales_orders));\n")
-            f.write("SELECT setval('sales_order_details_so_detail_id_seq', (SELECT MAX(so_detail_id) FROM sales_order_details));\n")
-            f.write("SELECT setval('stock_movements_movement_id_seq', (SELECT MAX(movement_id) FROM stock_movements));\n")
-            
+            write_sequence_reset(f)
             f.write("\nCOMMIT;\n") 
             
         print(f"\nAll SQL data written to {sql_file_path}")
 
+    elif file_format == 'copy':
+        # Satu folder per tabel berisi file part CSV, plus manifest & skrip load
+        copy_dir = Path(output_dir) / "copy"
+        copy_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {}
+        
+        for table_name in TABLE_ORDER:
+            df = data_frames.get(table_name)
+            if df is None or df.empty:
+                print(f"  -> Skipping empty table {table_name}")
+                continue
+            parts = df_to_copy_files(df, table_name, copy_dir)
+            manifest[table_name] = {
+                'columns': list(df.columns),
+                'rows': len(df),
+                'parts': [part.relative_to(copy_dir).as_posix() for part in parts]
+            }
+        
+        write_copy_manifest(copy_dir, manifest)
+        
+        print(f"\nAll COPY data written to {copy_dir} (load script: {copy_dir / 'load_copy.sql'})")
+
+    elif file_format == 'parquet':
+        # Satu folder per tabel berisi file part Parquet (sumber file untuk ETL)
+        parquet_dir = Path(output_dir) / "parquet"
+        parquet_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {}
+        
+        for table_name in TABLE_ORDER:
+            df = data_frames.get(table_name)
+            if df is None or df.empty:
+                print(f"  -> Skipping empty table {table_name}")
+                continue
+            parts = df_to_parquet_files(df, table_name, parquet_dir)
+            manifest[table_name] = {
+                'columns': list(df.columns),
+                'rows': len(df),
+                'parts': [part.relative_to(parquet_dir).as_posix() for part in parts]
+            }
+        
+        write_manifest(parquet_dir, manifest)
+        
+        print(f"\nAll Parquet data written to {parquet_dir}")
+
     else:
-        print(f"Format output '{file_format}' tidak didukung. Gunakan 'csv' or 'sql'.")
+        print(f"Format output '{file_format}' tidak didukung. Gunakan 'csv', 'sql', 'copy', atau 'parquet'.")
 
 def validation_summary(data_frames):
     """Mencetak ringkasan validasi data."""
@@ -528,32 +797,73 @@ def validation_summary(data_frames):
 def main():
     """Fungsi utama untuk menjalankan generator data."""
     
-    config = load_config('config.yaml')
+    parser = argparse.ArgumentParser(description="Generator data Warehouse Stock Management.")
+    parser.add_argument('--config', default='config.yaml')
+    parser.add_argument('--sharded', action='store_true',
+                        help="Generate ter-shard & paralel (output format 'copy', atau 'parquet' jika dipilih di config).")
+    parser.add_argument('--scale-factor', type=float, help="Pengali volume tabel fakta.")
+    parser.add_argument('--seed', type=int, help="Seed untuk hasil yang reproducible.")
+    parser.add_argument('--workers', type=int, help="Jumlah proses worker (mode sharded).")
+    args = parser.parse_args()
+    
+    config = load_config(args.config)
     output_dir = config['output']['directory']
+    generation = config.get('generation') or {}
+    scale_factor = args.scale_factor if args.scale_factor is not None else generation.get('scale_factor', 1.0)
+    seed = args.seed if args.seed is not None else generation.get('seed')
     
     create_output_directory(output_dir)
     
-    master_data, hot_product_ids = generate_master_data(config)
-    
-    orders_data = generate_orders(config, master_data, hot_product_ids)
-    
-    df_movements = generate_stock_movements(config, master_data, orders_data, hot_product_ids)
-    
-    df_stock = calculate_current_stock(config, df_movements, master_data)
-    
-    all_data = {
-        **master_data,
-        **orders_data,
-        'stock_movements': df_movements,
-        'stock': df_stock
-    }
+    if args.sharded or generation.get('sharded'):
+        from sharding import generate_sharded
+        file_format = 'parquet' if config['output']['format'] == 'parquet' else 'copy'
+        generate_sharded(config, output_dir,
+                         scale_factor=scale_factor,
+                         seed=seed if seed is not None else 42,
+                         workers=args.workers or generation.get('workers', 4),
+                         rows_per_shard=generation.get('rows_per_shard', 1_000_000),
+                         file_format=file_format)
+        all_data = None
+    else:
+        from sharding import scale_volumes
+        config['volumes'] = scale_volumes(config['volumes'], scale_factor)
+        rng = None
+        if seed is not None:
+            seed_sequence = np.random.SeedSequence(seed)
+            seed_everything(seed_sequence)
+            rng = np.random.default_rng(seed_sequence)
+        
+        master_data, hot_product_ids = generate_master_data(config)
+        
+        orders_data = generate_orders(config, master_data, hot_product_ids, rng=rng)
+        
+        df_movements = generate_stock_movements(config, master_data, orders_data, hot_product_ids, rng=rng)
+        
+        df_stock = calculate_current_stock(config, df_movements, master_data, rng=rng)
+        
+        all_data = {
+            **master_data,
+            **orders_data,
+            'stock_movements': df_movements,
+            'stock': df_stock
+        }
+        
+        file_format = config['output']['format']
+        save_data(all_data, output_dir, file_format)
     
-    save_data(all_data, output_dir, config['output']['format'])
+    # (Opsional) Load langsung ke PostgreSQL via COPY FROM STDIN paralel
+    direct_load = config['output'].get('direct_load') or {}
+    if file_format == 'copy' and direct_load.get('enabled'):
+        from bulk_load import bulk_load
+        bulk_load(Path(output_dir) / "copy", direct_load['dsn'],
+                  workers=direct_load.get('workers', 4),
+                  truncate=direct_load.get('truncate', False))
     
-    validation_summary(all_data)
+    if all_data is not None:
+        validation_summary(all_data)
     
     print("\nData generation complete!")
     print(f"Output files are saved in '{output_dir}' directory.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
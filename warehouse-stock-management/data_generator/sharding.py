@@ -0,0 +1,224 @@
+"""
+Generator data ter-shard: deterministik berdasarkan seed dan memori konstan.
+
+Tabel fakta (purchase_orders, sales_orders, stock_movements) dipecah menjadi shard
+berukuran `rows_per_shard` (jumlah order / kejadian pergerakan). Setiap shard:
+  - punya seed turunan sendiri: SeedSequence(seed, spawn_key=(tabel, shard, stream)),
+    sehingga shard N selalu identik pada setiap run (tidak tergantung jumlah worker);
+  - punya rentang ID tetap yang dihitung di awal (tahap planning) dari jumlah baris
+    per shard, sehingga shard bisa di-generate paralel tanpa koordinasi;
+  - di-generate di proses worker terpisah dan langsung ditulis ke disk sebagai file
+    part format 'copy' atau 'parquet' (lihat save_data), lalu dibuang dari memori.
+
+Tabel 'stock' dihitung dari total kuantitas per (produk, gudang) yang dikirim balik
+oleh setiap shard stock_movements, sehingga histori pergerakan tidak pernah dimuat
+sekaligus. Memori proses utama hanya berisi data master + total stok tersebut.
+"""
+import math
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import generate_data as gen
+
+# Kode stream untuk spawn_key SeedSequence
+MASTER_STREAM = 0
+SHARD_STREAMS = {'purchase_orders': 1, 'sales_orders': 2, 'stock_movements': 3}
+STOCK_STREAM = 4
+
+# Sub-stream di dalam satu shard
+COUNTS = 0   # jumlah baris detail / tipe kejadian (dipakai juga saat planning)
+BODY = 1     # isi baris (NumPy)
+GLOBAL = 2   # seed untuk `random`, `np.random` global & Faker
+
+# Penulis file part per format output
+PART_WRITERS = {'copy': gen.df_to_copy_files, 'parquet': gen.df_to_parquet_files}
+
+# Tabel fakta yang dihasilkan setiap jenis shard
+SHARD_TABLES = {
+    'purchase_orders': ['purchase_orders', 'purchase_order_details'],
+    'sales_orders': ['sales_orders', 'sales_order_details'],
+    'stock_movements': ['stock_movements'],
+}
+
+
+def scale_volumes(volumes, scale_factor):
+    """Mengalikan volume tabel fakta dengan scale factor (data master tetap)."""
+    scaled = dict(volumes)
+    for key in SHARD_STREAMS:
+        scaled[key] = max(1, int(round(volumes[key] * scale_factor)))
+    return scaled
+
+
+def shard_seed(seed, kind, shard_no, stream):
+    return np.random.SeedSequence(seed, spawn_key=(SHARD_STREAMS[kind], shard_no, stream))
+
+
+def shard_rng(seed, kind, shard_no, stream):
+    return np.random.default_rng(shard_seed(seed, kind, shard_no, stream))
+
+
+def shard_ranges(total, rows_per_shard):
+    """Membagi `total` baris menjadi list (shard_no, jumlah)."""
+    n_shards = max(1, math.ceil(total / rows_per_shard))
+    return [(shard_no, min(rows_per_shard, total - shard_no * rows_per_shard)) for shard_no in range(n_shards)]
+
+
+def draw_shard_counts(kind, size, volumes, n_products, n_warehouses, rng):
+    """
+    Draw yang menentukan jumlah baris shard. Dipanggil saat planning dan di worker
+    dengan stream yang sama sehingga hasilnya identik.
+    """
+    if kind == 'purchase_orders':
+        return gen.draw_line_counts(size, volumes['po_details_avg_per_po'], n_products, rng)
+    if kind == 'sales_orders':
+        return gen.draw_line_counts(size, volumes['so_details_avg_per_so'], n_products * n_warehouses, rng)
+    return gen.draw_movement_types(size, rng)
+
+
+def plan_shards(volumes, n_products, n_warehouses, seed, rows_per_shard):
+    """
+    Menentukan shard dan rentang ID tetapnya. Hanya jumlah baris per shard yang
+    dihitung (array sementara per shard), jadi memori tetap kecil.
+    """
+    tasks = []
+    for kind in SHARD_STREAMS:
+        next_id, next_row_id = 1, 1
+        for shard_no, size in shard_ranges(volumes[kind], rows_per_shard):
+            counts = draw_shard_counts(kind, size, volumes, n_products, n_warehouses,
+                                       shard_rng(seed, kind, shard_no, COUNTS))
+            n_rows = gen.count_movement_rows(counts) if kind == 'stock_movements' else int(counts.sum())
+            # first_id = ID header order; first_row_id = ID detail order / movement_id
+            tasks.append({
+                'kind': kind, 'shard_no': shard_no, 'size': size,
+                'first_id': next_id, 'first_row_id': next_row_id,
+            })
+            next_id += size
+            next_row_id += n_rows
+    return tasks
+
+
+def generate_shard(task, config, master_data, hot_product_ids, part_dir, seed, file_format='copy'):
+    """
+    Worker: generate satu shard, tulis sebagai file part, kembalikan ringkasannya.
+    Untuk shard stock_movements juga mengembalikan total kuantitas per (produk, gudang).
+    """
+    kind, shard_no = task['kind'], task['shard_no']
+    volumes, settings = config['volumes'], config['settings']
+    gen.seed_everything(shard_seed(seed, kind, shard_no, GLOBAL))
+    counts = draw_shard_counts(kind, task['size'], volumes, len(master_data['products']),
+                               len(master_data['warehouses']), shard_rng(seed, kind, shard_no, COUNTS))
+    rng = shard_rng(seed, kind, shard_no, BODY)
+
+    stock_quantities = None
+    if kind == 'purchase_orders':
+        frames = gen.build_purchase_orders(master_data, settings, counts, rng,
+                                           first_po_id=task['first_id'], first_detail_id=task['first_row_id'])
+    elif kind == 'sales_orders':
+        frames = gen.build_sales_orders(master_data, hot_product_ids, settings, counts, rng,
+                                        first_so_id=task['first_id'], first_detail_id=task['first_row_id'])
+    else:
+        df_movements = gen.build_stock_movements(master_data, hot_product_ids, settings, counts,
+                                                 volumes['purchase_orders'], volumes['sales_orders'], rng,
+                                                 first_movement_id=task['first_row_id'])
+        df_movements = gen.inject_movement_dq_issues(df_movements, settings, rng)
+        stock_quantities = gen.summarize_stock_quantities(df_movements)
+        frames = (df_movements,)
+
+    summary = {}
+    for table_name, df in zip(SHARD_TABLES[kind], frames):
+        parts = PART_WRITERS[file_format](df, table_name, part_dir, part_prefix=f"part-{shard_no:05d}", clean=False)
+        summary[table_name] = {
+            'columns': list(df.columns),
+            'rows': len(df),
+            'parts': [part.relative_to(part_dir).as_posix() for part in parts],
+        }
+    return summary, stock_quantities
+
+
+def generate_sharded(config, output_dir, scale_factor=1.0, seed=42, workers=4, rows_per_shard=1_000_000,
+                     file_format='copy'):
+    """
+    Generate semua tabel dalam format 'copy' atau 'parquet' secara ter-shard & paralel.
+    Mengembalikan manifest {tabel: {columns, rows, parts}}.
+    """
+    write_parts = PART_WRITERS[file_format]
+    config = {**config, 'volumes': scale_volumes(config['volumes'], scale_factor),
+              'settings': dict(config['settings'])}
+    # Semua shard memakai tanggal acuan yang sama untuk DQ 'future_date'
+    config['settings']['reference_date'] = config['settings'].get('reference_date') or date.today().isoformat()
+
+    part_dir = Path(output_dir) / file_format
+    for table_name in gen.TABLE_ORDER:
+        shutil.rmtree(part_dir / table_name, ignore_errors=True)
+    part_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    print(f"Sharded generation: scale factor {scale_factor}, seed {seed}, {workers} workers, "
+          f"{rows_per_shard} rows per shard")
+
+    # 1. Data master (kecil) di proses utama
+    gen.seed_everything(np.random.SeedSequence(seed, spawn_key=(MASTER_STREAM,)))
+    master_data, hot_product_ids = gen.generate_master_data(config)
+    manifest = {}
+    for table_name, df in master_data.items():
+        parts = write_parts(df, table_name, part_dir)
+        manifest[table_name] = {'columns': list(df.columns), 'rows': len(df),
+                                'parts': [part.relative_to(part_dir).as_posix() for part in parts]}
+
+    # 2. Planning rentang ID per shard
+    tasks = plan_shards(config['volumes'], len(master_data['products']), len(master_data['warehouses']),
+                        seed, rows_per_shard)
+    print(f"Planned {len(tasks)} shards.")
+
+    # 3. Generate shard paralel; stok dijumlahkan inkremental
+    stock_quantities = None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Tidak menyimpan list futures sendiri: hasil shard yang sudah diproses dilepas
+        # dari memori oleh as_completed
+        futures = as_completed([
+            pool.submit(generate_shard, task, config, master_data, hot_product_ids, part_dir, seed, file_format)
+            for task in tasks
+        ])
+        for done, future in enumerate(futures, start=1):
+            summary, partial = future.result()
+            for table_name, entry in summary.items():
+                merged = manifest.setdefault(table_name, {'columns': entry['columns'], 'rows': 0, 'parts': []})
+                merged['rows'] += entry['rows']
+                merged['parts'].extend(entry['parts'])
+            if partial is not None:
+                stock_quantities = partial if stock_quantities is None else stock_quantities.add(partial, fill_value=0)
+            print(f"  -> Shard {done}/{len(tasks)} done")
+
+    # 4. Snapshot stok dari total kuantitas semua shard
+    print("Calculating current 'stock' table from shard totals...")
+    stock_seed = np.random.SeedSequence(seed, spawn_key=(STOCK_STREAM,))
+    gen.seed_everything(stock_seed)
+    if stock_quantities is None:
+        stock_quantities = pd.Series(dtype='int64', index=pd.MultiIndex.from_arrays(
+            [[], []], names=['product_id', 'warehouse_id']), name='quantity')
+    df_stock = gen.build_current_stock(stock_quantities.astype('int64').sort_index(), master_data,
+                                       np.random.default_rng(stock_seed))
+    parts = write_parts(df_stock, 'stock', part_dir)
+    manifest['stock'] = {'columns': list(df_stock.columns), 'rows': len(df_stock),
+                         'parts': [part.relative_to(part_dir).as_posix() for part in parts]}
+
+    # Urutkan sesuai foreign key & nama part agar manifest deterministik
+    manifest = {
+        table_name: {**manifest[table_name], 'parts': sorted(manifest[table_name]['parts'])}
+        for table_name in gen.TABLE_ORDER if table_name in manifest
+    }
+    if file_format == 'copy':
+        gen.write_copy_manifest(part_dir, manifest)
+    else:
+        gen.write_manifest(part_dir, manifest)
+
+    total_rows = sum(entry['rows'] for entry in manifest.values())
+    print(f"\nGenerated {total_rows} rows in {time.perf_counter() - start:.1f}s. "
+          f"{file_format.upper()} data written to {part_dir}")
+    return manifest
@@ -58,21 +58,135 @@ END;
 $$ LANGUAGE plpgsql;
 
 
+-- ###############################################################
+-- Task 3.1b: Bulk Stock Movement Function
+-- Versi set-based dari `record_stock_movement` untuk sistem yang
+-- mengirim ribuan pergerakan sekaligus (receiving, picking).
+-- Input: array JSONB, satu objek per pergerakan, misal
+--   [{"product_id": 1, "warehouse_id": 2, "movement_type": "IN",
+--     "quantity": 10, "reference_type": "PURCHASE_ORDER",
+--     "reference_id": 5, "notes": "..."}, ...]
+-- Dalam satu statement:
+-- 1. Semua pergerakan di-INSERT ke 'stock_movements' (urutan input).
+-- 2. Delta dijumlahkan per (produk, gudang) lalu di-UPSERT ke 'stock'
+--    sekali per baris, berurutan menurut key agar batch yang berjalan
+--    bersamaan selalu mengunci baris 'stock' dalam urutan yang sama
+--    (tidak deadlock).
+-- Batch bersifat atomik: jika satu pergerakan gagal, semuanya batal.
+-- ###############################################################
+CREATE OR REPLACE FUNCTION record_stock_movements_bulk(
+    p_movements JSONB
+)
+RETURNS JSON AS $$
+DECLARE
+    v_result JSON;
+BEGIN
+    WITH input AS (
+        SELECT m.*, t.ord
+        FROM jsonb_array_elements(p_movements) WITH ORDINALITY AS t(elem, ord)
+        CROSS JOIN LATERAL jsonb_to_record(t.elem) AS m(
+            product_id INT,
+            warehouse_id INT,
+            movement_type movement_type,
+            quantity INT,
+            reference_type reference_type,
+            reference_id INT,
+            notes TEXT
+        )
+    ),
+    -- 1. Masukkan ke tabel log (source of truth)
+    inserted AS (
+        INSERT INTO stock_movements (
+            product_id, warehouse_id, movement_type,
+            quantity, reference_type, reference_id, notes, movement_date
+        )
+        SELECT
+            product_id, warehouse_id, movement_type,
+            quantity, reference_type, reference_id, notes, CURRENT_TIMESTAMP
+        FROM input
+        ORDER BY ord
+        RETURNING movement_id, product_id, warehouse_id, quantity
+    ),
+    -- 2. Satu delta per (produk, gudang)
+    deltas AS (
+        SELECT product_id, warehouse_id, SUM(quantity)::INT AS delta
+        FROM inserted
+        GROUP BY product_id, warehouse_id
+    ),
+    -- 3. UPSERT snapshot 'stock' dalam urutan key yang deterministik
+    upserted AS (
+        INSERT INTO stock (product_id, warehouse_id, quantity_on_hand, updated_at)
+        SELECT product_id, warehouse_id, delta, CURRENT_TIMESTAMP
+        FROM deltas
+        ORDER BY product_id, warehouse_id
+        ON CONFLICT (product_id, warehouse_id)
+        DO UPDATE SET
+            quantity_on_hand = stock.quantity_on_hand + EXCLUDED.quantity_on_hand,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING product_id
+    )
+    SELECT json_build_object(
+        'status', 'success',
+        'movements_recorded', (SELECT COUNT(*) FROM inserted),
+        'stock_rows_updated', (SELECT COUNT(*) FROM upserted),
+        'first_movement_id', (SELECT MIN(movement_id) FROM inserted),
+        'last_movement_id', (SELECT MAX(movement_id) FROM inserted)
+    )
+    INTO v_result;
+
+    RETURN v_result;
+
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN json_build_object(
+            'status', 'error',
+            'message', SQLERRM
+        );
+END;
+$$ LANGUAGE plpgsql;
+
+
 -- ###############################################################
 -- Task 3.2: Stock Transfer Function [cite: 101]
 -- Fungsi ini meng-orkestrasi transfer antar gudang dengan
 -- memanggil `record_stock_movement` dua kali.
+--
+-- Aman untuk transfer bersamaan:
+-- 1. Kedua baris 'stock' (asal & tujuan) dikunci FOR UPDATE SEBELUM stok
+--    dicek, sehingga dua transfer dari gudang yang sama tidak bisa sama-sama
+--    lolos pengecekan (oversell).
+-- 2. Baris dikunci dalam urutan key yang kanonik (product_id, warehouse_id),
+--    sama dengan urutan UPSERT record_stock_movements_bulk. Transfer A->B dan
+--    B->A yang berjalan bersamaan mengunci dalam urutan yang sama sehingga
+--    tidak saling deadlock.
+-- 3. p_lock_mode:
+--      'WAIT'        : tunggu sampai baris bebas (default);
+--      'NOWAIT'      : gagal cepat jika ada baris yang sedang dikunci;
+--      'SKIP_LOCKED' : lewati baris yang dikunci; jika tidak kedua baris
+--                      didapat, transfer gagal cepat.
+--    Gagal cepat mengembalikan status 'busy' (bisa di-retry oleh client);
+--    kunci yang sempat diambil dilepas karena blok EXCEPTION me-rollback
+--    sub-transaksi fungsi. Baris asal yang tidak ada bukan 'busy', melainkan
+--    stok tidak mencukupi (sama dengan mode WAIT).
+-- 4. Baris tujuan (quantity 0) hanya dibuat setelah pre-check stok asal lolos;
+--    kegagalan setelahnya di-RAISE (SQLSTATE ST001) agar baris tersebut dan
+--    entri audit-nya ikut di-rollback.
 -- ###############################################################
+-- Signature lama (5 argumen) dihapus agar panggilan tanpa p_lock_mode tidak ambigu
+DROP FUNCTION IF EXISTS transfer_stock(INT, INT, INT, INT, TEXT);
+
 CREATE OR REPLACE FUNCTION transfer_stock(
     p_product_id INT,
     p_from_warehouse_id INT,
     p_to_warehouse_id INT,
     p_quantity INT,
-    p_notes TEXT
+    p_notes TEXT,
+    p_lock_mode TEXT DEFAULT 'WAIT'
 )
 RETURNS JSON AS $$
 DECLARE
     v_current_stock INT;
+    v_locked_rows INT;
     v_transfer_notes_out TEXT;
     v_transfer_notes_in TEXT;
     v_response_out JSON;
@@ -88,19 +202,70 @@ BEGIN
         RETURN json_build_object('status', 'error', 'message', 'Gudang asal dan tujuan tidak boleh sama');
     END IF;
 
-    -- Validasi 3: Cek ketersediaan stok di gudang asal
+    IF p_lock_mode NOT IN ('WAIT', 'NOWAIT', 'SKIP_LOCKED') THEN
+        RETURN json_build_object('status', 'error', 'message', 'p_lock_mode harus WAIT, NOWAIT, atau SKIP_LOCKED');
+    END IF;
+
+    -- Pre-check tanpa kunci: transfer yang jelas gagal (baris asal tidak ada /
+    -- stok kurang) ditolak sebelum baris tujuan dibuat
     SELECT quantity_on_hand INTO v_current_stock
     FROM stock
     WHERE product_id = p_product_id AND warehouse_id = p_from_warehouse_id;
 
     IF v_current_stock IS NULL OR v_current_stock < p_quantity THEN
         RETURN json_build_object(
-            'status', 'error', 
+            'status', 'error',
             'message', 'Stok tidak mencukupi di gudang asal',
             'current_stock', COALESCE(v_current_stock, 0)
         );
     END IF;
 
+    -- Pastikan baris tujuan ada, agar kedua baris bisa dikunci dengan urutan yang sama.
+    -- Semua jalur gagal setelah ini memakai RAISE, sehingga blok EXCEPTION ikut
+    -- me-rollback baris tujuan (dan entri audit INSERT-nya)
+    IF NOT EXISTS (SELECT 1 FROM stock WHERE product_id = p_product_id AND warehouse_id = p_to_warehouse_id) THEN
+        INSERT INTO stock (product_id, warehouse_id, quantity_on_hand)
+        VALUES (p_product_id, p_to_warehouse_id, 0)
+        ON CONFLICT (product_id, warehouse_id) DO NOTHING;
+    END IF;
+
+    -- Kunci kedua baris dalam urutan warehouse_id (product_id sama)
+    IF p_lock_mode = 'NOWAIT' THEN
+        PERFORM 1 FROM stock
+        WHERE product_id = p_product_id AND warehouse_id IN (p_from_warehouse_id, p_to_warehouse_id)
+        ORDER BY warehouse_id
+        FOR UPDATE NOWAIT;
+    ELSIF p_lock_mode = 'SKIP_LOCKED' THEN
+        PERFORM 1 FROM stock
+        WHERE product_id = p_product_id AND warehouse_id IN (p_from_warehouse_id, p_to_warehouse_id)
+        ORDER BY warehouse_id
+        FOR UPDATE SKIP LOCKED;
+        GET DIAGNOSTICS v_locked_rows = ROW_COUNT;
+        -- 'busy' hanya jika baris asal ada tetapi dilewati; baris asal yang hilang
+        -- (dihapus sejak pre-check) = stok tidak mencukupi, bukan untuk di-retry
+        IF v_locked_rows < 2 THEN
+            IF NOT EXISTS (SELECT 1 FROM stock WHERE product_id = p_product_id AND warehouse_id = p_from_warehouse_id) THEN
+                v_current_stock := NULL;
+                RAISE EXCEPTION 'Stok tidak mencukupi di gudang asal' USING ERRCODE = 'ST001';
+            END IF;
+            RAISE EXCEPTION 'Baris stok sedang dikunci transaksi lain' USING ERRCODE = 'lock_not_available';
+        END IF;
+    ELSE
+        PERFORM 1 FROM stock
+        WHERE product_id = p_product_id AND warehouse_id IN (p_from_warehouse_id, p_to_warehouse_id)
+        ORDER BY warehouse_id
+        FOR UPDATE;
+    END IF;
+
+    -- Validasi 3: Cek ulang ketersediaan stok di gudang asal (baris sudah terkunci)
+    SELECT quantity_on_hand INTO v_current_stock
+    FROM stock
+    WHERE product_id = p_product_id AND warehouse_id = p_from_warehouse_id;
+
+    IF v_current_stock IS NULL OR v_current_stock < p_quantity THEN
+        RAISE EXCEPTION 'Stok tidak mencukupi di gudang asal' USING ERRCODE = 'ST001';
+    END IF;
+
     -- Buat catatan transfer
     v_transfer_notes_out := 'Transfer OUT ke ' || p_to_warehouse_id || '. ' || COALESCE(p_notes, '');
     v_transfer_notes_in := 'Transfer IN dari ' || p_from_warehouse_id || '. ' || COALESCE(p_notes, '');
@@ -113,12 +278,18 @@ BEGIN
     );
 
     -- Panggil fungsi record_stock_movement (IN ke gudang tujuan)
-    -- Kuantitas adalah positif
+    -- Kuantitas adalah positif. reference_id = movement_id sisi OUT
+    -- (kolom reference_id bertipe INT, tidak ada cast implisit dari BIGINT)
     v_response_in := record_stock_movement(
         p_product_id, p_to_warehouse_id, 'TRANSFER', 
-        p_quantity, 'STOCK_TRANSFER', (v_response_out->>'movement_id')::BIGINT, v_transfer_notes_in
+        p_quantity, 'STOCK_TRANSFER', (v_response_out->>'movement_id')::INT, v_transfer_notes_in
     );
 
+    -- Jangan biarkan transfer setengah jadi (OUT tercatat, IN gagal)
+    IF v_response_out->>'status' <> 'success' OR v_response_in->>'status' <> 'success' THEN
+        RAISE EXCEPTION 'Transfer gagal dicatat: %', COALESCE(v_response_in->>'message', v_response_out->>'message');
+    END IF;
+
     RETURN json_build_object(
         'status', 'success',
         'transfer_out', v_response_out,
@@ -126,10 +297,23 @@ BEGIN
     );
 
 EXCEPTION
+    WHEN lock_not_available THEN
+        RETURN json_build_object(
+            'status', 'busy',
+            'message', SQLERRM
+        );
+    WHEN SQLSTATE 'ST001' THEN
+        -- Stok berubah sejak pre-check: baris tujuan yang sempat dibuat ikut di-rollback
+        RETURN json_build_object(
+            'status', 'error',
+            'message', SQLERRM,
+            'current_stock', COALESCE(v_current_stock, 0)
+        );
     WHEN OTHERS THEN
         RETURN json_build_object(
             'status', 'error',
-            'message', SQLERRM
+            'message', SQLERRM,
+            'sqlstate', SQLSTATE
         );
 END;
 $$ LANGUAGE plpgsql;
@@ -139,6 +323,9 @@ $$ LANGUAGE plpgsql;
 -- Task 3.3: Reorder Alert Function [cite: 115]
 -- Fungsi ini mengembalikan tabel produk yang stoknya
 -- telah mencapai atau di bawah reorder point.
+-- Dibaca dari alert terbuka di 'reorder_alerts' (dipelihara trigger, lihat
+-- triggers.sql Task 3.6): biaya sebanding jumlah alert, bukan jumlah baris 'stock'.
+-- Kuantitas & reorder point tetap diambil dari 'stock' (lookup primary key).
 -- ###############################################################
 CREATE OR REPLACE FUNCTION check_reorder_points(
     p_warehouse_id INT DEFAULT NULL
@@ -164,14 +351,14 @@ BEGIN
         s.quantity_on_hand,
         s.reorder_point,
         (s.reorder_point - s.quantity_on_hand) AS deficit
-    FROM stock s
+    FROM reorder_alerts a
+    JOIN stock s ON s.product_id = a.product_id AND s.warehouse_id = a.warehouse_id
     JOIN products p ON s.product_id = p.product_id
     JOIN warehouses w ON s.warehouse_id = w.warehouse_id
     WHERE 
-        s.quantity_on_hand <= s.reorder_point
-        AND s.quantity_on_hand > 0 -- Asumsi kita tidak reorder yang stoknya 0
+        a.resolved_at IS NULL -- Kondisi stok (0 < qty <= reorder point) dijaga trigger
         -- Filter berdasarkan warehouse jika parameter diberikan
-        AND (p_warehouse_id IS NULL OR s.warehouse_id = p_warehouse_id);
+        AND (p_warehouse_id IS NULL OR a.warehouse_id = p_warehouse_id);
 END;
 $$ LANGUAGE plpgsql;
 
@@ -193,24 +380,13 @@ RETURNS TABLE (
 ) AS $$
 BEGIN
     IF p_method = 'AVG' THEN
-        -- Metode AVG: Menggunakan Weighted Average Cost dari semua PO yang 'COMPLETED'
+        -- Metode AVG: Menggunakan Weighted Average Cost dari semua PO yang 'COMPLETED'.
+        -- Biaya rata-rata dibaca dari 'product_cost' (dipelihara trigger saat PO
+        -- selesai/dibatalkan, lihat triggers.sql Task 3.7), bukan dihitung ulang
+        -- dari seluruh histori PO.
         RETURN QUERY
         WITH 
-        -- 1. Hitung biaya rata-rata tertimbang per produk dari PO yang selesai
-        product_avg_cost AS (
-            SELECT
-                pod.product_id,
-                -- Mencegah pembagian dengan nol
-                CASE 
-                    WHEN SUM(pod.quantity) = 0 THEN 0
-                    ELSE SUM(pod.quantity * pod.unit_price) / SUM(pod.quantity)
-                END AS avg_cost
-            FROM purchase_order_details pod
-            JOIN purchase_orders po ON pod.po_id = po.po_id
-            WHERE po.status = 'COMPLETED'
-            GROUP BY pod.product_id
-        ),
-        -- 2. Agregat stok total per produk di semua gudang
+        -- 1. Agregat stok total per produk di semua gudang
         total_stock_per_product AS (
             SELECT
                 s.product_id,
@@ -218,16 +394,16 @@ BEGIN
             FROM stock s
             GROUP BY s.product_id
         )
-        -- 3. Gabungkan semua
+        -- 2. Gabungkan dengan biaya rata-rata per produk
         SELECT 
             ts.product_id,
             p.name AS product_name,
             ts.total_quantity,
-            COALESCE(pac.avg_cost, 0.00)::DECIMAL(12, 2) AS weighted_avg_cost,
-            (ts.total_quantity * COALESCE(pac.avg_cost, 0.00))::DECIMAL(16, 2) AS total_value
+            COALESCE(pc.avg_cost, 0.00)::DECIMAL(12, 2) AS weighted_avg_cost,
+            (ts.total_quantity * COALESCE(pc.avg_cost, 0.00))::DECIMAL(16, 2) AS total_value
         FROM total_stock_per_product ts
         JOIN products p ON ts.product_id = p.product_id
-        LEFT JOIN product_avg_cost pac ON ts.product_id = pac.product_id
+        LEFT JOIN product_cost pc ON ts.product_id = pc.product_id
         WHERE ts.total_quantity > 0;
 
     ELSE
@@ -237,4 +413,76 @@ BEGIN
         RAISE EXCEPTION 'Metode % belum diimplementasikan. Gunakan ''AVG''.', p_method;
     END IF;
 END;
-$$ LANGUAGE plpgsql;
\ No newline at end of file
+$$ LANGUAGE plpgsql;
+
+-- ###############################################################
+-- Task 3.8: Dead Stock Function
+-- Mengembalikan baris 'stock' (qty > 0) yang tidak bergerak lebih dari
+-- p_days hari penuh (sama dengan definisi ETL: floor(hari sejak pergerakan
+-- terakhir) > p_days, atau tidak pernah bergerak), beserta nilai stoknya
+-- (biaya rata-rata dari 'product_cost', lihat triggers.sql Task 3.7).
+--
+-- Memakai index (product_id, warehouse_id, movement_date DESC) dari
+-- database/migrations/002_movements_covering_index.sql, tanpa agregasi
+-- MAX(movement_date) atas seluruh histori pergerakan:
+-- 1. Anti-join "ada pergerakan setelah batas?" = satu index-only scan per
+--    baris 'stock'; pada tabel ter-partisi hanya partisi setelah batas yang
+--    di-scan (partition pruning saat eksekusi).
+-- 2. Tanggal pergerakan terakhir (ORDER BY ... DESC LIMIT 1 pada index yang
+--    sama) hanya dicari untuk baris yang lolos langkah 1.
+-- Pergerakan bertanggal di masa depan (isu DQ 'future_date') diabaikan,
+-- sama seperti pipeline ETL.
+-- ###############################################################
+CREATE OR REPLACE FUNCTION find_dead_stock(
+    p_days INT,
+    p_warehouse_id INT DEFAULT NULL
+)
+RETURNS TABLE (
+    product_id INT,
+    warehouse_id INT,
+    quantity_on_hand INT,
+    last_movement_date TIMESTAMPTZ,
+    days_since_last_movement INT,
+    avg_cost DECIMAL,
+    stock_value DECIMAL
+) AS $$
+DECLARE
+    v_now TIMESTAMPTZ := now();
+    v_cutoff TIMESTAMPTZ := now() - make_interval(days => p_days + 1);
+BEGIN
+    RETURN QUERY
+    WITH dead AS (
+        SELECT s.product_id, s.warehouse_id, s.quantity_on_hand
+        FROM stock s
+        WHERE s.quantity_on_hand > 0
+          AND (p_warehouse_id IS NULL OR s.warehouse_id = p_warehouse_id)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM stock_movements m
+              WHERE m.product_id = s.product_id
+                AND m.warehouse_id = s.warehouse_id
+                AND m.movement_date > v_cutoff
+                AND m.movement_date <= v_now
+          )
+    )
+    SELECT
+        d.product_id,
+        d.warehouse_id,
+        d.quantity_on_hand,
+        lm.movement_date AS last_movement_date,
+        EXTRACT(DAY FROM v_now - lm.movement_date)::INT AS days_since_last_movement, -- NULL: tidak pernah bergerak
+        COALESCE(pc.avg_cost, 0.00)::DECIMAL(12, 2) AS avg_cost,
+        (d.quantity_on_hand * COALESCE(pc.avg_cost, 0.00))::DECIMAL(16, 2) AS stock_value
+    FROM dead d
+    LEFT JOIN LATERAL (
+        SELECT m.movement_date
+        FROM stock_movements m
+        WHERE m.product_id = d.product_id
+          AND m.warehouse_id = d.warehouse_id
+          AND m.movement_date <= v_cutoff
+        ORDER BY m.movement_date DESC
+        LIMIT 1
+    ) lm ON TRUE
+    LEFT JOIN product_cost pc ON d.product_id = pc.product_id;
+END;
+$$ LANGUAGE plpgsql;
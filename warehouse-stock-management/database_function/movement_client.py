@@ -0,0 +1,84 @@
+"""
+Client Python untuk mencatat pergerakan stok secara batch.
+
+Pergerakan dikumpulkan di memori lalu dikirim sekaligus ke
+`record_stock_movements_bulk(jsonb)` (lihat functions.sql, Task 3.1b): satu
+round-trip & satu transaksi per batch, bukan satu per pergerakan.
+
+Contoh:
+    with MovementBatcher(dsn, batch_size=1000) as batcher:
+        for scan in receiving_scans:
+            batcher.add(scan.product_id, scan.warehouse_id, 'IN', scan.qty,
+                        reference_type='PURCHASE_ORDER', reference_id=scan.po_id)
+    # sisa batch otomatis di-flush saat keluar dari blok `with`
+
+Untuk bulk load terpercaya (migrasi, replay histori) gunakan `skip_audit=True`:
+perubahan 'stock' dari koneksi ini tidak dicatat ke stock_audit_log
+(GUC `session.is_bulk_load`, lihat triggers.sql).
+"""
+import psycopg2
+from psycopg2.extras import Json
+
+
+class MovementBatchError(Exception):
+    """Batch ditolak database; tidak ada pergerakan dari batch tersebut yang tersimpan."""
+
+
+class MovementBatcher:
+    def __init__(self, dsn, batch_size=1000, skip_audit=False):
+        self.conn = psycopg2.connect(dsn)
+        # Setiap panggilan fungsi = satu transaksi (fungsi bulk sudah atomik)
+        self.conn.autocommit = True
+        if skip_audit:
+            with self.conn.cursor() as cur:
+                cur.execute("SET session.is_bulk_load = 'on'")
+        self.batch_size = batch_size
+        self.pending = []
+        self.recorded = 0
+
+    def add(self, product_id, warehouse_id, movement_type, quantity,
+            reference_type=None, reference_id=None, notes=None):
+        """Menambahkan satu pergerakan; batch dikirim otomatis jika sudah penuh."""
+        self.pending.append({
+            'product_id': product_id,
+            'warehouse_id': warehouse_id,
+            'movement_type': movement_type,
+            'quantity': quantity,
+            'reference_type': reference_type,
+            'reference_id': reference_id,
+            'notes': notes,
+        })
+        if len(self.pending) >= self.batch_size:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """
+        Mengirim semua pergerakan yang tertunda. Mengembalikan hasil JSON fungsi
+        (None jika tidak ada yang dikirim). Jika database menolak batch, batch tetap
+        ada di `pending` dan MovementBatchError dilempar.
+        """
+        if not self.pending:
+            return None
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT record_stock_movements_bulk(%s)", (Json(self.pending),))
+            result = cur.fetchone()[0]
+        if result['status'] != 'success':
+            raise MovementBatchError(f"Batch {len(self.pending)} pergerakan ditolak: {result['message']}")
+        self.recorded += result['movements_recorded']
+        self.pending = []
+        return result
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            # Jangan kirim sisa batch jika blok `with` berakhir karena error
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
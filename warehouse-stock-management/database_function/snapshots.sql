@@ -0,0 +1,372 @@
+-- ###############################################################
+-- Task 3.9: Snapshot Harian Stok (stock_daily_snapshot)
+-- 'stock' hanya menyimpan posisi saat ini. Tabel fakta ini menyimpan posisi
+-- stok per (hari, produk, gudang) sehingga posisi di masa lalu, rata-rata
+-- inventori, dan nilai inventori dari waktu ke waktu tidak perlu me-replay
+-- seluruh 'stock_movements'.
+--
+-- Tabel bersifat "sparse": satu baris hanya ditulis untuk (produk, gudang)
+-- yang posisinya berubah pada hari itu. Posisi pada hari D = baris terakhir
+-- dengan snapshot_date <= D (dibawa ke depan secara implisit). Hari memakai
+-- zona waktu UTC.
+--
+-- Posisi dihitung mundur dari 'stock' saat backfill (posisi hari D = stok
+-- saat ini - pergerakan setelah D), lalu maju secara inkremental (posisi
+-- kemarin + pergerakan hari ini), sehingga hari terakhir snapshot cocok
+-- dengan 'stock' walaupun stok awal tidak tercatat sebagai pergerakan.
+--
+-- Jalankan SETELAH functions.sql & triggers.sql. Harian (cron/orchestrator):
+--   SELECT extend_stock_daily_snapshot();  -- sampai kemarin (UTC)
+-- Backfill histori: backfill_stock_daily_snapshot() (satu koneksi) atau
+-- snapshot_backfill.py (chunk bulanan paralel).
+-- ###############################################################
+
+-- 1. Tabel fakta. Primary key (produk, gudang, tanggal) melayani lookup
+--    "posisi terakhir <= D" per key; index tanggal untuk scan rentang hari.
+CREATE TABLE IF NOT EXISTS stock_daily_snapshot (
+    snapshot_date DATE NOT NULL,
+    product_id INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    quantity_on_hand INT NOT NULL, -- Posisi stok di akhir hari
+    quantity_change INT NOT NULL,  -- Total pergerakan hari itu (0 untuk baris saldo awal)
+    PRIMARY KEY (product_id, warehouse_id, snapshot_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_daily_snapshot_date ON stock_daily_snapshot (snapshot_date);
+
+-- Hari terakhir yang sudah lengkap di snapshot (satu baris). Hari tanpa
+-- pergerakan tidak menghasilkan baris, jadi MAX(snapshot_date) tidak cukup.
+CREATE TABLE IF NOT EXISTS stock_daily_snapshot_state (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    last_snapshot_date DATE NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Total pergerakan per chunk backfill (hanya dipakai selama backfill, tidak
+-- di-WAL). Baris dengan chunk_start = p_until + 1 menyimpan posisi akhir
+-- (jangkar dari 'stock').
+CREATE UNLOGGED TABLE IF NOT EXISTS stock_daily_snapshot_backfill (
+    chunk_start DATE NOT NULL,
+    product_id INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    quantity BIGINT NOT NULL,
+    PRIMARY KEY (chunk_start, product_id, warehouse_id)
+);
+
+
+-- 2. Perpanjangan inkremental: hari (last_snapshot_date, p_until] dihitung
+--    dari posisi terakhir + delta harian, hanya untuk key yang bergerak.
+--    Posisi sebelumnya dicari per key yang berubah lewat primary key (satu
+--    descent index), bukan dari seluruh tabel.
+--    p_from: hitung ulang mulai hari tersebut (misal ada pergerakan yang
+--    di-backdate); baris >= p_from dihapus lebih dulu.
+--    Hari ini (UTC) belum lengkap dan tidak pernah di-snapshot.
+--    Mengembalikan jumlah baris yang ditulis.
+CREATE OR REPLACE FUNCTION extend_stock_daily_snapshot(
+    p_until DATE DEFAULT NULL,
+    p_from DATE DEFAULT NULL
+)
+RETURNS INT AS $$
+DECLARE
+    v_yesterday DATE := (now() AT TIME ZONE 'UTC')::DATE - 1;
+    v_until DATE := LEAST(COALESCE(p_until, v_yesterday), v_yesterday);
+    v_last DATE;
+    v_rows INT;
+BEGIN
+    -- Satu pembangun snapshot pada satu waktu (sama dengan backfill)
+    PERFORM pg_advisory_xact_lock(hashtext('stock_daily_snapshot'));
+
+    SELECT last_snapshot_date INTO v_last FROM stock_daily_snapshot_state;
+    IF v_last IS NULL THEN
+        RAISE EXCEPTION 'stock_daily_snapshot belum di-backfill. Jalankan backfill_stock_daily_snapshot() atau snapshot_backfill.py.';
+    END IF;
+
+    IF p_from IS NOT NULL AND p_from <= v_last THEN
+        -- Baris saldo awal (hari sebelum pergerakan pertama) harus tetap ada
+        IF p_from <= (SELECT MIN(snapshot_date) FROM stock_daily_snapshot) THEN
+            RAISE EXCEPTION 'p_from % sebelum awal snapshot, jalankan backfill ulang.', p_from;
+        END IF;
+        DELETE FROM stock_daily_snapshot WHERE snapshot_date >= p_from;
+        v_last := p_from - 1;
+    END IF;
+
+    IF v_until <= v_last THEN
+        RETURN 0;
+    END IF;
+
+    WITH daily AS (
+        SELECT
+            (m.movement_date AT TIME ZONE 'UTC')::DATE AS snapshot_date,
+            m.product_id,
+            m.warehouse_id,
+            SUM(m.quantity) AS quantity_change
+        FROM stock_movements m
+        WHERE m.movement_date >= ((v_last + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+          AND m.movement_date < ((v_until + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+        GROUP BY 1, 2, 3
+        HAVING SUM(m.quantity) <> 0
+    ),
+    previous AS (
+        SELECT k.product_id, k.warehouse_id, COALESCE(prev.quantity_on_hand, 0) AS quantity_on_hand
+        FROM (SELECT DISTINCT product_id, warehouse_id FROM daily) k
+        LEFT JOIN LATERAL (
+            SELECT s.quantity_on_hand
+            FROM stock_daily_snapshot s
+            WHERE s.product_id = k.product_id
+              AND s.warehouse_id = k.warehouse_id
+              AND s.snapshot_date <= v_last
+            ORDER BY s.snapshot_date DESC
+            LIMIT 1
+        ) prev ON TRUE
+    )
+    INSERT INTO stock_daily_snapshot (snapshot_date, product_id, warehouse_id, quantity_on_hand, quantity_change)
+    SELECT
+        d.snapshot_date,
+        d.product_id,
+        d.warehouse_id,
+        p.quantity_on_hand + SUM(d.quantity_change) OVER (
+            PARTITION BY d.product_id, d.warehouse_id ORDER BY d.snapshot_date
+        ),
+        d.quantity_change
+    FROM daily d
+    JOIN previous p ON p.product_id = d.product_id AND p.warehouse_id = d.warehouse_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    UPDATE stock_daily_snapshot_state
+    SET last_snapshot_date = v_until, updated_at = CURRENT_TIMESTAMP;
+
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- 3. Backfill dalam chunk tanggal yang bisa dijalankan paralel (satu koneksi
+--    per chunk, lihat snapshot_backfill.py):
+--    a. snapshot_backfill_prepare  : kosongkan snapshot, simpan jangkar
+--       (posisi akhir hari p_until = stok - pergerakan setelahnya; satu
+--       statement, konsisten terhadap pergerakan yang masuk bersamaan).
+--    b. snapshot_backfill_totals   : total pergerakan per key dalam chunk
+--       (paralel, setiap chunk hanya membaca rentang tanggalnya).
+--    c. snapshot_backfill_chunk    : baris harian chunk; posisi awal chunk =
+--       jangkar - total semua chunk setelahnya (paralel, setelah semua b).
+--    d. snapshot_backfill_finish   : baris saldo awal & state.
+--    Pemanggil menjaga urutan a -> semua b -> semua c -> d dan memegang
+--    pg_advisory_lock(hashtext('stock_daily_snapshot')) selama backfill.
+
+-- a. Mengembalikan hari pergerakan pertama (NULL jika tidak ada pergerakan).
+CREATE OR REPLACE FUNCTION snapshot_backfill_prepare(p_until DATE)
+RETURNS DATE AS $$
+DECLARE
+    v_first DATE;
+BEGIN
+    TRUNCATE stock_daily_snapshot, stock_daily_snapshot_backfill;
+    DELETE FROM stock_daily_snapshot_state;
+
+    INSERT INTO stock_daily_snapshot_backfill (chunk_start, product_id, warehouse_id, quantity)
+    SELECT p_until + 1, k.product_id, k.warehouse_id, SUM(k.quantity)
+    FROM (
+        SELECT s.product_id, s.warehouse_id, s.quantity_on_hand::BIGINT AS quantity
+        FROM stock s
+        UNION ALL
+        SELECT m.product_id, m.warehouse_id, -m.quantity
+        FROM stock_movements m
+        WHERE m.movement_date >= ((p_until + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+    ) k
+    GROUP BY k.product_id, k.warehouse_id;
+
+    SELECT (MIN(movement_date) AT TIME ZONE 'UTC')::DATE INTO v_first FROM stock_movements;
+    RETURN v_first;
+END;
+$$ LANGUAGE plpgsql;
+
+-- b. Mengembalikan jumlah key yang bergerak di chunk [p_from, p_to].
+CREATE OR REPLACE FUNCTION snapshot_backfill_totals(p_from DATE, p_to DATE)
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    INSERT INTO stock_daily_snapshot_backfill (chunk_start, product_id, warehouse_id, quantity)
+    SELECT p_from, m.product_id, m.warehouse_id, SUM(m.quantity)
+    FROM stock_movements m
+    WHERE m.movement_date >= (p_from::TIMESTAMP AT TIME ZONE 'UTC')
+      AND m.movement_date < ((p_to + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+    GROUP BY m.product_id, m.warehouse_id
+    HAVING SUM(m.quantity) <> 0;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- c. Mengembalikan jumlah baris snapshot yang ditulis untuk chunk [p_from, p_to].
+CREATE OR REPLACE FUNCTION snapshot_backfill_chunk(p_from DATE, p_to DATE, p_until DATE)
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    WITH base AS (
+        -- Posisi akhir hari (p_from - 1)
+        SELECT b.product_id, b.warehouse_id,
+               SUM(CASE WHEN b.chunk_start > p_until THEN b.quantity ELSE -b.quantity END) AS quantity
+        FROM stock_daily_snapshot_backfill b
+        WHERE b.chunk_start >= p_from
+        GROUP BY b.product_id, b.warehouse_id
+    ),
+    daily AS (
+        SELECT
+            (m.movement_date AT TIME ZONE 'UTC')::DATE AS snapshot_date,
+            m.product_id,
+            m.warehouse_id,
+            SUM(m.quantity) AS quantity_change
+        FROM stock_movements m
+        WHERE m.movement_date >= (p_from::TIMESTAMP AT TIME ZONE 'UTC')
+          AND m.movement_date < ((p_to + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+        GROUP BY 1, 2, 3
+        HAVING SUM(m.quantity) <> 0
+    )
+    INSERT INTO stock_daily_snapshot (snapshot_date, product_id, warehouse_id, quantity_on_hand, quantity_change)
+    SELECT
+        d.snapshot_date,
+        d.product_id,
+        d.warehouse_id,
+        COALESCE(b.quantity, 0) + SUM(d.quantity_change) OVER (
+            PARTITION BY d.product_id, d.warehouse_id ORDER BY d.snapshot_date
+        ),
+        d.quantity_change
+    FROM daily d
+    LEFT JOIN base b ON b.product_id = d.product_id AND b.warehouse_id = d.warehouse_id;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- d. Baris saldo awal (hari sebelum pergerakan pertama) untuk key dengan posisi
+--    awal <> 0, termasuk key yang tidak pernah bergerak. Mengembalikan jumlah
+--    baris saldo awal.
+CREATE OR REPLACE FUNCTION snapshot_backfill_finish(p_first DATE, p_until DATE)
+RETURNS INT AS $$
+DECLARE
+    v_rows INT;
+BEGIN
+    INSERT INTO stock_daily_snapshot (snapshot_date, product_id, warehouse_id, quantity_on_hand, quantity_change)
+    SELECT p_first - 1, b.product_id, b.warehouse_id,
+           SUM(CASE WHEN b.chunk_start > p_until THEN b.quantity ELSE -b.quantity END),
+           0
+    FROM stock_daily_snapshot_backfill b
+    GROUP BY b.product_id, b.warehouse_id
+    HAVING SUM(CASE WHEN b.chunk_start > p_until THEN b.quantity ELSE -b.quantity END) <> 0;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    INSERT INTO stock_daily_snapshot_state (last_snapshot_date) VALUES (p_until);
+    TRUNCATE stock_daily_snapshot_backfill;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill lengkap dalam satu transaksi/koneksi (chunk bulanan dijalankan
+-- berurutan). Untuk paralel gunakan snapshot_backfill.py. Mengembalikan
+-- jumlah baris snapshot.
+CREATE OR REPLACE FUNCTION backfill_stock_daily_snapshot(
+    p_until DATE DEFAULT NULL
+)
+RETURNS BIGINT AS $$
+DECLARE
+    v_until DATE := LEAST(COALESCE(p_until, (now() AT TIME ZONE 'UTC')::DATE - 1),
+                          (now() AT TIME ZONE 'UTC')::DATE - 1);
+    v_first DATE;
+    v_chunk DATE;
+    v_rows BIGINT;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('stock_daily_snapshot'));
+
+    v_first := snapshot_backfill_prepare(v_until);
+    IF v_first IS NOT NULL AND v_first <= v_until THEN
+        FOR v_chunk IN
+            SELECT generate_series(date_trunc('month', v_first::TIMESTAMP), v_until::TIMESTAMP, INTERVAL '1 month')::DATE
+        LOOP
+            PERFORM snapshot_backfill_totals(v_chunk, LEAST((v_chunk + INTERVAL '1 month')::DATE - 1, v_until));
+        END LOOP;
+        FOR v_chunk IN
+            SELECT generate_series(date_trunc('month', v_first::TIMESTAMP), v_until::TIMESTAMP, INTERVAL '1 month')::DATE
+        LOOP
+            PERFORM snapshot_backfill_chunk(v_chunk, LEAST((v_chunk + INTERVAL '1 month')::DATE - 1, v_until), v_until);
+        END LOOP;
+    END IF;
+    PERFORM snapshot_backfill_finish(COALESCE(LEAST(v_first, v_until + 1), v_until + 1), v_until);
+
+    SELECT COUNT(*) INTO v_rows FROM stock_daily_snapshot;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- 4. Posisi stok setiap baris 'stock' pada akhir hari p_date (lookup primary
+--    key per key, satu descent index). Setelah last_snapshot_date posisi
+--    terakhir yang diketahui dibawa ke depan.
+CREATE OR REPLACE FUNCTION stock_position_as_of(
+    p_date DATE,
+    p_warehouse_id INT DEFAULT NULL
+)
+RETURNS TABLE (
+    product_id INT,
+    warehouse_id INT,
+    quantity_on_hand INT
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT s.product_id, s.warehouse_id, pos.quantity_on_hand
+    FROM stock s
+    JOIN LATERAL (
+        SELECT ds.quantity_on_hand
+        FROM stock_daily_snapshot ds
+        WHERE ds.product_id = s.product_id
+          AND ds.warehouse_id = s.warehouse_id
+          AND ds.snapshot_date <= p_date
+        ORDER BY ds.snapshot_date DESC
+        LIMIT 1
+    ) pos ON TRUE
+    WHERE (p_warehouse_id IS NULL OR s.warehouse_id = p_warehouse_id);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- 5. Rata-rata posisi stok harian (tertimbang jumlah hari) per (produk, gudang)
+--    pada rentang [p_from, p_to], untuk turnover / DOH. Key tanpa baris
+--    snapshot tidak dikembalikan (rata-rata 0).
+CREATE OR REPLACE FUNCTION average_stock_quantity(
+    p_from DATE,
+    p_to DATE,
+    p_warehouse_id INT DEFAULT NULL
+)
+RETURNS TABLE (
+    product_id INT,
+    warehouse_id INT,
+    avg_quantity DECIMAL
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH positions AS (
+        -- Posisi di akhir p_from, lalu setiap perubahan setelahnya
+        SELECT a.product_id, a.warehouse_id, p_from AS snapshot_date, a.quantity_on_hand
+        FROM stock_position_as_of(p_from, p_warehouse_id) a
+        UNION ALL
+        SELECT ds.product_id, ds.warehouse_id, ds.snapshot_date, ds.quantity_on_hand
+        FROM stock_daily_snapshot ds
+        WHERE ds.snapshot_date > p_from AND ds.snapshot_date <= p_to
+          AND (p_warehouse_id IS NULL OR ds.warehouse_id = p_warehouse_id)
+    ),
+    segments AS (
+        SELECT
+            ps.product_id,
+            ps.warehouse_id,
+            ps.quantity_on_hand,
+            LEAD(ps.snapshot_date, 1, p_to + 1) OVER (
+                PARTITION BY ps.product_id, ps.warehouse_id ORDER BY ps.snapshot_date
+            ) - ps.snapshot_date AS days_held
+        FROM positions ps
+    )
+    SELECT sg.product_id, sg.warehouse_id,
+           (SUM(sg.quantity_on_hand::BIGINT * sg.days_held)::DECIMAL / (p_to - p_from + 1))::DECIMAL(14, 2)
+    FROM segments sg
+    GROUP BY sg.product_id, sg.warehouse_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -42,6 +42,41 @@ WHERE product_id = :test_product_id
 ORDER BY movement_id DESC LIMIT 1;
 
 
+-- ###############################################################
+-- Test 3.1b: record_stock_movements_bulk
+-- ###############################################################
+RAISE NOTICE 'Test 3.1b: Menjalankan record_stock_movements_bulk (3 pergerakan)...';
+
+-- Cek stok awal
+SELECT quantity_on_hand FROM stock WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1;
+
+-- +20 dan -8 di gudang 1 (satu UPSERT dengan delta +12), +3 di gudang 2
+SELECT record_stock_movements_bulk(jsonb_build_array(
+    jsonb_build_object('product_id', :test_product_id, 'warehouse_id', :test_warehouse_id_1,
+                       'movement_type', 'IN', 'quantity', 20,
+                       'reference_type', 'PURCHASE_ORDER', 'reference_id', 1),
+    jsonb_build_object('product_id', :test_product_id, 'warehouse_id', :test_warehouse_id_1,
+                       'movement_type', 'OUT', 'quantity', -8,
+                       'reference_type', 'SALES_ORDER', 'reference_id', 1),
+    jsonb_build_object('product_id', :test_product_id, 'warehouse_id', :test_warehouse_id_2,
+                       'movement_type', 'ADJUSTMENT', 'quantity', 3,
+                       'notes', 'Test case 3.1b')
+)) AS bulk_result;
+-- Harapan: movements_recorded = 3, stock_rows_updated = 2
+
+-- Cek stok akhir (stok awal + 12)
+SELECT quantity_on_hand FROM stock WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1;
+
+-- Batch dengan satu pergerakan tidak valid (quantity = 0) ditolak seluruhnya
+SELECT record_stock_movements_bulk(jsonb_build_array(
+    jsonb_build_object('product_id', :test_product_id, 'warehouse_id', :test_warehouse_id_1,
+                       'movement_type', 'IN', 'quantity', 5),
+    jsonb_build_object('product_id', :test_product_id, 'warehouse_id', :test_warehouse_id_1,
+                       'movement_type', 'IN', 'quantity', 0)
+)) AS bulk_error_result;
+-- Harapan: status = 'error', stok tidak berubah
+
+
 -- ###############################################################
 -- Test 3.2: transfer_stock
 -- ###############################################################
@@ -62,12 +97,43 @@ SELECT transfer_stock(
     p_notes := 'Test case 3.2: Transfer antar gudang'
 ) AS transfer_result;
 
+-- Mode gagal cepat: jika baris stok sedang dikunci transaksi lain,
+-- status = 'busy' (di sesi tunggal ini baris bebas, jadi status = 'success')
+SELECT transfer_stock(
+    p_product_id := :test_product_id,
+    p_from_warehouse_id := :test_warehouse_id_2,
+    p_to_warehouse_id := :test_warehouse_id_1,
+    p_quantity := 1,
+    p_notes := 'Test case 3.2: Transfer NOWAIT',
+    p_lock_mode := 'NOWAIT'
+) AS transfer_nowait_result;
+
 -- Cek stok akhir di kedua gudang
 RAISE NOTICE 'Stok akhir Gudang 1 (setelah transfer):';
 SELECT quantity_on_hand FROM stock WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1;
 RAISE NOTICE 'Stok akhir Gudang 2 (setelah transfer):';
 SELECT quantity_on_hand FROM stock WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_2;
 
+-- Baris stok asal tidak ada: SKIP_LOCKED harus melapor stok tidak mencukupi
+-- (bukan 'busy', yang mengajak client me-retry transfer yang tidak akan berhasil),
+-- dan transfer yang ditolak tidak meninggalkan baris stok tujuan
+RAISE NOTICE 'Test 3.2: Transfer dari baris stok yang tidak ada...';
+SAVEPOINT transfer_missing_source;
+DELETE FROM stock WHERE product_id = :test_product_id AND warehouse_id IN (:test_warehouse_id_1, :test_warehouse_id_2);
+SELECT transfer_stock(
+    p_product_id := :test_product_id,
+    p_from_warehouse_id := :test_warehouse_id_1,
+    p_to_warehouse_id := :test_warehouse_id_2,
+    p_quantity := 5,
+    p_notes := 'Test case 3.2: Asal tidak ada, SKIP_LOCKED',
+    p_lock_mode := 'SKIP_LOCKED'
+) AS transfer_missing_source_result;
+-- Harapan: status = 'error' (Stok tidak mencukupi di gudang asal), current_stock = 0
+SELECT COUNT(*) AS orphan_destination_rows
+FROM stock WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_2;
+-- Harapan: orphan_destination_rows = 0
+ROLLBACK TO SAVEPOINT transfer_missing_source;
+
 
 -- ###############################################################
 -- Test 3.3: check_reorder_points
@@ -82,6 +148,21 @@ RAISE NOTICE 'Test 3.3: Reorder untuk Gudang 1 saja...';
 SELECT * FROM check_reorder_points(:test_warehouse_id_1) LIMIT 10;
 
 
+-- Turunkan stok sampai tepat di reorder point -> alert terbuka
+RAISE NOTICE 'Test 3.3: Stok turun ke reorder point membuka alert...';
+UPDATE stock SET quantity_on_hand = reorder_point
+WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1;
+SELECT * FROM check_reorder_points(:test_warehouse_id_1) WHERE product_id = :test_product_id;
+-- Harapan: 1 baris, deficit = 0
+
+-- Naikkan lagi -> alert ditutup (resolved_at terisi)
+UPDATE stock SET quantity_on_hand = reorder_point + 100
+WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1;
+SELECT alert_id, raised_at, resolved_at FROM reorder_alerts
+WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1
+ORDER BY alert_id DESC LIMIT 1;
+
+
 -- ###############################################################
 -- Test 3.4: calculate_stock_value
 -- ###############################################################
@@ -92,6 +173,102 @@ SELECT * FROM calculate_stock_value('AVG')
 ORDER BY total_value DESC
 LIMIT 10;
 
+-- Biaya rata-rata dibaca dari product_cost; PO yang dibatalkan setelah
+-- COMPLETED mengurangi total produk-produknya
+RAISE NOTICE 'Test 3.4: Pembatalan PO COMPLETED memperbarui product_cost...';
+CREATE TEMP TABLE test_po AS
+SELECT MIN(po_id) AS po_id FROM purchase_orders WHERE status = 'COMPLETED';
+
+SELECT * FROM product_cost
+WHERE product_id IN (SELECT product_id FROM purchase_order_details WHERE po_id = (SELECT po_id FROM test_po))
+ORDER BY product_id;
+
+UPDATE purchase_orders SET status = 'CANCELLED'
+WHERE po_id = (SELECT po_id FROM test_po);
+
+SELECT * FROM product_cost
+WHERE product_id IN (SELECT product_id FROM purchase_order_details WHERE po_id = (SELECT po_id FROM test_po))
+ORDER BY product_id;
+-- Harapan: total_quantity & total_cost berkurang sebesar baris PO tersebut
+
+-- PO yang langsung di-INSERT sebagai COMPLETED (tanpa UPDATE status): detailnya
+-- dihitung trigger AFTER INSERT pada purchase_order_details
+RAISE NOTICE 'Test 3.4: Detail PO yang langsung COMPLETED memperbarui product_cost...';
+WITH new_po AS (
+    INSERT INTO purchase_orders (supplier_id, warehouse_id, status)
+    SELECT MIN(supplier_id), :test_warehouse_id_1, 'COMPLETED' FROM suppliers
+    RETURNING po_id
+)
+INSERT INTO purchase_order_details (po_id, product_id, quantity, unit_price)
+SELECT po_id, :test_product_id, 7, 12.50 FROM new_po;
+
+SELECT COUNT(*) AS mismatched_products
+FROM (
+    SELECT pod.product_id, SUM(pod.quantity) AS total_quantity, SUM(pod.quantity * pod.unit_price) AS total_cost
+    FROM purchase_order_details pod
+    JOIN purchase_orders po ON pod.po_id = po.po_id
+    WHERE po.status = 'COMPLETED'
+    GROUP BY pod.product_id
+) full_history
+FULL JOIN (SELECT * FROM product_cost WHERE total_quantity <> 0) pc USING (product_id)
+WHERE full_history.total_quantity IS DISTINCT FROM pc.total_quantity
+   OR full_history.total_cost IS DISTINCT FROM pc.total_cost;
+-- Harapan: mismatched_products = 0 (sama dengan hitung ulang dari seluruh histori PO)
+
+
+-- ###############################################################
+-- Test 3.8: find_dead_stock
+-- ###############################################################
+RAISE NOTICE 'Test 3.8: Menjalankan find_dead_stock (180 hari)...';
+
+-- 10 dead stock dengan nilai tertinggi (semua gudang, lalu gudang 1)
+SELECT * FROM find_dead_stock(180)
+ORDER BY stock_value DESC
+LIMIT 10;
+
+SELECT COUNT(*) AS dead_stock_rows, SUM(stock_value) AS dead_stock_value
+FROM find_dead_stock(180, :test_warehouse_id_1);
+
+-- Pergerakan baru mengeluarkan produk dari daftar dead stock
+CREATE TEMP TABLE test_dead AS
+SELECT product_id, warehouse_id FROM find_dead_stock(180) LIMIT 1;
+
+SELECT record_stock_movement(product_id, warehouse_id, 'IN', 1, NULL, NULL, 'Test dead stock')
+FROM test_dead;
+
+SELECT COUNT(*) AS still_dead FROM find_dead_stock(180) f
+JOIN test_dead t USING (product_id, warehouse_id);
+-- Harapan: still_dead = 0
+
+
+-- ###############################################################
+-- Test 3.9: Snapshot Harian Stok (butuh snapshots.sql & backfill)
+-- ###############################################################
+RAISE NOTICE 'Test 3.9: Menjalankan test snapshot harian stok...';
+
+-- Extend sampai kemarin (0 baris jika snapshot sudah terbaru)
+SELECT extend_stock_daily_snapshot() AS new_snapshot_rows;
+
+-- Posisi kemarin = stok sekarang - pergerakan sejak awal hari ini (UTC)
+SELECT COUNT(*) AS mismatched_positions
+FROM stock_position_as_of((now() AT TIME ZONE 'UTC')::DATE - 1) p
+JOIN stock s USING (product_id, warehouse_id)
+LEFT JOIN (
+    SELECT product_id, warehouse_id, SUM(quantity) AS today_quantity
+    FROM stock_movements
+    WHERE movement_date >= ((now() AT TIME ZONE 'UTC')::DATE::TIMESTAMP AT TIME ZONE 'UTC')
+    GROUP BY product_id, warehouse_id
+) t USING (product_id, warehouse_id)
+WHERE p.quantity_on_hand <> s.quantity_on_hand - COALESCE(t.today_quantity, 0);
+-- Harapan: mismatched_positions = 0
+
+-- Rata-rata 30 hari terakhir, gudang 1
+SELECT * FROM average_stock_quantity((now() AT TIME ZONE 'UTC')::DATE - 30,
+                                     (now() AT TIME ZONE 'UTC')::DATE - 1,
+                                     :test_warehouse_id_1)
+ORDER BY avg_quantity DESC
+LIMIT 10;
+
 
 -- ###############################################################
 -- Test 3.5: Audit Trigger
@@ -111,6 +288,31 @@ WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1
 ORDER BY log_id DESC
 LIMIT 1;
 
+-- UPDATE massal: satu statement -> satu INSERT audit berisi semua baris yang berubah
+RAISE NOTICE 'Melakukan UPDATE massal pada gudang 2...';
+UPDATE stock
+SET quantity_on_hand = quantity_on_hand + 1
+WHERE warehouse_id = :test_warehouse_id_2 AND product_id <= 5;
+
+SELECT operation_type, COUNT(*) AS audit_rows
+FROM stock_audit_log
+WHERE warehouse_id = :test_warehouse_id_2 AND product_id <= 5
+GROUP BY operation_type;
+
+-- Bypass bulk load: perubahan dalam transaksi ini TIDAK dicatat lagi
+RAISE NOTICE 'Test 3.5: UPDATE dengan session.is_bulk_load = on (tidak diaudit)...';
+SET LOCAL session.is_bulk_load = 'on';
+UPDATE stock
+SET quantity_on_hand = 8888
+WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1;
+
+-- Baris terakhir masih 9999 (dari UPDATE sebelumnya), bukan 8888
+SELECT new_quantity FROM stock_audit_log
+WHERE product_id = :test_product_id AND warehouse_id = :test_warehouse_id_1
+ORDER BY log_id DESC
+LIMIT 1;
+SET LOCAL session.is_bulk_load = 'off';
+
 
 RAISE NOTICE '--- Test Cases Selesai ---';
 RAISE NOTICE '--- ROLLBACK SEMUA PERUBAHAN TEST ---';
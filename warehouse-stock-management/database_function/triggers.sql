@@ -17,51 +17,339 @@ CREATE TABLE IF NOT EXISTS stock_audit_log (
     new_quantity INT
 );
 
--- 2. Buat Fungsi Trigger Audit
+-- 2. Buat Fungsi Trigger Audit (level STATEMENT)
+-- Dipanggil SEKALI per statement, bukan sekali per baris. Baris yang berubah
+-- dibaca dari transition table (old_rows / new_rows) dan dicatat dengan satu
+-- INSERT ... SELECT, sehingga UPDATE/UPSERT ribuan baris (misal
+-- record_stock_movements_bulk) hanya menambah satu INSERT ke log audit.
 CREATE OR REPLACE FUNCTION audit_stock_changes()
 RETURNS TRIGGER AS $$
 BEGIN
     IF (TG_OP = 'UPDATE') THEN
-        -- Hanya catat jika kuantitas benar-benar berubah
-        IF OLD.quantity_on_hand IS DISTINCT FROM NEW.quantity_on_hand THEN
-            INSERT INTO stock_audit_log (operation_type, product_id, warehouse_id, old_quantity, new_quantity)
-            VALUES ('UPDATE', OLD.product_id, OLD.warehouse_id, OLD.quantity_on_hand, NEW.quantity_on_hand);
-        END IF;
-        RETURN NEW;
+        -- Pasangkan baris lama & baru lewat primary key (product_id, warehouse_id).
+        -- Hanya catat jika kuantitas benar-benar berubah. Jika key ikut diubah,
+        -- baris tidak punya pasangan dan dicatat dengan salah satu sisi NULL.
+        INSERT INTO stock_audit_log (operation_type, product_id, warehouse_id, old_quantity, new_quantity)
+        SELECT 'UPDATE', product_id, warehouse_id, o.quantity_on_hand, n.quantity_on_hand
+        FROM old_rows o
+        FULL JOIN new_rows n USING (product_id, warehouse_id)
+        WHERE o.quantity_on_hand IS DISTINCT FROM n.quantity_on_hand;
     ELSIF (TG_OP = 'DELETE') THEN
         INSERT INTO stock_audit_log (operation_type, product_id, warehouse_id, old_quantity)
-        VALUES ('DELETE', OLD.product_id, OLD.warehouse_id, OLD.quantity_on_hand);
-        RETURN OLD;
+        SELECT 'DELETE', product_id, warehouse_id, quantity_on_hand
+        FROM old_rows;
     ELSIF (TG_OP = 'INSERT') THEN
         INSERT INTO stock_audit_log (operation_type, product_id, warehouse_id, new_quantity)
-        VALUES ('INSERT', NEW.product_id, NEW.warehouse_id, NEW.quantity_on_hand);
-        RETURN NEW;
+        SELECT 'INSERT', product_id, warehouse_id, quantity_on_hand
+        FROM new_rows;
     END IF;
-    RETURN NULL; -- Hasil tidak relevan untuk trigger AFTER
+    RETURN NULL; -- Hasil tidak relevan untuk trigger AFTER ... FOR EACH STATEMENT
 END;
 $$ LANGUAGE plpgsql;
 
 -- 3. Terapkan Trigger ke tabel 'stock'
--- Kita gunakan trigger 'AFTER' agar kita mencatat apa yang *sebenarnya* terjadi
--- Kita juga tidak ingin trigger ini aktif saat 'record_stock_movement' berjalan,
--- karena itu akan mencatat perubahan yang *diharapkan*.
--- Trigger ini lebih untuk melacak perubahan manual/ad-hoc.
+-- Kita gunakan trigger 'AFTER' agar kita mencatat apa yang *sebenarnya* terjadi.
+-- Semua perubahan dicatat, termasuk dari 'record_stock_movement' dan
+-- 'record_stock_movements_bulk' (INSERT ... ON CONFLICT DO UPDATE memicu trigger
+-- INSERT untuk baris baru dan trigger UPDATE untuk baris yang sudah ada).
+--
+-- Bypass untuk bulk load terpercaya (migrasi data, replay histori, koreksi massal
+-- yang sudah diaudit di tempat lain): set GUC sesi/transaksi
+--     SET LOCAL session.is_bulk_load = 'on';   -- hanya transaksi ini
+--     SET session.is_bulk_load = 'on';         -- seluruh sesi
+-- Kondisi WHEN dievaluasi sekali per statement; jika bernilai false fungsi
+-- audit tidak dipanggil sama sekali.
+--
+-- PostgreSQL hanya mengizinkan transition table pada trigger dengan satu event,
+-- sehingga dibuat tiga trigger yang memakai fungsi yang sama.
 
--- Hapus trigger lama jika ada, agar skrip ini idempotent
+-- Hapus trigger lama (termasuk versi FOR EACH ROW) agar skrip ini idempotent
 DROP TRIGGER IF EXISTS trg_stock_audit ON stock;
+DROP TRIGGER IF EXISTS trg_stock_audit_insert ON stock;
+DROP TRIGGER IF EXISTS trg_stock_audit_update ON stock;
+DROP TRIGGER IF EXISTS trg_stock_audit_delete ON stock;
 
-CREATE TRIGGER trg_stock_audit
-AFTER INSERT OR UPDATE OR DELETE ON stock
-FOR EACH ROW
--- Kita tambahkan kondisi WHEN agar trigger ini HANYA aktif
--- jika perubahan TIDAK berasal dari fungsi 'record_stock_movement'.
--- Ini MENGASUMSIKAN fungsi dijalankan oleh user/role tertentu,
--- atau kita bisa set GUC (misal SET session.is_bulk_load = true)
--- Untuk kesederhanaan, kita akan mencatat SEMUA perubahan.
--- Dalam skenario nyata, kita akan memfilter perubahan dari aplikasi.
--- WHEN (current_setting('session.app_user', true) IS NULL)
+CREATE TRIGGER trg_stock_audit_insert
+AFTER INSERT ON stock
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+WHEN (NOT COALESCE(NULLIF(current_setting('session.is_bulk_load', true), '')::BOOLEAN, false))
+EXECUTE FUNCTION audit_stock_changes();
+
+CREATE TRIGGER trg_stock_audit_update
+AFTER UPDATE ON stock
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+WHEN (NOT COALESCE(NULLIF(current_setting('session.is_bulk_load', true), '')::BOOLEAN, false))
 EXECUTE FUNCTION audit_stock_changes();
 
+CREATE TRIGGER trg_stock_audit_delete
+AFTER DELETE ON stock
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+WHEN (NOT COALESCE(NULLIF(current_setting('session.is_bulk_load', true), '')::BOOLEAN, false))
+EXECUTE FUNCTION audit_stock_changes();
+
+
+-- ###############################################################
+-- Task 3.6: Antrian Reorder Alert (dipelihara inkremental)
+-- Menyimpan daftar produk/gudang yang stoknya di bawah reorder point
+-- (0 < quantity_on_hand <= reorder_point) sehingga check_reorder_points()
+-- cukup membaca alert yang terbuka, bukan memindai seluruh tabel 'stock'.
+-- ###############################################################
+
+-- 1. Tabel alert. Alert "terbuka" = resolved_at IS NULL; alert ditutup (bukan
+--    dihapus) saat stok kembali di atas reorder point, sehingga histori tetap ada.
+CREATE TABLE IF NOT EXISTS reorder_alerts (
+    alert_id BIGSERIAL PRIMARY KEY,
+    product_id INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    quantity_on_hand INT NOT NULL, -- Stok saat alert dibuat
+    reorder_point INT NOT NULL,
+    raised_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    resolved_at TIMESTAMPTZ
+);
+
+-- Partial index: hanya alert terbuka yang di-index, ukurannya sebanding dengan
+-- jumlah alert aktif (bukan histori). Index unik sekaligus menjamin paling
+-- banyak satu alert terbuka per (produk, gudang).
+CREATE UNIQUE INDEX IF NOT EXISTS idx_reorder_alerts_open
+    ON reorder_alerts (product_id, warehouse_id) WHERE resolved_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_reorder_alerts_open_warehouse
+    ON reorder_alerts (warehouse_id) WHERE resolved_at IS NULL;
+
+-- 2. Fungsi trigger (level STATEMENT, lihat Task 3.5). Hanya menulis saat
+--    ambang batas dilewati: alert dibuka saat baris mulai memenuhi kondisi,
+--    ditutup saat tidak lagi memenuhi (atau baris stok dihapus).
+--    Setiap alert baru diumumkan di channel NOTIFY 'reorder_alerts' (payload
+--    JSON); NOTIFY baru terkirim ke listener setelah transaksi COMMIT.
+CREATE OR REPLACE FUNCTION maintain_reorder_alerts()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_raised INT;
+BEGIN
+    IF (TG_OP = 'DELETE') THEN
+        UPDATE reorder_alerts a
+        SET resolved_at = CURRENT_TIMESTAMP
+        FROM old_rows o
+        WHERE a.resolved_at IS NULL
+          AND a.product_id = o.product_id AND a.warehouse_id = o.warehouse_id;
+        RETURN NULL;
+    END IF;
+
+    -- Satu statement (satu eksekusi SPI) untuk kedua arah. Baris yang ditutup
+    -- tidak pernah memenuhi kondisi alert baru, jadi kedua CTE tidak bertabrakan.
+    WITH resolved AS (
+        -- Tutup alert yang stoknya sudah tidak di bawah reorder point
+        UPDATE reorder_alerts a
+        SET resolved_at = CURRENT_TIMESTAMP
+        FROM new_rows n
+        WHERE a.resolved_at IS NULL
+          AND a.product_id = n.product_id AND a.warehouse_id = n.warehouse_id
+          AND NOT (n.quantity_on_hand <= n.reorder_point AND n.quantity_on_hand > 0)
+    ),
+    raised AS (
+        -- Buka alert baru (yang sudah terbuka dilewati oleh ON CONFLICT)
+        INSERT INTO reorder_alerts (product_id, warehouse_id, quantity_on_hand, reorder_point)
+        SELECT product_id, warehouse_id, quantity_on_hand, reorder_point
+        FROM new_rows
+        WHERE quantity_on_hand <= reorder_point AND quantity_on_hand > 0
+        ON CONFLICT (product_id, warehouse_id) WHERE resolved_at IS NULL DO NOTHING
+        RETURNING alert_id, product_id, warehouse_id, quantity_on_hand, reorder_point
+    )
+    SELECT COUNT(pg_notify('reorder_alerts', json_build_object(
+        'alert_id', alert_id,
+        'product_id', product_id,
+        'warehouse_id', warehouse_id,
+        'quantity_on_hand', quantity_on_hand,
+        'reorder_point', reorder_point
+    )::TEXT))
+    INTO v_raised
+    FROM raised;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Terapkan ke tabel 'stock'. Berbeda dengan audit, trigger ini TIDAK
+--    dilewati oleh session.is_bulk_load: alert harus selalu konsisten.
+--    Load yang mematikan trigger (session_replication_role = replica, misal
+--    bulk_load.py) perlu diikuti refresh_reorder_alerts().
+DROP TRIGGER IF EXISTS trg_stock_reorder_alerts_insert ON stock;
+DROP TRIGGER IF EXISTS trg_stock_reorder_alerts_update ON stock;
+DROP TRIGGER IF EXISTS trg_stock_reorder_alerts_delete ON stock;
+
+CREATE TRIGGER trg_stock_reorder_alerts_insert
+AFTER INSERT ON stock
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_reorder_alerts();
+
+CREATE TRIGGER trg_stock_reorder_alerts_update
+AFTER UPDATE ON stock
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_reorder_alerts();
+
+CREATE TRIGGER trg_stock_reorder_alerts_delete
+AFTER DELETE ON stock
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_reorder_alerts();
+
+-- 4. Rekonsiliasi penuh terhadap tabel 'stock' (backfill awal, atau setelah
+--    load yang melewati trigger). Mengembalikan jumlah alert yang dibuka.
+--    Alert yang dibuka di sini tidak di-NOTIFY satu per satu.
+CREATE OR REPLACE FUNCTION refresh_reorder_alerts()
+RETURNS INT AS $$
+DECLARE
+    v_raised INT;
+BEGIN
+    UPDATE reorder_alerts a
+    SET resolved_at = CURRENT_TIMESTAMP
+    WHERE a.resolved_at IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM stock s
+          WHERE s.product_id = a.product_id AND s.warehouse_id = a.warehouse_id
+            AND s.quantity_on_hand <= s.reorder_point AND s.quantity_on_hand > 0
+      );
+
+    INSERT INTO reorder_alerts (product_id, warehouse_id, quantity_on_hand, reorder_point)
+    SELECT product_id, warehouse_id, quantity_on_hand, reorder_point
+    FROM stock
+    WHERE quantity_on_hand <= reorder_point AND quantity_on_hand > 0
+    ON CONFLICT (product_id, warehouse_id) WHERE resolved_at IS NULL DO NOTHING;
+    GET DIAGNOSTICS v_raised = ROW_COUNT;
+
+    RETURN v_raised;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_reorder_alerts() AS reorder_alerts_raised;
+
+
+-- ###############################################################
+-- Task 3.7: Biaya Rata-rata Tertimbang Berjalan (product_cost)
+-- Total kuantitas & total biaya per produk dari PO yang 'COMPLETED',
+-- diperbarui inkremental saat status PO berubah dan saat detail ditambahkan
+-- ke PO yang sudah 'COMPLETED'. calculate_stock_value('AVG')
+-- dan ETL cukup membaca tabel ini, tanpa memindai seluruh histori PO.
+-- ###############################################################
+
+-- 1. Tabel biaya per produk. avg_cost = total_cost / total_quantity
+--    (sama dengan SUM(quantity * unit_price) / SUM(quantity) atas PO selesai).
+CREATE TABLE IF NOT EXISTS product_cost (
+    product_id INT PRIMARY KEY REFERENCES products(product_id),
+    total_quantity BIGINT NOT NULL DEFAULT 0,
+    total_cost NUMERIC NOT NULL DEFAULT 0,
+    avg_cost NUMERIC GENERATED ALWAYS AS (
+        CASE WHEN total_quantity = 0 THEN 0 ELSE total_cost / total_quantity END
+    ) STORED,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 2. Fungsi trigger (level STATEMENT). PO yang berubah MENJADI 'COMPLETED'
+--    menambah total produk di detailnya; PO yang KELUAR dari 'COMPLETED'
+--    (misal dibatalkan) mengurangi kembali. Detail PO yang sudah 'COMPLETED'
+--    dianggap final (penerimaan barang): detail baru dihitung trigger di
+--    langkah 4, koreksi/hapus detail PO selesai perlu diikuti refresh_product_cost().
+CREATE OR REPLACE FUNCTION maintain_product_cost()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH changed_po AS (
+        SELECT n.po_id,
+               CASE WHEN n.status = 'COMPLETED' THEN 1 ELSE -1 END AS sign
+        FROM new_rows n
+        JOIN old_rows o ON o.po_id = n.po_id
+        WHERE (n.status = 'COMPLETED') <> (o.status = 'COMPLETED')
+    ),
+    deltas AS (
+        SELECT pod.product_id,
+               SUM(c.sign * pod.quantity) AS delta_quantity,
+               SUM(c.sign * pod.quantity * pod.unit_price) AS delta_cost
+        FROM changed_po c
+        JOIN purchase_order_details pod ON pod.po_id = c.po_id
+        GROUP BY pod.product_id
+    )
+    -- Urutan key deterministik: penyelesaian PO bersamaan tidak saling deadlock
+    INSERT INTO product_cost AS pc (product_id, total_quantity, total_cost)
+    SELECT product_id, delta_quantity, delta_cost
+    FROM deltas
+    ORDER BY product_id
+    ON CONFLICT (product_id) DO UPDATE SET
+        total_quantity = pc.total_quantity + EXCLUDED.total_quantity,
+        total_cost = pc.total_cost + EXCLUDED.total_cost,
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Terapkan ke tabel 'purchase_orders' (hanya UPDATE kolom status)
+DROP TRIGGER IF EXISTS trg_purchase_orders_product_cost ON purchase_orders;
+CREATE TRIGGER trg_purchase_orders_product_cost
+AFTER UPDATE ON purchase_orders
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_product_cost();
+
+-- 4. Detail yang ditambahkan ke PO yang sudah 'COMPLETED' (misal PO yang
+--    langsung di-INSERT sebagai 'COMPLETED' oleh generator, lalu detailnya).
+--    Detail selalu di-INSERT setelah PO-nya (FK), jadi trigger ini bersama
+--    trigger status di atas mencakup semua jalur PO menjadi 'COMPLETED'.
+CREATE OR REPLACE FUNCTION maintain_product_cost_details()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH deltas AS (
+        SELECT n.product_id,
+               SUM(n.quantity) AS delta_quantity,
+               SUM(n.quantity * n.unit_price) AS delta_cost
+        FROM new_rows n
+        JOIN purchase_orders po ON po.po_id = n.po_id
+        WHERE po.status = 'COMPLETED'
+        GROUP BY n.product_id
+    )
+    INSERT INTO product_cost AS pc (product_id, total_quantity, total_cost)
+    SELECT product_id, delta_quantity, delta_cost
+    FROM deltas
+    ORDER BY product_id
+    ON CONFLICT (product_id) DO UPDATE SET
+        total_quantity = pc.total_quantity + EXCLUDED.total_quantity,
+        total_cost = pc.total_cost + EXCLUDED.total_cost,
+        updated_at = CURRENT_TIMESTAMP;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_purchase_order_details_product_cost ON purchase_order_details;
+CREATE TRIGGER trg_purchase_order_details_product_cost
+AFTER INSERT ON purchase_order_details
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION maintain_product_cost_details();
+
+-- 5. Hitung ulang penuh dari histori PO (backfill awal, setelah bulk load,
+--    atau setelah koreksi PO yang sudah selesai). Mengembalikan jumlah produk.
+CREATE OR REPLACE FUNCTION refresh_product_cost()
+RETURNS INT AS $$
+DECLARE
+    v_products INT;
+BEGIN
+    TRUNCATE product_cost;
+    INSERT INTO product_cost (product_id, total_quantity, total_cost)
+    SELECT pod.product_id, SUM(pod.quantity), SUM(pod.quantity * pod.unit_price)
+    FROM purchase_order_details pod
+    JOIN purchase_orders po ON pod.po_id = po.po_id
+    WHERE po.status = 'COMPLETED'
+    GROUP BY pod.product_id;
+    GET DIAGNOSTICS v_products = ROW_COUNT;
+    RETURN v_products;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_product_cost() AS product_cost_rows;
+
 
 -- ###############################################################
 -- BONUS: Trigger untuk 'updated_at'
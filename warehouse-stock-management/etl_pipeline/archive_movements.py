@@ -0,0 +1,41 @@
+"""
+Job arsip dingin stock_movements (lihat extract/archive.py).
+
+Mengekspor bulan yang sudah tertutup ke arsip Parquet `source.archive.path`
+di config.yaml; setelah itu tahap EXTRACT membaca histori tersebut dari file
+lokal dan hanya mengambil baris baru dari database. Jadwalkan misal sebulan
+sekali (cron/orchestrator):
+
+    python archive_movements.py
+    python archive_movements.py --hot-days 180 --after-export detach
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from main import load_config, log
+from extract.archive import AFTER_EXPORT, archive_movements
+from extract.sources import SqlSource
+
+if __name__ == "__main__":
+    os.chdir(Path(__file__).parent)
+    config = load_config(config_dir='config')
+    archive_config = (config.get('source') or {}).get('archive') or {}
+
+    parser = argparse.ArgumentParser(description="Arsip bulan tertutup stock_movements ke Parquet.")
+    parser.add_argument('--path', default=archive_config.get('path'), help="Direktori arsip.")
+    parser.add_argument('--hot-days', type=int, default=archive_config.get('hot_days', 90),
+                        help="Bulan yang berakhir dalam N hari terakhir tetap di database.")
+    parser.add_argument('--after-export', choices=AFTER_EXPORT, default=archive_config.get('after_export', 'keep'),
+                        help="Perlakuan bulan yang sudah diarsip di database.")
+    parser.add_argument('--compression', default=archive_config.get('compression', 'zstd'))
+    args = parser.parse_args()
+
+    if not args.path:
+        log.error("Direktori arsip belum diatur (source.archive.path di config.yaml atau --path).")
+        sys.exit(1)
+    manifest = archive_movements(SqlSource(config['database']), args.path, args.hot_days,
+                                 args.compression, args.after_export)
+    entry = manifest.get('stock_movements', {})
+    log.info(f"Arsip selesai: {entry.get('rows', 0)} baris sampai {entry.get('archived_until')}.")
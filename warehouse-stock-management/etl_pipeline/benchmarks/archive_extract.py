@@ -0,0 +1,112 @@
+"""
+Benchmark ekstraksi stock_movements: database saja vs arsip dingin Parquet + database.
+
+Arsip dibuat (mode 'keep', database tidak diubah) di direktori sementara atau
+`--archive`, lalu untuk setiap skenario dibandingkan:
+  - database : SqlSource.read_table (seluruh baris dari PostgreSQL);
+  - tiered   : TieredSource.read_table (bulan yang diarsip dari Parquet lokal,
+               sisanya dari database).
+Skenario: full load (tanpa filter) dan incremental (movement_date > N hari
+sebelum batas arsip, sehingga file arsip lama dilewati lewat statistik).
+Hasil kedua sumber dicek sama (jumlah baris, set movement_id, total quantity).
+Hasil disimpan di `benchmarks/results/archive_extract.json`.
+
+Cara pakai (dari direktori etl_pipeline/):
+    python benchmarks/archive_extract.py --hot-days 90
+"""
+import argparse
+import gc
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+import yaml
+
+from extract.archive import archive_movements
+from extract.sources import SqlSource, TieredSource
+
+ETL_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_PATH = Path(__file__).resolve().parent / 'results' / 'archive_extract.json'
+
+
+def timed(read, runs):
+    """Median detik `read()` dan ringkasan hasil terakhir (DataFrame dilepas setiap run)."""
+    timings, summary = [], None
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        df = read()
+        timings.append(time.perf_counter() - start)
+        summary = (len(df), pd.util.hash_array(df['movement_id'].sort_values().to_numpy()).sum(),
+                   int(df['quantity'].sum()))
+        del df
+    return round(statistics.median(timings), 2), summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ekstraksi stock_movements dengan arsip Parquet.")
+    parser.add_argument('--config', default=str(ETL_ROOT / 'config' / 'config.yaml'))
+    parser.add_argument('--archive', default=None, help="Direktori arsip (default: direktori sementara).")
+    parser.add_argument('--hot-days', type=int, default=90)
+    parser.add_argument('--incremental-days', type=int, default=30,
+                        help="Skenario incremental: movement_date > (batas arsip - N hari).")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-save', action='store_true', help="Jangan tulis file hasil.")
+    args = parser.parse_args()
+
+    with open(args.config, encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    database = SqlSource(config['database'])
+    archive_dir = Path(args.archive or tempfile.mkdtemp(prefix='movement_archive_'))
+    try:
+        print(f"Archiving closed months to {archive_dir}...")
+        start = time.perf_counter()
+        entry = archive_movements(database, archive_dir, args.hot_days)['stock_movements']
+        archive_seconds = time.perf_counter() - start
+        archive_bytes = sum(p.stat().st_size for p in archive_dir.rglob('*.parquet'))
+        tiered = TieredSource(database, archive_dir)
+
+        since = pd.Timestamp(entry['archived_until']) - pd.Timedelta(days=args.incremental_days)
+        scenarios = {'full': None, 'incremental': [('movement_date', '>', since)]}
+        results = {}
+        for scenario, filters in scenarios.items():
+            results[scenario] = {}
+            for name, source in (('database', database), ('tiered', tiered)):
+                print(f"Timing {scenario} extraction from {name}...")
+                seconds, summary = timed(lambda: source.read_table('stock_movements', filters), args.runs)
+                results[scenario][name] = {'seconds': seconds, 'rows': summary[0], 'summary': summary}
+            if results[scenario]['database']['summary'] != results[scenario]['tiered']['summary']:
+                raise SystemExit(f"{scenario}: hasil tiered berbeda dari database")
+            for name in results[scenario]:
+                del results[scenario][name]['summary']
+    finally:
+        if args.archive is None:
+            shutil.rmtree(archive_dir, ignore_errors=True)
+
+    print(f"\nArchived {entry['rows']} rows before {entry['archived_until']} "
+          f"({archive_bytes / 1e6:.1f} MB) in {archive_seconds:.1f}s")
+    for scenario, timings in results.items():
+        print(f"{scenario:<12} database {timings['database']['seconds']:>7}s   "
+              f"tiered {timings['tiered']['seconds']:>7}s   ({timings['database']['rows']} rows)")
+
+    if not args.no_save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps({
+            'archived_rows': entry['rows'],
+            'archived_until': entry['archived_until'],
+            'archive_mb': round(archive_bytes / 1e6, 1),
+            'archive_seconds': round(archive_seconds, 1),
+            'hot_days': args.hot_days,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'extract_seconds': results,
+        }, indent=2) + '\n', encoding='utf-8')
+        print(f"Results saved to {RESULTS_PATH}")
@@ -0,0 +1,124 @@
+"""
+Benchmark setiap tahap pipeline ETL (pytest-benchmark) pada beberapa skala data.
+
+Tahap yang diukur: DataExtractor.handle_data_quality_issues, setiap fungsi
+transform/*, DataLoader.save_to_file dan ReportGenerator.create_charts (cache
+chart dimatikan). Setiap round menerima salinan baru input tahapnya (waktu
+menyalin tidak ikut diukur), karena tahap-tahap ini menambah kolom/key di dict
+DataFrame yang diterimanya. Dataset: lihat stage_data.py.
+
+File ini sengaja tidak bernama test_*.py agar tidak ikut `pytest` biasa.
+Acuan yang di-commit: benchmarks/results/stages.json (skala default).
+Cara pakai (dari direktori etl_pipeline/):
+    python -m pytest benchmarks/bench_stages.py --benchmark-json .cache/stages.json
+    python benchmarks/compare_stages.py benchmarks/results/stages.json .cache/stages.json
+    ETL_BENCH_SCALES=10k,100k,1m,10m python -m pytest benchmarks/bench_stages.py -k financial
+"""
+import copy
+import logging
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ETL_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ETL_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from extract.data_extractor import DataExtractor
+from load.data_loader import DataLoader
+from stage_data import dataset_path, selected_scales
+import transform.financial_metrics as fin
+import transform.inventory_metrics as inv
+import transform.movement_analytics as mov
+import transform.warehouse_performance as wh
+
+ABC_CONFIG = {'A_percent': 0.8, 'B_percent': 0.15, 'C_percent': 0.05}
+DEAD_STOCK_DAYS = 180
+ROUNDS = int(os.environ.get('ETL_BENCH_ROUNDS', 3))
+
+# Log INFO per tahap tidak ikut diukur
+logging.disable(logging.INFO)
+
+_prepared = {}
+
+
+def copy_frames(data_frames):
+    """Salinan dict DataFrame/summary yang bisa diubah tahap tanpa memengaruhi round lain."""
+    return {name: df.copy() if isinstance(df, pd.DataFrame) else copy.deepcopy(df)
+            for name, df in data_frames.items()}
+
+
+def prepared(scale):
+    """
+    (extractor, raw, transformed) untuk `scale`, dihitung sekali per sesi: data hasil extract
+    dan data setelah seluruh tahap TRANSFORM (input tahap LOAD & REPORT).
+    """
+    if scale not in _prepared:
+        extractor = DataExtractor(None, {'type': 'parquet', 'path': str(dataset_path(scale))})
+        raw = extractor.extract_full()
+        data = extractor.handle_data_quality_issues(copy_frames(raw))
+        data = inv.calculate_inventory_metrics(data, DEAD_STOCK_DAYS)
+        data = mov.calculate_movement_analytics(data)
+        data = fin.calculate_financial_metrics(data, ABC_CONFIG)
+        data = wh.calculate_warehouse_performance(data)
+        _prepared.clear()  # satu skala di memori sekaligus
+        _prepared[scale] = extractor, raw, data
+    return _prepared[scale]
+
+
+# Fixture modul ber-parameter: pytest mengelompokkan test per skala, sehingga setiap dataset dimuat sekali
+@pytest.fixture(params=selected_scales(), scope='module')
+def scale(request):
+    return request.param
+
+
+def run_stage(benchmark, scale, stage, source, function):
+    _, raw, transformed = prepared(scale)
+    data = raw if source == 'raw' else transformed
+    benchmark.group = stage
+    benchmark.extra_info.update(scale=scale, movements=len(raw['stock_movements']))
+    benchmark.pedantic(function, setup=lambda: ((copy_frames(data),), {}), rounds=ROUNDS, iterations=1)
+
+
+def test_handle_data_quality_issues(benchmark, scale):
+    extractor = prepared(scale)[0]
+    run_stage(benchmark, scale, 'handle_data_quality_issues', 'raw', extractor.handle_data_quality_issues)
+
+
+def test_calculate_inventory_metrics(benchmark, scale):
+    run_stage(benchmark, scale, 'calculate_inventory_metrics', 'transformed',
+              lambda data: inv.calculate_inventory_metrics(data, DEAD_STOCK_DAYS))
+
+
+def test_calculate_movement_analytics(benchmark, scale):
+    run_stage(benchmark, scale, 'calculate_movement_analytics', 'transformed', mov.calculate_movement_analytics)
+
+
+def test_calculate_financial_metrics(benchmark, scale):
+    run_stage(benchmark, scale, 'calculate_financial_metrics', 'transformed',
+              lambda data: fin.calculate_financial_metrics(data, ABC_CONFIG))
+
+
+def test_calculate_warehouse_performance(benchmark, scale):
+    run_stage(benchmark, scale, 'calculate_warehouse_performance', 'transformed', wh.calculate_warehouse_performance)
+
+
+def test_calculate_warehouse_views(benchmark, scale):
+    run_stage(benchmark, scale, 'calculate_warehouse_views', 'transformed',
+              lambda data: wh.calculate_warehouse_views(data, DEAD_STOCK_DAYS, ABC_CONFIG))
+
+
+def test_save_to_file(benchmark, scale, tmp_path):
+    loader = DataLoader({'analytics_dir': tmp_path, 'format': 'parquet', 'summary_table_name': None})
+    run_stage(benchmark, scale, 'save_to_file', 'transformed', loader.save_to_file)
+
+
+def test_create_charts(benchmark, scale, tmp_path):
+    from load.report_generator import ReportGenerator
+
+    report_gen = ReportGenerator(output_dir=tmp_path, chart_config={'workers': 4, 'cache': False},
+                                 pdf_config={'background': False}, template_cache_dir=None)
+    run_stage(benchmark, scale, 'create_charts', 'transformed', report_gen.create_charts)
@@ -0,0 +1,51 @@
+"""
+Membandingkan dua hasil bench_stages.py (file `--benchmark-json` pytest-benchmark).
+
+Benchmark dicocokkan per nama (tahap + skala). Median yang naik lebih dari
+`--threshold` (default 10%) dilaporkan sebagai regresi dan skrip keluar dengan
+exit code 1 (untuk CI). Benchmark yang hanya ada di salah satu file dilewati.
+
+Cara pakai (dari direktori etl_pipeline/):
+    python benchmarks/compare_stages.py benchmarks/results/stages.json .cache/stages.json
+    python benchmarks/compare_stages.py old.json new.json --threshold 0.25
+"""
+import argparse
+import json
+import sys
+
+
+def load_medians(path):
+    """{nama benchmark: median detik} dari file JSON pytest-benchmark."""
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    return {bench['name']: bench['stats']['median'] for bench in report['benchmarks']}
+
+
+def compare(baseline, current, threshold):
+    """List (nama, median lama, median baru, rasio, regresi?) untuk benchmark yang ada di keduanya."""
+    rows = []
+    for name in sorted(baseline.keys() & current.keys()):
+        ratio = current[name] / baseline[name]
+        rows.append((name, baseline[name], current[name], ratio, ratio > 1 + threshold))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bandingkan hasil benchmark tahap pipeline.")
+    parser.add_argument('baseline', help="JSON pytest-benchmark acuan.")
+    parser.add_argument('current', help="JSON pytest-benchmark yang dibandingkan.")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Kenaikan median relatif yang dianggap regresi (default 0.10 = 10%%).")
+    args = parser.parse_args()
+
+    rows = compare(load_medians(args.baseline), load_medians(args.current), args.threshold)
+    print(f"{'benchmark':<48} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, old, new, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<48} {old * 1000:>9.1f}ms {new * 1000:>9.1f}ms {ratio - 1:>+7.1%}{flag}")
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)} of {len(rows)} benchmarks regressed more than {args.threshold:.0%}.")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%} ({len(rows)} benchmarks compared).")
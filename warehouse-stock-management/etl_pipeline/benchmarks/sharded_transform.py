@@ -0,0 +1,131 @@
+"""
+Benchmark TRANSFORM satu proses vs map-reduce per gudang (transform/sharded.py).
+
+Dataset sintetis dari stage_data.py (sumber Parquet, setelah DQ). Untuk setiap
+jumlah worker (shard) diukur wall time total beserta fase shard / map / reduce
+(dari span instrumentation), lalu hasilnya dicek sama dengan transform satu
+proses (tabel analitik, toleransi float untuk urutan penjumlahan). Jumlah CPU
+ikut dicatat: process pool dibatasi jumlah CPU, jadi kurva hanya bermakna
+sampai jumlah core mesin.
+Hasil disimpan di `benchmarks/results/sharded_transform.json`.
+
+Cara pakai (dari direktori etl_pipeline/):
+    python benchmarks/sharded_transform.py --scale 1m --workers 1,2,4,8
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+import instrumentation
+from stage_data import SCALES, dataset_path
+from extract.data_extractor import DataExtractor
+from transform.financial_metrics import calculate_financial_metrics
+from transform.inventory_metrics import calculate_inventory_metrics
+from transform.movement_analytics import calculate_movement_analytics
+from transform.sharded import sharded_transform
+from transform.warehouse_performance import calculate_warehouse_performance
+
+RESULTS_PATH = Path(__file__).resolve().parent / 'results' / 'sharded_transform.json'
+ABC_CONFIG = {'A_percent': 0.8, 'B_percent': 0.15, 'C_percent': 0.05}
+DEAD_STOCK_DAYS = 180
+ANALYTICS = ['daily_trends', 'weekly_trends', 'monthly_trends', 'peak_day_of_week', 'abc_analysis',
+             'stock_value_report', 'transfer_patterns', 'warehouse_io_summary', 'dead_stock_report']
+PHASES = ['transform.shard', 'transform.map', 'transform.reduce']
+
+
+def sequential(data):
+    data = calculate_inventory_metrics(data, DEAD_STOCK_DAYS)
+    data = calculate_movement_analytics(data)
+    data = calculate_financial_metrics(data, ABC_CONFIG)
+    return calculate_warehouse_performance(data)
+
+
+def timed(transform, clean, runs):
+    """Median detik, fase (span) run terakhir & hasil terakhir dari `transform(salinan data)`."""
+    timings, result, phases = [], None, {}
+    for _ in range(runs):
+        data = {name: df.copy() for name, df in clean.items()}
+        del result
+        gc.collect()
+        metrics = instrumentation.start_run({'jsonl_path': None})
+        start = time.perf_counter()
+        result = transform(data)
+        timings.append(time.perf_counter() - start)
+        phases = {r['span']: r for r in metrics.records if r['span'] in PHASES}
+    return round(statistics.median(timings), 3), phases, result
+
+
+def assert_same(expected, actual):
+    for name in ANALYTICS:
+        pd.testing.assert_frame_equal(expected[name].reset_index(drop=True), actual[name].reset_index(drop=True),
+                                      check_exact=False, rtol=1e-9)
+    if expected['inventory_summary'] != actual['inventory_summary']:
+        raise AssertionError(f"inventory_summary: {expected['inventory_summary']} != {actual['inventory_summary']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TRANSFORM map-reduce per gudang.")
+    parser.add_argument('--scale', default='1m', choices=list(SCALES))
+    parser.add_argument('--workers', default='1,2,4,8', help="Daftar jumlah worker, dipisah koma.")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-save', action='store_true', help="Jangan tulis file hasil.")
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(',')]
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+
+    extractor = DataExtractor(None, {'type': 'parquet', 'path': str(dataset_path(args.scale))})
+    clean = extractor.handle_data_quality_issues(extractor.extract_full())
+    movements = len(clean['stock_movements'])
+    warehouses = clean['stock_movements']['warehouse_id'].nunique()
+    print(f"Scale {args.scale}: {movements} movements, {warehouses} warehouses, {cpus} CPU(s) available")
+
+    print("Timing single-process transform...")
+    baseline, _, expected = timed(sequential, clean, args.runs)
+    results = []
+    for workers in worker_counts:
+        print(f"Timing sharded transform with {workers} worker(s)...")
+        seconds, phases, actual = timed(
+            lambda data: sharded_transform(data, DEAD_STOCK_DAYS, ABC_CONFIG, workers), clean, args.runs)
+        assert_same(expected, actual)
+        del actual
+        results.append({
+            'workers': workers,
+            'seconds': seconds,
+            'speedup': round(baseline / seconds, 2),
+            'shard_seconds': round(phases['transform.shard']['wall_seconds'], 3),
+            'shard_mb': round(phases['transform.shard']['details']['bytes'] / 1e6, 1),
+            'map_seconds': round(phases['transform.map']['wall_seconds'], 3),
+            'worker_seconds': phases['transform.map']['details']['worker_seconds'],
+            'reduce_seconds': round(phases['transform.reduce']['wall_seconds'], 3),
+        })
+
+    print(f"\n{'workers':>8} {'seconds':>9} {'speedup':>8} {'shard':>7} {'map':>7} {'reduce':>7}  worker seconds")
+    print(f"{'single':>8} {baseline:>9} {1.0:>8}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['seconds']:>9} {r['speedup']:>8} {r['shard_seconds']:>7} "
+              f"{r['map_seconds']:>7} {r['reduce_seconds']:>7}  {r['worker_seconds']}")
+    print("All sharded results match the single-process transform.")
+
+    if not args.no_save:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps({
+            'scale': args.scale,
+            'movements': movements,
+            'warehouses': warehouses,
+            'cpus': cpus,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'single_process_seconds': baseline,
+            'sharded': results,
+        }, indent=2) + '\n', encoding='utf-8')
+        print(f"Results saved to {RESULTS_PATH}")
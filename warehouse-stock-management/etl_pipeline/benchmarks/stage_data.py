@@ -0,0 +1,60 @@
+"""
+Dataset sintetis deterministik untuk benchmark tahap pipeline (bench_stages.py).
+
+Setiap skala (jumlah stock_movements nominal) di-generate sekali dengan
+generator ter-shard (data_generator/sharding.py, seed & tanggal acuan tetap,
+format Parquet) ke `.cache/bench_data/<skala>-seed<seed>/parquet`, untuk dibaca
+DataExtractor (sumber Parquet) seperti run ETL tanpa database. Data
+master (produk, gudang) sama di semua skala; PO, SO & movements ikut diskalakan.
+"""
+import os
+import sys
+from pathlib import Path
+
+ETL_ROOT = Path(__file__).resolve().parent.parent
+GENERATOR_ROOT = ETL_ROOT.parent / 'data_generator'
+CACHE_DIR = ETL_ROOT / '.cache' / 'bench_data'
+
+# Nama skala -> jumlah stock_movements yang dituju
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+# Skala 10m butuh ~16 GB RAM (data mentah + hasil transform + salinan per round)
+DEFAULT_SCALES = '10k,100k,1m'
+# Jumlah stock_movements per scale factor 1.0 (data_generator/config.yaml, seed 42)
+MOVEMENTS_PER_SCALE_FACTOR = 551_400
+SEED = 42
+# Tanggal acuan DQ 'future_date' tetap, agar dataset identik setiap hari (dan baris
+# 'future_date' tetap di masa depan sehingga tetap difilter handle_data_quality_issues)
+REFERENCE_DATE = '2030-01-01'
+
+
+def selected_scales():
+    """Skala yang dijalankan; bisa diatur dengan env var ETL_BENCH_SCALES (misal '10k,100k')."""
+    names = [s.strip().lower() for s in os.environ.get('ETL_BENCH_SCALES', DEFAULT_SCALES).split(',') if s.strip()]
+    unknown = [s for s in names if s not in SCALES]
+    if unknown:
+        raise ValueError(f"Skala tidak dikenal: {', '.join(unknown)}. Pilihan: {', '.join(SCALES)}")
+    return names
+
+
+def dataset_path(scale, seed=SEED):
+    """Direktori dataset Parquet untuk `scale`; di-generate jika belum ada di cache."""
+    output_dir = CACHE_DIR / f"{scale}-seed{seed}"
+    parquet_dir = output_dir / 'parquet'
+    if (parquet_dir / 'manifest.json').exists():
+        return parquet_dir
+
+    sys.path.insert(0, str(GENERATOR_ROOT))
+    import yaml
+    from sharding import generate_sharded
+
+    with open(GENERATOR_ROOT / 'config.yaml', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config['settings']['reference_date'] = REFERENCE_DATE
+    # manifest.json ditulis terakhir oleh generator: dataset setengah jadi di-generate ulang
+    generate_sharded(config, output_dir,
+                     scale_factor=SCALES[scale] / MOVEMENTS_PER_SCALE_FACTOR,
+                     seed=seed,
+                     workers=os.cpu_count() or 1,
+                     file_format='parquet')
+    return parquet_dir
+
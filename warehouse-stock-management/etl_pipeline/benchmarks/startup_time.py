@@ -0,0 +1,139 @@
+"""
+Benchmark waktu start-up CLI ETL (`python -X importtime`).
+
+Mengukur waktu impor `main` (jalur start-up run terjadwal) dan memastikan
+dependensi laporan yang berat tidak ikut ter-impor. Hasil disimpan sebagai
+JSON di `benchmarks/results/startup_importtime.json` agar bisa dilacak di repo
+dan menjadi acuan untuk `--check`.
+
+`--check` membandingkan waktu tercepat dari `--runs` dengan median acuan +
+toleransi (default 50%, `--tolerance` / env STARTUP_TOLERANCE), karena waktu
+absolut sangat bergantung pada mesin: di runner 1 CPU median kode yang sama
+bergeser ~30% antar periode beban. Regresi besar (dependensi laporan ikut
+ter-impor) tetap tertangkap lewat HEAVY_MODULES. `--budget` / env STARTUP_BUDGET menimpanya dengan batas absolut (detik).
+Rekam ulang acuan (tanpa --check) di mesin yang menjalankan check.
+
+Cara pakai (dari direktori etl_pipeline/):
+    python benchmarks/startup_time.py            # ukur & simpan hasil (acuan)
+    python benchmarks/startup_time.py --check    # gagal (exit 1) jika melewati acuan + toleransi
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ETL_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_PATH = Path(__file__).resolve().parent / 'results' / 'startup_importtime.json'
+
+# Modul yang tidak boleh ter-impor saat start-up: dependensi tahap REPORT, dan
+# SQLAlchemy (diimpor saat koneksi database dibuat, tidak dipakai run Parquet)
+HEAVY_MODULES = ['matplotlib', 'jinja2', 'weasyprint', 'openai', 'dotenv', 'load.report_generator', 'sqlalchemy']
+
+DEFAULT_TOLERANCE = 0.5
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """Mengubah output `-X importtime` menjadi list (modul, self_us, cumulative_us, depth)."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def measure(target='main', runs=5):
+    """
+    Mengukur waktu wall `python -c 'import <target>'` (tanpa overhead importtime),
+    lalu satu kali `-X importtime` untuk rincian per modul.
+    """
+    wall_times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {target}'], cwd=ETL_ROOT, capture_output=True, check=True)
+        wall_times.append(time.perf_counter() - start)
+
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=ETL_ROOT, capture_output=True, text=True, check=True
+    )
+    rows = parse_importtime(proc.stderr)
+
+    top_level = [r for r in rows if r[3] == 0]
+    # Impor langsung dari `target` (kedalaman 1), diurutkan dari yang paling mahal
+    direct = sorted((r for r in rows if r[3] == 1), key=lambda r: r[2], reverse=True)
+    imported = {r[0] for r in rows}
+    return {
+        'target': target,
+        'runs': runs,
+        'wall_seconds_median': round(statistics.median(wall_times), 3),
+        'wall_seconds_min': round(min(wall_times), 3),
+        'import_seconds_total': round(sum(r[2] for r in top_level) / 1e6, 3),
+        'top_imports': [
+            {'module': m, 'cumulative_ms': round(c / 1000, 1)} for m, _, c, _ in direct[:10]
+        ],
+        'heavy_modules_imported': [m for m in HEAVY_MODULES if m in imported],
+    }
+
+
+def check_limit(budget=None, tolerance=DEFAULT_TOLERANCE, results_path=RESULTS_PATH):
+    """
+    Batas waktu tercepat (detik) untuk --check: `budget` jika diberikan, selain itu median
+    acuan tersimpan x (1 + tolerance). None jika tidak ada acuan.
+    """
+    if budget is not None:
+        return budget
+    if not Path(results_path).exists():
+        return None
+    reference = json.loads(Path(results_path).read_text(encoding='utf-8'))
+    return round(reference['wall_seconds_median'] * (1 + tolerance), 3)
+
+
+def _env_float(name):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark waktu start-up ETL CLI.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=_env_float('STARTUP_BUDGET'),
+                        help="Batas absolut waktu start-up (detik); default: acuan + toleransi.")
+    parser.add_argument('--tolerance', type=float, default=_env_float('STARTUP_TOLERANCE') or DEFAULT_TOLERANCE,
+                        help="Toleransi relatif terhadap median acuan (default 0.5 = +50%%).")
+    parser.add_argument('--check', action='store_true',
+                        help="Exit 1 jika melebihi batas; acuan tersimpan tidak ditimpa.")
+    parser.add_argument('--no-save', action='store_true', help="Jangan tulis file hasil.")
+    args = parser.parse_args()
+
+    limit = check_limit(args.budget, args.tolerance)
+    result = measure(runs=args.runs)
+    result['python'] = platform.python_version()
+
+    print(f"Start-up 'import main': median {result['wall_seconds_median']}s, min {result['wall_seconds_min']}s "
+          f"(impor {result['import_seconds_total']}s, batas {limit}s)")
+    for entry in result['top_imports']:
+        print(f"  {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+    if result['heavy_modules_imported']:
+        print(f"PERINGATAN: modul berat ikut ter-impor: {', '.join(result['heavy_modules_imported'])}")
+
+    # Hasil --check tidak menjadi acuan baru
+    if not args.no_save and not args.check:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        RESULTS_PATH.write_text(json.dumps(result, indent=2) + '\n', encoding='utf-8')
+        print(f"Hasil disimpan di {RESULTS_PATH}")
+
+    if args.check:
+        if limit is None:
+            print(f"Tidak ada acuan di {RESULTS_PATH}; hanya modul berat yang dicek.")
+        if result['heavy_modules_imported'] or (limit is not None and result['wall_seconds_min'] > limit):
+            sys.exit(1)
@@ -0,0 +1,169 @@
+"""
+Checkpoint hasil tahap pipeline untuk melanjutkan run yang gagal.
+
+Setiap run menyimpan checkpoint di `<checkpoint.dir>/<run_id>/`:
+
+    state.json                 tahap yang selesai, load_type, tahap yang diminta
+    extract/<tabel>.arrow      hasil EXTRACT (setelah DQ), satu file Arrow IPC per DataFrame
+    transform/<tabel>.arrow    hasil TRANSFORM (input LOAD & REPORT)
+    <tahap>/objects.pkl        nilai non-DataFrame (misal inventory_summary)
+
+LOAD dan REPORT tidak menghasilkan data untuk tahap lain; keduanya hanya
+dicatat selesai di state.json. Dengan `main.py --resume <run_id>` run
+dilanjutkan dari tahap pertama yang belum selesai (input dibaca dari
+checkpoint). `--from-stage <tahap>` membuat run baru yang memakai hasil
+tahap sebelumnya dari run terakhir yang memilikinya (file di-hard link,
+bukan disalin).
+
+state.json ditulis atomik dan sebuah tahap baru dicatat selesai setelah
+semua filenya tertulis, sehingga checkpoint setengah jadi tidak pernah dipakai.
+"""
+import json
+import logging
+import os
+import pickle
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+STATE_FILE = 'state.json'
+# Tahap yang hasilnya disimpan, dan tahap yang inputnya berasal dari tahap tersebut
+DATA_STAGES = ['extract', 'transform']
+REQUIRES = {'transform': 'extract', 'load': 'transform', 'report': 'transform'}
+
+
+class RunCheckpoint:
+    def __init__(self, path, state):
+        self.path = Path(path)
+        self.state = state
+
+    @property
+    def run_id(self):
+        return self.state['run_id']
+
+    @property
+    def completed(self):
+        return list(self.state['completed'])
+
+    @classmethod
+    def create(cls, root, run_id, load_type, stages):
+        """Checkpoint kosong untuk run baru."""
+        checkpoint = cls(Path(root) / run_id, {
+            'run_id': run_id,
+            'load_type': load_type,
+            'stages': list(stages),
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'completed': {},
+        })
+        checkpoint.path.mkdir(parents=True, exist_ok=True)
+        checkpoint._write_state()
+        return checkpoint
+
+    @classmethod
+    def open(cls, root, run_id):
+        path = Path(root) / run_id
+        state_path = path / STATE_FILE
+        if not state_path.exists():
+            raise FileNotFoundError(f"Checkpoint run {run_id} tidak ditemukan di {Path(root).resolve()}")
+        return cls(path, json.loads(state_path.read_text(encoding='utf-8')))
+
+    @classmethod
+    def latest_with(cls, root, stage):
+        """Checkpoint terbaru (urut created_at) yang tahap `stage`-nya sudah selesai, atau None."""
+        candidates = []
+        for state_path in Path(root).glob(f'*/{STATE_FILE}'):
+            try:
+                checkpoint = cls(state_path.parent, json.loads(state_path.read_text(encoding='utf-8')))
+            except (OSError, ValueError) as e:
+                log.warning(f"Checkpoint {state_path.parent.name} tidak dapat dibaca: {e}")
+                continue
+            if stage in checkpoint.completed:
+                candidates.append(checkpoint)
+        return max(candidates, key=lambda c: c.state['created_at'], default=None)
+
+    def _write_state(self):
+        tmp_path = self.path / f"{STATE_FILE}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(self.state, indent=2), encoding='utf-8')
+        os.replace(tmp_path, self.path / STATE_FILE)
+
+    def save(self, stage, data_frames=None):
+        """Menyimpan hasil `stage` (dict DataFrame/objek) lalu mencatat tahap selesai."""
+        entry = {'finished_at': datetime.now(timezone.utc).isoformat()}
+        if data_frames is not None:
+            import pyarrow as pa
+            import pyarrow.feather as feather
+
+            stage_dir = self.path / stage
+            shutil.rmtree(stage_dir, ignore_errors=True)
+            stage_dir.mkdir(parents=True)
+            objects = {}
+            for name, value in data_frames.items():
+                if isinstance(value, pd.DataFrame):
+                    try:
+                        # Index non-default & dtype (kategori, datetime tz) ikut tersimpan di metadata
+                        feather.write_feather(pa.Table.from_pandas(value), stage_dir / f"{name}.arrow",
+                                              compression='lz4')
+                        continue
+                    except (pa.ArrowException, TypeError, ValueError) as e:
+                        log.warning(f"{name} tidak dapat disimpan sebagai Arrow ({e}), disimpan dengan pickle.")
+                objects[name] = value
+            with open(stage_dir / 'objects.pkl', 'wb') as f:
+                pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+            entry['tables'] = list(data_frames)
+        self.state['completed'][stage] = entry
+        self._write_state()
+        log.info(f"Checkpoint tahap {stage.upper()} disimpan (run {self.run_id}).")
+
+    def load(self, stage):
+        """Hasil `stage` dari checkpoint, dengan urutan key seperti saat disimpan."""
+        import pyarrow.feather as feather
+
+        stage_dir = self.path / stage
+        with open(stage_dir / 'objects.pkl', 'rb') as f:
+            objects = pickle.load(f)
+        data = {}
+        for name in self.state['completed'][stage]['tables']:
+            data[name] = objects[name] if name in objects else feather.read_table(stage_dir / f"{name}.arrow").to_pandas()
+        log.info(f"Hasil tahap {stage.upper()} dimuat dari checkpoint run {self.run_id}.")
+        return data
+
+    def reuse(self, stage, source):
+        """Memakai hasil `stage` dari checkpoint `source` (hard link file, fallback salin)."""
+        target_dir = self.path / stage
+        shutil.rmtree(target_dir, ignore_errors=True)
+        target_dir.mkdir(parents=True)
+        for file in (source.path / stage).iterdir():
+            try:
+                os.link(file, target_dir / file.name)
+            except OSError:
+                shutil.copy2(file, target_dir / file.name)
+        self.state['completed'][stage] = {**source.state['completed'][stage], 'from_run': source.run_id}
+        self._write_state()
+
+
+def prune(root, keep, protect=()):
+    """
+    Menghapus checkpoint lama sehingga tersisa `keep` run terbaru. Run di `protect` dan
+    checkpoint terbaru yang memiliki hasil EXTRACT/TRANSFORM (dipakai --from-stage) tidak dihapus.
+    """
+    root = Path(root)
+    protect = set(protect)
+    for stage in DATA_STAGES:
+        latest = RunCheckpoint.latest_with(root, stage)
+        if latest is not None:
+            protect.add(latest.run_id)
+    runs = []
+    for state_path in root.glob(f'*/{STATE_FILE}'):
+        try:
+            runs.append((json.loads(state_path.read_text(encoding='utf-8'))['created_at'], state_path.parent))
+        except (OSError, ValueError, KeyError):
+            continue
+    runs.sort(reverse=True)
+    for _, path in runs[keep:]:
+        if path.name not in protect:
+            shutil.rmtree(path, ignore_errors=True)
+            log.info(f"Checkpoint lama {path.name} dihapus.")
@@ -0,0 +1,222 @@
+"""
+Arsip dingin (cold tier) histori `stock_movements` dalam format Parquet.
+
+Bulan yang sudah tertutup (berakhir lebih dari `hot_days` hari lalu) diekspor
+dari PostgreSQL menjadi satu file Parquet terkompresi per bulan, dengan layout
+yang sama seperti dataset generator (satu folder per tabel), sehingga arsip
+bisa dibaca ParquetSource:
+
+    <archive>/manifest.json
+    <archive>/stock_movements/2024-01.parquet
+    <archive>/stock_movements/2024-02.parquet
+    ...
+
+manifest.json: {tabel: {date_column, archived_until, rows, parts: [...]}}.
+`archived_until` adalah batas eksklusif: baris dengan tanggal < batas ini
+dibaca dari arsip, sisanya dari database (lihat TieredSource di sources.py).
+Bulan diekspor berurutan dan manifest ditulis ulang (atomik) setelah setiap
+bulan, sehingga job yang terhenti bisa dijalankan ulang.
+
+Setelah diekspor, bulan tersebut bisa dibiarkan di database ('keep'),
+di-DETACH dari tabel ter-partisi ('detach', tabel partisi tetap ada di luar
+stock_movements) atau dihapus ('delete': partisi di-DROP, atau DELETE pada
+tabel tanpa partisi). Baris hanya dihapus jika jumlahnya di database sama
+dengan jumlah baris di file arsip.
+"""
+import datetime as dt
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import text
+
+log = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+ARCHIVE_TABLE = 'stock_movements'
+DATE_COLUMN = 'movement_date'
+AFTER_EXPORT = ('keep', 'detach', 'delete')
+# Ukuran row group (unit terkecil yang bisa dilewati saat filter), sama dengan generator
+ROW_GROUP_ROWS = 128_000
+
+
+def read_manifest(path):
+    """Manifest arsip di `path`; dict kosong jika belum ada arsip."""
+    manifest_path = Path(path) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(path, manifest):
+    """Menulis manifest lewat file sementara + rename, agar pembaca tidak melihat file setengah jadi."""
+    manifest_path = Path(path) / MANIFEST_FILE
+    tmp_path = manifest_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _utc(value):
+    """Timestamp UTC; nilai tanpa zona waktu dianggap UTC."""
+    value = pd.Timestamp(value)
+    return value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+
+
+def closed_months(first, cutoff):
+    """List (awal, akhir eksklusif) bulan kalender UTC dari bulan `first` yang berakhir <= `cutoff`."""
+    months = []
+    first, cutoff = _utc(first), _utc(cutoff)
+    start = pd.Timestamp(year=first.year, month=first.month, day=1, tz='UTC')
+    while start + pd.DateOffset(months=1) <= cutoff:
+        months.append((start, start + pd.DateOffset(months=1)))
+        start += pd.DateOffset(months=1)
+    return months
+
+
+def arrow_schema(conn, table_name):
+    """
+    Skema Arrow tetap dari katalog PostgreSQL, agar semua file arsip punya tipe
+    yang sama (kolom yang kosong di satu bulan tidak menjadi tipe null).
+    """
+    import pyarrow as pa
+
+    types = {
+        'bigint': pa.int64(), 'integer': pa.int64(), 'smallint': pa.int64(),
+        'numeric': pa.float64(), 'double precision': pa.float64(), 'real': pa.float64(),
+        'boolean': pa.bool_(), 'date': pa.date32(),
+        'timestamp with time zone': pa.timestamp('us', tz='UTC'),
+        'timestamp without time zone': pa.timestamp('us'),
+    }
+    rows = conn.execute(text("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table
+        ORDER BY ordinal_position
+    """), {'table': table_name}).fetchall()
+    if not rows:
+        raise ValueError(f"Tabel {table_name} tidak ditemukan di database")
+    # Enum, text, varchar, dll. disimpan sebagai string
+    return pa.schema([(name, types.get(data_type, pa.string())) for name, data_type in rows])
+
+
+def _write_month(df, schema, path, compression):
+    """Menulis satu bulan (urut tanggal, agar filter tanggal melewati row group) secara atomik."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(df.sort_values(DATE_COLUMN, kind='stable'), schema=schema, preserve_index=False)
+    tmp_path = path.with_suffix('.parquet.tmp')
+    pq.write_table(table, tmp_path, compression=compression, row_group_size=ROW_GROUP_ROWS)
+    os.replace(tmp_path, path)
+    return pq.read_metadata(path).num_rows
+
+
+def _partition_for(conn, start, end):
+    """Nama partisi stock_movements dengan batas tepat [start, end), atau None (misal tabel tanpa partisi)."""
+    return conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+          AND pg_get_expr(c.relpartbound, c.oid) =
+              format('FOR VALUES FROM (%L) TO (%L)', CAST(:start AS TIMESTAMPTZ), CAST(:end AS TIMESTAMPTZ))
+    """), {'table': ARCHIVE_TABLE, 'start': start, 'end': end}).scalar()
+
+
+def _remove_month(engine, start, end, archived_rows, after_export):
+    """
+    Melepas/menghapus satu bulan yang sudah diarsip dari database. Mengembalikan
+    aksi yang dilakukan, atau None jika dilewati (jumlah baris tidak cocok).
+    """
+    with engine.begin() as conn:
+        # Tahan penulisan ke tabel selama pengecekan & penghapusan
+        conn.execute(text(f'LOCK TABLE "{ARCHIVE_TABLE}" IN SHARE ROW EXCLUSIVE MODE'))
+        db_rows = conn.execute(text(
+            f'SELECT COUNT(*) FROM "{ARCHIVE_TABLE}" WHERE "{DATE_COLUMN}" >= :start AND "{DATE_COLUMN}" < :end'
+        ), {'start': start, 'end': end}).scalar()
+        if db_rows != archived_rows:
+            log.warning(f"  -> {start:%Y-%m}: {db_rows} baris di database vs {archived_rows} di arsip, "
+                        f"bulan ini tidak dihapus dari database.")
+            return None
+
+        partition = _partition_for(conn, start, end)
+        if partition is not None:
+            conn.execute(text(f'ALTER TABLE "{ARCHIVE_TABLE}" DETACH PARTITION "{partition}"'))
+            if after_export == 'delete':
+                conn.execute(text(f'DROP TABLE "{partition}"'))
+            return after_export
+        if after_export == 'detach':
+            log.warning(f"  -> {start:%Y-%m}: tidak ada partisi bulan ini, baris dibiarkan di database.")
+            return None
+        conn.execute(text(
+            f'DELETE FROM "{ARCHIVE_TABLE}" WHERE "{DATE_COLUMN}" >= :start AND "{DATE_COLUMN}" < :end'
+        ), {'start': start, 'end': end})
+        return 'delete'
+
+
+def archive_movements(source, path, hot_days=90, compression='zstd', after_export='keep', now=None):
+    """
+    Mengekspor bulan tertutup stock_movements yang belum diarsip dari `source`
+    (SqlSource) ke `path`. Mengembalikan manifest yang diperbarui.
+    """
+    if after_export not in AFTER_EXPORT:
+        raise ValueError(f"after_export tidak dikenal: {after_export}. Pilihan: {', '.join(AFTER_EXPORT)}")
+    path = Path(path)
+    (path / ARCHIVE_TABLE).mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(path)
+    entry = manifest.setdefault(ARCHIVE_TABLE, {
+        'date_column': DATE_COLUMN, 'archived_until': None, 'rows': 0, 'parts': [],
+    })
+
+    cutoff = _utc(now or pd.Timestamp.now(tz='UTC')) - pd.Timedelta(days=hot_days)
+    with source.engine.connect() as conn:
+        schema = arrow_schema(conn, ARCHIVE_TABLE)
+        first = entry['archived_until'] or \
+            conn.execute(text(f'SELECT MIN("{DATE_COLUMN}") FROM "{ARCHIVE_TABLE}"')).scalar()
+    if first is None:
+        log.info("stock_movements kosong, tidak ada yang diarsip.")
+        return manifest
+
+    months = closed_months(first, cutoff)
+    log.info(f"Mengarsip {len(months)} bulan stock_movements sebelum {cutoff:%Y-%m-%d} ke {path.resolve()}...")
+    for start, end in months:
+        df = source.read_table(ARCHIVE_TABLE, [(DATE_COLUMN, '>=', start), (DATE_COLUMN, '<', end)])
+        part = {'month': f"{start:%Y-%m}", 'file': None, 'rows': len(df),
+                'exported_at': dt.datetime.now(dt.timezone.utc).isoformat(timespec='seconds'), 'removed': None}
+        if len(df):
+            part_path = path / ARCHIVE_TABLE / f"{start:%Y-%m}.parquet"
+            if _write_month(df, schema, part_path, compression) != len(df):
+                raise IOError(f"Jumlah baris {part_path} tidak sama dengan hasil ekspor")
+            part.update(file=part_path.relative_to(path).as_posix(),
+                        min_movement_id=int(df['movement_id'].min()), max_movement_id=int(df['movement_id'].max()))
+        entry['parts'].append(part)
+        entry['rows'] += len(df)
+        entry['archived_until'] = end.isoformat()
+        write_manifest(path, manifest)
+
+        if after_export != 'keep':
+            part['removed'] = _remove_month(source.engine, start, end, len(df), after_export)
+            write_manifest(path, manifest)
+        log.info(f"  -> {start:%Y-%m}: {len(df)} baris diarsip"
+                 f"{', ' + part['removed'] + ' dari database' if part['removed'] else ''}.")
+
+    if entry['archived_until']:
+        _check_late_rows(source.engine, entry)
+    return manifest
+
+
+def _check_late_rows(engine, entry):
+    """
+    Peringatan jika database berisi baris sebelum `archived_until` yang tidak ada
+    di arsip (misal pergerakan backdated setelah bulannya diarsip): baris ini
+    tidak pernah dibaca TieredSource.
+    """
+    with engine.connect() as conn:
+        db_rows = conn.execute(text(f'SELECT COUNT(*) FROM "{ARCHIVE_TABLE}" WHERE "{DATE_COLUMN}" < :until'),
+                               {'until': pd.Timestamp(entry['archived_until'])}).scalar()
+    kept_rows = sum(part['rows'] for part in entry['parts'] if not part['removed'])
+    if db_rows != kept_rows:
+        log.warning(f"{db_rows - kept_rows} baris stock_movements sebelum {entry['archived_until']} "
+                    f"tidak ada di arsip (pergerakan backdated?) dan tidak akan diekstrak.")
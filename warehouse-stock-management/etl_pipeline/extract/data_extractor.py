@@ -1,22 +1,57 @@
 import pandas as pd
 import yaml
 import logging
-from sqlalchemy import create_engine
+
+from .sources import create_source
 
 log = logging.getLogger(__name__)
 
+# Tabel yang dibutuhkan modul Transform
+TABLES = [
+    "products",
+    "categories",
+    "warehouses",
+    "stock",
+    "stock_movements",
+    "sales_order_details",
+    "purchase_order_details",
+]
+
+# Tabel turunan yang dipelihara trigger database (database_function/triggers.sql).
+# Jika tersedia di sumber data, tabel yang digantikannya tidak perlu diambil
+# (misal biaya rata-rata per produk tanpa mengambil seluruh histori PO).
+DERIVED_TABLES = {
+    "product_cost": "purchase_order_details",
+}
+
 class DataExtractor:
-    def __init__(self, db_config):
+    def __init__(self, db_config, source_config=None):
         """
-        Inisialisasi koneksi engine SQLAlchemy.
+        Inisialisasi sumber data: PostgreSQL (default) atau dataset Parquet
+        (lihat bagian `source` di config.yaml dan extract/sources.py).
         """
         try:
-            conn_str = f"{db_config['type']}://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['db_name']}"
-            self.engine = create_engine(conn_str)
-            log.info("Koneksi database berhasil dibuat.")
+            self.source = create_source(source_config, db_config)
+            log.info("Sumber data berhasil disiapkan.")
         except Exception as e:
-            log.error(f"Gagal membuat koneksi database: {e}")
+            log.error(f"Gagal menyiapkan sumber data: {e}")
             raise
+
+    def _read_tables(self, names):
+        """Membaca tabel-tabel `names`, memakai tabel turunan jika sumber data menyediakannya."""
+        tables, replaced = {}, set()
+        for derived, source_table in DERIVED_TABLES.items():
+            if source_table not in names:
+                continue
+            try:
+                tables[derived] = self.source.read_table(derived)
+                replaced.add(source_table)
+            except Exception as e:
+                log.info(f"Tabel {derived} tidak tersedia ({type(e).__name__}), memakai {source_table}.")
+        for name in names:
+            if name not in replaced:
+                tables[name] = self.source.read_table(name)
+        return tables
     
     def extract_full(self):
         """
@@ -24,51 +59,75 @@ class DataExtractor:
         """
         log.info("Memulai EKTRAKSI data (FULL LOAD)...")
         try:
-            with self.engine.connect() as conn:
-                tables = {
-                    "products": pd.read_sql("SELECT * FROM products", conn),
-                    "categories": pd.read_sql("SELECT * FROM categories", conn),
-                    "warehouses": pd.read_sql("SELECT * FROM warehouses", conn),
-                    "stock": pd.read_sql("SELECT * FROM stock", conn),
-                    "stock_movements": pd.read_sql("SELECT * FROM stock_movements", conn),
-                    "sales_order_details": pd.read_sql("SELECT * FROM sales_order_details", conn),
-                    "purchase_order_details": pd.read_sql("SELECT * FROM purchase_order_details", conn) # <--- TAMBAHKAN BARIS INI
-                }
+            tables = self._read_tables(TABLES)
             log.info(f"Ekstraksi FULL LOAD selesai. {len(tables['stock_movements'])} baris movements diambil.")
             return tables
         except Exception as e:
             log.error(f"Error saat full extraction: {e}")
             return None
 
-    def extract_incremental(self, last_run_timestamp):
+    def extract_incremental(self, last_run_timestamp, last_movement_id=None):
         """
         Mengekstrak data baru berdasarkan timestamp[cite: 146].
+        Jika `last_movement_id` diisi, hanya movement dengan ID lebih besar yang diambil.
         """
         log.info(f"Memulai EKSTRAKSI data (INCREMENTAL) > {last_run_timestamp}...")
         try:
-            with self.engine.connect() as conn:
-                # Hanya mengambil movements & stock yang baru
-                query = f"""
-                SELECT * FROM stock_movements 
-                WHERE movement_date > '{last_run_timestamp}'
-                """
-                tables = {
-                    "stock_movements": pd.read_sql(query, conn),
-                    "stock": pd.read_sql("SELECT * FROM stock", conn), # Stok selalu diambil full
-                    
-                    # Data master biasanya diambil full atau pakai CDC
-                    "products": pd.read_sql("SELECT * FROM products", conn),
-                    "categories": pd.read_sql("SELECT * FROM categories", conn),
-                    "warehouses": pd.read_sql("SELECT * FROM warehouses", conn),
-                    "sales_order_details": pd.read_sql("SELECT * FROM sales_order_details", conn),
-                    "purchase_order_details": pd.read_sql("SELECT * FROM purchase_order_details", conn)
-                }
+            # Hanya mengambil movements yang baru (filter didorong ke sumber data).
+            # Timestamp dikirim sebagai TIMESTAMPTZ (UTC jika tanpa zona waktu) agar
+            # PostgreSQL bisa memangkas partisi bulanan saat planning (lihat
+            # database/migrations/001_partition_stock_movements.sql)
+            since = pd.Timestamp(last_run_timestamp)
+            if since.tzinfo is None:
+                since = since.tz_localize('UTC')
+            movement_filters = [('movement_date', '>', since)]
+            if last_movement_id is not None:
+                movement_filters.append(('movement_id', '>', last_movement_id))
+            tables = {"stock_movements": self.source.read_table("stock_movements", movement_filters)}
+            
+            # Stok selalu diambil full
+            # Data master biasanya diambil full atau pakai CDC
+            tables.update(self._read_tables([name for name in TABLES if name != "stock_movements"]))
             log.info(f"Ekstraksi INCREMENTAL selesai. {len(tables['stock_movements'])} baris movements baru diambil.")
             return tables
         except Exception as e:
             log.error(f"Error saat incremental extraction: {e}")
             return None
 
+    def extract_dead_stock(self, dead_stock_days):
+        """
+        Dead stock dihitung di database oleh `find_dead_stock()` (index-only scan,
+        lihat database_function/functions.sql Task 3.8). Mengembalikan None jika
+        sumber data tidak mendukungnya; transform lalu memakai histori movements.
+        """
+        try:
+            df = self.source.call_function("find_dead_stock", int(dead_stock_days))
+            log.info(f"Dead stock dari database: {len(df)} baris.")
+            return df
+        except Exception as e:
+            log.warning(f"find_dead_stock tidak dapat dipanggil ({e}), dead stock dihitung dari movements.")
+            return None
+
+    def extract_average_inventory(self, df_movements):
+        """
+        Rata-rata kuantitas stok per (produk, gudang) selama rentang tanggal
+        `df_movements` (setelah handle_data_quality_issues), dari snapshot harian
+        (`average_stock_quantity()`, lihat database_function/snapshots.sql Task 3.9).
+        Tanggal di masa depan tidak ikut memperluas rentang (snapshot-nya belum ada).
+        Mengembalikan None jika sumber data tidak mendukungnya; transform lalu memakai
+        stok saat ini.
+        """
+        try:
+            movement_dates = pd.to_datetime(df_movements['movement_date'], utc=True)
+            movement_dates = movement_dates[movement_dates <= pd.to_datetime('now', utc=True)]
+            date_from, date_to = movement_dates.min().date(), movement_dates.max().date()
+            df = self.source.call_function("average_stock_quantity", date_from, date_to)
+            log.info(f"Rata-rata inventori dari snapshot {date_from} s/d {date_to}: {len(df)} baris.")
+            return df
+        except Exception as e:
+            log.warning(f"average_stock_quantity tidak dapat dipanggil ({e}), rata-rata inventori dari stok saat ini.")
+            return None
+
     def handle_data_quality_issues(self, data_frames):
         """
         Menangani isu kualitas data yang kita buat di Task 2[cite: 147].
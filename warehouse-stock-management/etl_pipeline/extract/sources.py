@@ -0,0 +1,183 @@
+"""
+Sumber data untuk tahap EXTRACT.
+
+Setiap sumber hanya perlu menyediakan `read_table(nama_tabel, filters=None)` yang
+mengembalikan DataFrame. `filters` adalah list tuple (kolom, operator, nilai) yang
+digabung dengan AND, misal [('movement_date', '>', '2023-01-01 00:00:00')].
+Sumber database juga menyediakan `call_function(nama_fungsi, *args)`.
+
+  - SqlSource     : PostgreSQL via SQLAlchemy; filter menjadi klausa WHERE ber-parameter.
+  - ParquetSource : dataset Parquet hasil generator (`format: "parquet"`), satu folder
+                    per tabel. Filter didorong ke pyarrow.dataset sehingga file part dan
+                    row group di luar rentang (statistik min/max) tidak dibaca sama sekali.
+  - TieredSource  : SqlSource + arsip dingin Parquet (extract/archive.py). Histori yang
+                    sudah diarsip dibaca dari file lokal, sisanya dari database.
+"""
+import logging
+import os
+import operator
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Operator filter yang didukung (sama untuk SQL dan Arrow)
+OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+class DataSource(ABC):
+    """Antarmuka sumber data untuk DataExtractor (sumber tanpa read_table gagal saat dibuat)."""
+
+    @abstractmethod
+    def read_table(self, table_name, filters=None):
+        """DataFrame `table_name`, difilter dengan list (kolom, operator, nilai)."""
+
+    def call_function(self, function_name, *args):
+        """Hasil fungsi set-returning di database; tidak tersedia untuk sumber file."""
+        raise NotImplementedError(f"{type(self).__name__} tidak mendukung fungsi database")
+
+
+class SqlSource(DataSource):
+    def __init__(self, db_config):
+        """Inisialisasi koneksi engine SQLAlchemy (diimpor di sini: run Parquet tidak membutuhkannya)."""
+        from sqlalchemy import create_engine
+
+        conn_str = f"{db_config['type']}://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['db_name']}"
+        self.engine = create_engine(conn_str)
+
+    def read_table(self, table_name, filters=None):
+        conditions, params = [], {}
+        for i, (column, op, value) in enumerate(filters or []):
+            if op not in OPERATORS:
+                raise ValueError(f"Operator filter tidak didukung: {op}")
+            conditions.append(f'"{column}" {op} :p{i}')
+            params[f'p{i}'] = value
+        query = f'SELECT * FROM "{table_name}"'
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        from sqlalchemy import text
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(query), conn, params=params)
+
+    def call_function(self, function_name, *args):
+        """`SELECT * FROM function_name(args...)` sebagai DataFrame (misal find_dead_stock)."""
+        placeholders = ", ".join(f":p{i}" for i in range(len(args)))
+        query = f'SELECT * FROM "{function_name}"({placeholders})'
+        from sqlalchemy import text
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(query), conn, params={f'p{i}': value for i, value in enumerate(args)})
+
+
+class ParquetSource(DataSource):
+    def __init__(self, path):
+        """`path` = direktori berisi satu folder Parquet per tabel (output/parquet generator)."""
+        # pyarrow hanya diimpor jika sumber Parquet dipakai (start-up CLI tetap ringan)
+        import pyarrow.dataset as ds
+        self._ds = ds
+        self.path = Path(path)
+        if not self.path.is_dir():
+            raise FileNotFoundError(f"Direktori dataset Parquet tidak ditemukan: {self.path}")
+
+    def _filter_expression(self, dataset, filters):
+        """Mengubah list filter menjadi ekspresi pyarrow (dievaluasi pada statistik part/row group)."""
+        import pyarrow as pa
+
+        expression = None
+        for column, op, value in filters:
+            if op not in OPERATORS:
+                raise ValueError(f"Operator filter tidak didukung: {op}")
+            field_type = dataset.schema.field(column).type
+            if pa.types.is_timestamp(field_type):
+                value = pd.Timestamp(value)
+                # Literal tanpa zona waktu dianggap UTC (sama seperti sesi PostgreSQL default)
+                if field_type.tz and value.tzinfo is None:
+                    value = value.tz_localize('UTC')
+            condition = OPERATORS[op](self._ds.field(column), pa.scalar(value, type=field_type))
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def read_table(self, table_name, filters=None):
+        dataset = self._ds.dataset(self.path / table_name, format='parquet')
+        expression = self._filter_expression(dataset, filters) if filters else None
+        # ignore_metadata & nanodetik: tipe kolom mengikuti hasil pd.read_sql
+        # (misal INT nullable -> float, TIMESTAMPTZ -> datetime64[ns, UTC])
+        return dataset.to_table(filter=expression).to_pandas(ignore_metadata=True, coerce_temporal_nanoseconds=True)
+
+
+def _align_null_columns(df, other):
+    """
+    Kolom yang seluruhnya NULL di `df` (misal reference_id di batch baru, bertipe
+    object dari pd.read_sql) diberi tipe kolom yang sama di `other` agar hasil
+    concat tidak bergantung pada kolom kosong.
+    """
+    for column in df.columns.intersection(other.columns):
+        if df[column].dtype != other[column].dtype and df[column].isna().all():
+            target = other[column].dtype
+            df = df.assign(**{column: df[column].astype('float64' if target.kind in 'iub' else target)})
+    return df
+
+
+class TieredSource(DataSource):
+    def __init__(self, hot, archive_path):
+        """
+        `hot` = sumber database; `archive_path` = direktori arsip berisi manifest.json.
+        Tabel yang tercatat di manifest digabung: baris dengan tanggal < archived_until
+        dari file Parquet (filter didorong ke pyarrow), sisanya dari database.
+        """
+        from .archive import read_manifest
+        self.hot = hot
+        self.cold = ParquetSource(archive_path)
+        self.manifest = read_manifest(archive_path)
+
+    def read_table(self, table_name, filters=None):
+        entry = self.manifest.get(table_name)
+        if not entry or not entry.get('archived_until'):
+            return self.hot.read_table(table_name, filters)
+        # Batas tier: database hanya dibaca mulai archived_until (baris yang masih
+        # tersimpan di database sebelum batas ini sudah ada di arsip)
+        hot_filters = list(filters or []) + [(entry['date_column'], '>=', pd.Timestamp(entry['archived_until']))]
+        hot = self.hot.read_table(table_name, hot_filters)
+        if not entry['rows']:
+            return hot
+        cold = self.cold.read_table(table_name, filters)
+        if hot.empty or cold.empty:
+            return cold if hot.empty else hot
+        return pd.concat([_align_null_columns(cold, hot), _align_null_columns(hot, cold)], ignore_index=True)
+
+    def call_function(self, function_name, *args):
+        return self.hot.call_function(function_name, *args)
+
+
+def get_source_type(source_config):
+    """Tipe sumber data; bisa ditimpa dengan env var ETL_SOURCE (misal ETL_SOURCE=parquet di CI)."""
+    return os.environ.get('ETL_SOURCE', (source_config or {}).get('type', 'database')).lower()
+
+
+def create_source(source_config, db_config):
+    """Membuat sumber data dari bagian `source` config.yaml."""
+    source_config = source_config or {}
+    source_type = get_source_type(source_config)
+    if source_type == 'parquet':
+        path = os.environ.get('ETL_SOURCE_PATH', source_config.get('path', '../data_generator/output/parquet'))
+        log.info(f"Sumber data: dataset Parquet di {Path(path).resolve()}")
+        return ParquetSource(path)
+    if source_type != 'database':
+        raise ValueError(f"Tipe sumber data tidak dikenal: {source_type}. Pilihan: database, parquet")
+    log.info("Sumber data: database PostgreSQL")
+    source = SqlSource(db_config)
+    archive_path = (source_config.get('archive') or {}).get('path')
+    if archive_path:
+        if (Path(archive_path) / 'manifest.json').exists():
+            log.info(f"Arsip dingin stock_movements: {Path(archive_path).resolve()}")
+            return TieredSource(source, archive_path)
+        log.info(f"Arsip {archive_path} belum ada (jalankan archive_movements.py), semua data dari database.")
+    return source
@@ -0,0 +1,257 @@
+"""
+Metrik terstruktur per tahap pipeline (span).
+
+    with span('transform.inventory_metrics', rows_in=len(df)) as s:
+        ...
+        s.rows_out = len(hasil)
+
+    @instrumented('report.narrative')
+    def generate_narrative_analysis(...): ...
+
+Setiap span mencatat waktu wall & CPU (proses), baris masuk/keluar, throughput
+(baris masuk per detik wall; baris keluar jika tidak ada baris masuk, misal
+ekstraksi) dan puncak RSS proses selama span. Span boleh bersarang;
+`parent_id` menunjuk span induk di thread yang sama. Exception tetap
+diteruskan, span dicatat dengan status 'error'.
+
+Span hanya dicatat selama ada run aktif (`start_run` ... `finish_run`, dipanggil
+main.run_pipeline); di luar itu (test, benchmark, pemakaian modul langsung)
+`span` tidak melakukan apa pun selain mengembalikan objek Span.
+
+Hasil run: satu baris JSON per span di file JSON Lines (ditulis saat span
+selesai, sehingga run yang gagal tetap tercatat), lalu tabel etl_run_metrics
+(database/migrations/003_etl_run_metrics.sql) dengan kunci (run_id, span_id).
+
+Puncak memori: di Linux puncak RSS (VmHWM) di-reset di awal setiap span
+(/proc/self/clear_refs), sehingga nilainya milik span tersebut. Jika tidak
+bisa di-reset, yang tercatat adalah puncak RSS proses sejak start. Proses
+worker (render chart, PDF) tidak ikut dihitung; span di thread latar belakang
+(narasi) tidak mengukur memori.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+CLEAR_REFS = Path('/proc/self/clear_refs')
+PROC_STATUS = Path('/proc/self/status')
+
+# Kolom tabel etl_run_metrics (urutan kolom file JSON Lines juga sama)
+COLUMNS = ['run_id', 'span_id', 'parent_id', 'span', 'started_at', 'wall_seconds', 'cpu_seconds',
+           'rows_in', 'rows_out', 'rows_per_second', 'peak_rss_mb', 'status', 'details']
+
+_active = None
+
+
+def _reset_peak_rss():
+    """Reset puncak RSS proses ke RSS saat ini (Linux); False jika tidak didukung."""
+    try:
+        CLEAR_REFS.write_text('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    """Puncak RSS proses dalam MB (VmHWM; fallback ru_maxrss), None jika tidak tersedia."""
+    try:
+        for line in PROC_STATUS.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except (ImportError, OSError):
+        return None
+
+
+def count_rows(obj):
+    """Jumlah baris DataFrame, atau total baris DataFrame di dalam dict (misal hasil extract)."""
+    if hasattr(obj, 'shape'):
+        return int(obj.shape[0])
+    if isinstance(obj, dict):
+        return sum(int(v.shape[0]) for v in obj.values() if hasattr(v, 'shape'))
+    return None
+
+
+class Span:
+    """Satu pengukuran; `rows_out` dan `details` boleh diisi di dalam blok `with`."""
+
+    def __init__(self, name, rows_in=None, **details):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.details = details
+        self.span_id = None
+        self.parent_id = None
+        self.peak_rss_mb = None
+
+
+class RunMetrics:
+    """Span-span satu run pipeline; ditulis ke JSON Lines saat selesai dan ke database di akhir run."""
+
+    def __init__(self, run_id=None, jsonl_path=None):
+        self.run_id = run_id or f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_id = 0
+        self._track_memory = _reset_peak_rss()
+        if self.jsonl_path:
+            self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _enter(self, s):
+        stack = self._stack()
+        with self._lock:
+            s.span_id = self._next_id
+            self._next_id += 1
+        s.parent_id = stack[-1].span_id if stack else None
+        if threading.current_thread() is threading.main_thread():
+            # Puncak sejauh ini milik span induk, lalu mulai hitung ulang untuk span ini
+            if stack:
+                stack[-1].peak_rss_mb = max(filter(None, [stack[-1].peak_rss_mb, _peak_rss_mb()]), default=None)
+            if self._track_memory:
+                _reset_peak_rss()
+        stack.append(s)
+
+    def _exit(self, s, started_at, wall, cpu, status):
+        stack = self._stack()
+        stack.pop()
+        if threading.current_thread() is threading.main_thread():
+            s.peak_rss_mb = max(filter(None, [s.peak_rss_mb, _peak_rss_mb()]), default=None)
+            if stack:
+                stack[-1].peak_rss_mb = max(filter(None, [stack[-1].peak_rss_mb, s.peak_rss_mb]), default=None)
+        rows = s.rows_in if s.rows_in is not None else s.rows_out
+        record = {
+            'run_id': self.run_id,
+            'span_id': s.span_id,
+            'parent_id': s.parent_id,
+            'span': s.name,
+            'started_at': started_at.isoformat(),
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'rows_in': s.rows_in,
+            'rows_out': s.rows_out,
+            'rows_per_second': round(rows / wall, 1) if rows is not None and wall > 0 else None,
+            'peak_rss_mb': round(s.peak_rss_mb, 1) if s.peak_rss_mb is not None else None,
+            'status': status,
+            'details': s.details or None,
+        }
+        with self._lock:
+            self.records.append(record)
+            if self.jsonl_path:
+                try:
+                    with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, default=str) + '\n')
+                except OSError as e:
+                    log.warning(f"Gagal menulis metrik ke {self.jsonl_path}: {e}")
+
+    def to_frame(self):
+        """Span yang sudah selesai sebagai DataFrame (urut span_id, details sebagai teks JSON)."""
+        import pandas as pd
+        df = pd.DataFrame(self.records, columns=COLUMNS).sort_values('span_id', ignore_index=True)
+        df['started_at'] = pd.to_datetime(df['started_at'])
+        df['details'] = df['details'].map(lambda d: json.dumps(d, default=str) if d else None)
+        return df
+
+    def save_to_table(self, engine, table_name):
+        """Menambahkan span run ini ke tabel `table_name` (append)."""
+        self.to_frame().to_sql(table_name, engine, if_exists='append', index=False)
+
+
+class _SpanContext:
+    def __init__(self, name, rows_in, details):
+        self.span = Span(name, rows_in, **details)
+        self.metrics = _active
+
+    def __enter__(self):
+        if self.metrics is not None:
+            self.started_at = datetime.now(timezone.utc)
+            self.wall_start = time.perf_counter()
+            self.cpu_start = time.process_time()
+            self.metrics._enter(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.metrics is not None:
+            self.metrics._exit(self.span, self.started_at,
+                               time.perf_counter() - self.wall_start,
+                               time.process_time() - self.cpu_start,
+                               'ok' if exc_type is None else 'error')
+        return False
+
+
+def span(name, rows_in=None, **details):
+    """Context manager pengukuran satu tahap; `details` = atribut tambahan (misal nama file)."""
+    return _SpanContext(name, rows_in, details)
+
+
+def instrumented(name, rows=False):
+    """
+    Decorator versi `span`. Dengan `rows=True`, rows_in/rows_out dihitung dari
+    argumen pertama dan hasil fungsi (lihat `count_rows`).
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, rows_in=count_rows(args[0]) if rows and args else None) as s:
+                result = function(*args, **kwargs)
+                if rows:
+                    s.rows_out = count_rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def start_run(metrics_config=None):
+    """Memulai run metrik (config.yaml bagian `metrics`); None jika dinonaktifkan."""
+    global _active
+    metrics_config = metrics_config or {}
+    if not metrics_config.get('enabled', True):
+        return None
+    _active = RunMetrics(jsonl_path=metrics_config.get('jsonl_path', 'etl_run_metrics.jsonl'))
+    log.info(f"Run ID metrik: {_active.run_id}")
+    return _active
+
+
+def finish_run(metrics, metrics_config=None, db_config=None, engine=None):
+    """
+    Menutup run aktif dan (jika ada database & table_name) menyimpan span ke database.
+    `engine` = engine SQLAlchemy milik pemanggil (misal DataLoader daemon, koneksi
+    tetap hangat); tanpa itu engine sementara dibuat dari `db_config` lalu di-dispose.
+    """
+    global _active
+    if metrics is None:
+        return
+    if _active is metrics:
+        _active = None
+    table_name = (metrics_config or {}).get('table_name', 'etl_run_metrics')
+    if not (engine or db_config) or not table_name or not metrics.records:
+        return
+    owned_engine = None
+    try:
+        if engine is None:
+            from sqlalchemy import create_engine
+            conn_str = f"{db_config['type']}://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['db_name']}"
+            engine = owned_engine = create_engine(conn_str)
+        metrics.save_to_table(engine, table_name)
+        log.info(f"{len(metrics.records)} span metrik disimpan ke tabel {table_name} (run {metrics.run_id}).")
+    except Exception as e:
+        log.warning(f"Gagal menyimpan metrik ke tabel {table_name}: {e}")
+    finally:
+        if owned_engine is not None:
+            owned_engine.dispose()
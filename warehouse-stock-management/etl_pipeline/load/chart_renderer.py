@@ -0,0 +1,231 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Naikkan versi ini setiap kali logika menggambar chart berubah,
+# agar chart lama di cache tidak dipakai lagi.
+RENDERER_VERSION = 1
+
+DEFAULT_STYLE = {'style': 'ggplot', 'dpi': 100}
+
+# Jumlah maksimal file di charts/.cache; data berubah setiap run sehingga tanpa
+# batas cache terus bertambah (terutama dengan chart per gudang)
+DEFAULT_CACHE_MAX_ENTRIES = 256
+
+
+def get_mp_context():
+    """
+    Context multiprocessing untuk worker rendering (juga worker map-reduce
+    transform/sharded.py).
+    'forkserver' dipakai jika tersedia agar worker tidak mewarisi thread/lock
+    dari proses pipeline (misal thread pemanggil AI); fallback ke 'spawn'.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        # Worker langsung siap dengan matplotlib, pandas & pyarrow ter-impor
+        # (satu forkserver per proses, dipakai bersama render chart & transform)
+        ctx.set_forkserver_preload(['matplotlib', 'matplotlib.figure', 'matplotlib.backends.backend_agg',
+                                    'pandas', 'pyarrow'])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+def available_cpus():
+    """Jumlah CPU yang benar-benar bisa dipakai proses ini (menghormati cgroup/affinity)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def make_chart_spec(name, kind, data, title, xlabel='', ylabel='', figsize=(10, 6), **options):
+    """
+    Membuat spesifikasi chart. Data harus sudah diagregasi (kecil),
+    karena dikirim ke proses worker.
+    """
+    return {
+        'name': name,
+        'filename': f"{name}.png",
+        'kind': kind,
+        'data': data,
+        'title': title,
+        'xlabel': xlabel,
+        'ylabel': ylabel,
+        'figsize': tuple(figsize),
+        'options': options,
+    }
+
+
+def chart_cache_key(spec, style=None):
+    """Hash SHA-256 dari data input, opsi, dan style chart."""
+    style = style or DEFAULT_STYLE
+    h = hashlib.sha256()
+    meta = {
+        'version': RENDERER_VERSION,
+        'kind': spec['kind'],
+        'title': spec['title'],
+        'xlabel': spec['xlabel'],
+        'ylabel': spec['ylabel'],
+        'figsize': spec['figsize'],
+        'options': spec['options'],
+        'style': style,
+    }
+    h.update(json.dumps(meta, sort_keys=True, default=str).encode('utf-8'))
+
+    data = spec['data']
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    h.update(json.dumps([[str(c) for c in data.columns], [str(t) for t in data.dtypes]]).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+# --- Fungsi menggambar (Object-Oriented API, tanpa pyplot) ---
+def _draw_line(ax, data, opts):
+    ax.plot(data[opts['x']], data[opts['y']], marker='o', linestyle='-')
+    ax.grid(True, linestyle='--', alpha=0.6)
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+def _draw_donut(ax, data, opts):
+    ax.pie(data.values, labels=data.index, autopct='%1.1f%%', startangle=90, wedgeprops=dict(width=0.4))
+    ax.set_ylabel('')
+
+
+def _draw_stacked_bar(ax, data, opts):
+    x = np.arange(len(data))
+    bottom = np.zeros(len(data))
+    for col in data.columns:
+        values = data[col].to_numpy(dtype=float)
+        ax.bar(x, values, bottom=bottom, label=col, width=0.5)
+        bottom += values
+    ax.set_xticks(x, labels=[str(i) for i in data.index])
+    ax.legend(title=opts.get('legend_title'))
+
+
+def _draw_barh_rupiah(ax, data, opts):
+    from matplotlib.ticker import FuncFormatter
+
+    y = np.arange(len(data))
+    ax.barh(y, data[opts['x']], color='skyblue')
+    ax.set_yticks(y, labels=data[opts['y']].astype(str))
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, p: f'Rp {x/1e9:,.1f} M'))
+    ax.grid(True, linestyle='--', axis='x', alpha=0.6)
+
+
+_DRAWERS = {
+    'line': _draw_line,
+    'donut': _draw_donut,
+    'stacked_bar': _draw_stacked_bar,
+    'barh_rupiah': _draw_barh_rupiah,
+}
+
+
+def render_chart(spec, style, path):
+    """Me-render satu chart ke `path` (dijalankan di proses worker)."""
+    import matplotlib.style as mstyle
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    path = Path(path)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp.png")
+    with mstyle.context(style['style']):
+        fig = Figure(figsize=spec['figsize'])
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        _DRAWERS[spec['kind']](ax, spec['data'], spec['options'])
+        ax.set_title(spec['title'])
+        ax.set_xlabel(spec['xlabel'])
+        ax.set_ylabel(spec['ylabel'])
+        fig.tight_layout()
+        fig.savefig(tmp_path, bbox_inches='tight', dpi=style['dpi'])
+    # Tulis atomik agar cache tidak pernah berisi file setengah jadi
+    os.replace(tmp_path, path)
+    return str(path)
+
+
+def prune_chart_cache(cache_dir, keep, max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+    """
+    Menghapus file cache yang paling lama tidak dipakai (atime, di-set saat cache
+    hit) sampai tersisa `max_entries`. File di `keep` (dipakai run ini) tidak dihapus.
+    """
+    entries = [path for path in Path(cache_dir).glob('*.png') if path not in keep]
+    excess = min(len(entries), len(entries) + len(keep) - max_entries)
+    if excess <= 0:
+        return 0
+    entries.sort(key=lambda path: path.stat().st_atime)
+    for path in entries[:excess]:
+        path.unlink(missing_ok=True)
+    log.info(f"  -> {excess} chart lama dihapus dari cache.")
+    return excess
+
+
+def render_charts(specs, charts_dir, style=None, workers=None, use_cache=True,
+                  cache_max_entries=DEFAULT_CACHE_MAX_ENTRIES):
+    """
+    Me-render daftar chart secara paralel di process pool.
+    Chart yang hash data+style-nya sudah ada di cache tidak digambar ulang;
+    cache dibatasi `cache_max_entries` file (None = tanpa batas).
+    Mengembalikan dict {nama_chart: path relatif 'charts/<file>'}.
+    """
+    style = {**DEFAULT_STYLE, **(style or {})}
+    charts_dir = Path(charts_dir)
+    cache_dir = charts_dir / '.cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Lebih banyak worker daripada CPU hanya menambah overhead start-up proses
+    workers = min(workers or available_cpus(), available_cpus())
+
+    cached_paths = {}
+    pending = []
+    for spec in specs:
+        cache_path = cache_dir / f"{chart_cache_key(spec, style)}.png"
+        cached_paths[spec['name']] = cache_path
+        if use_cache and cache_path.exists():
+            # Tandai dipakai (atime) untuk eviction; mtime = waktu render tetap
+            os.utime(cache_path, ns=(time.time_ns(), cache_path.stat().st_mtime_ns))
+        else:
+            pending.append(spec)
+
+    log.info(f"  -> {len(specs) - len(pending)} chart diambil dari cache, {len(pending)} chart di-render.")
+
+    failed = set()
+    if pending and (workers <= 1 or len(pending) == 1):
+        for spec in pending:
+            try:
+                render_chart(spec, style, cached_paths[spec['name']])
+            except Exception as e:
+                log.error(f"Gagal membuat chart {spec['name']}: {e}")
+                failed.add(spec['name'])
+    elif pending:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=get_mp_context()) as pool:
+            futures = {
+                spec['name']: pool.submit(render_chart, spec, style, cached_paths[spec['name']])
+                for spec in pending
+            }
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error(f"Gagal membuat chart {name}: {e}")
+                    failed.add(name)
+
+    chart_paths = {}
+    for spec in specs:
+        if spec['name'] in failed:
+            continue
+        shutil.copyfile(cached_paths[spec['name']], charts_dir / spec['filename'])
+        chart_paths[spec['name']] = f"charts/{spec['filename']}"
+
+    if cache_max_entries is not None:
+        prune_chart_cache(cache_dir, set(cached_paths.values()), cache_max_entries)
+    return chart_paths
@@ -1,7 +1,8 @@
 import pandas as pd
 import logging
 from pathlib import Path
-from sqlalchemy import create_engine
+
+from instrumentation import span
 
 log = logging.getLogger(__name__)
 
@@ -17,6 +18,9 @@ class DataLoader:
         self.engine = None
         if db_config:
             try:
+                # Diimpor hanya jika ada database (run Parquet & start-up CLI tanpa SQLAlchemy)
+                from sqlalchemy import create_engine
+
                 conn_str = f"{db_config['type']}://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['db_name']}"
                 self.engine = create_engine(conn_str)
                 log.info("Koneksi database untuk Loader berhasil dibuat.")
@@ -46,17 +50,20 @@ class DataLoader:
                 df = pd.DataFrame([df])
             
             try:
-                if self.output_format == 'parquet':
-                    path = self.output_dir / f"{name}.parquet"
-                    df.to_parquet(path, index=False)
-                elif self.output_format == 'csv':
-                    path = self.output_dir / f"{name}.csv"
-                    df.to_csv(path, index=False)
-                elif self.output_format == 'excel':
-                    # Excel tidak ideal untuk data besar, tapi sebagai opsi
-                    path = self.output_dir / f"{name}.xlsx"
-                    df.to_excel(path, index=False, engine='openpyxl')
-                
+                with span('load.save_file', rows_in=len(df), file=name, format=self.output_format) as s:
+                    if self.output_format == 'parquet':
+                        path = self.output_dir / f"{name}.parquet"
+                        df.to_parquet(path, index=False)
+                    elif self.output_format == 'csv':
+                        path = self.output_dir / f"{name}.csv"
+                        df.to_csv(path, index=False)
+                    elif self.output_format == 'excel':
+                        # Excel tidak ideal untuk data besar, tapi sebagai opsi
+                        path = self.output_dir / f"{name}.xlsx"
+                        df.to_excel(path, index=False, engine='openpyxl')
+                    s.rows_out = len(df)
+                    s.details['bytes'] = path.stat().st_size
+
                 log.info(f"  -> Berhasil menyimpan {path.name}")
                 
             except Exception as e:
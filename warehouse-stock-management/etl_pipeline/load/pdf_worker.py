@@ -0,0 +1,88 @@
+import importlib.util
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from load.chart_renderer import get_mp_context
+
+log = logging.getLogger(__name__)
+
+
+def weasyprint_available():
+    """Cek ketersediaan WeasyPrint tanpa mengimpornya (impor dilakukan di worker)."""
+    return importlib.util.find_spec('weasyprint') is not None
+
+
+def render_pdf(html_path, pdf_path, base_url):
+    """Konversi HTML -> PDF dengan WeasyPrint (dijalankan di proses worker)."""
+    from weasyprint import HTML
+
+    HTML(filename=str(html_path), base_url=base_url).write_pdf(str(pdf_path))
+    return str(pdf_path)
+
+
+class PdfRenderWorker:
+    """
+    Worker latar belakang untuk konversi HTML -> PDF.
+    Pipeline cukup men-`submit` file HTML lalu melanjutkan pekerjaan lain;
+    `wait()` dipanggil di akhir run untuk memastikan semua PDF selesai.
+    `render` (default `render_pdf`) harus fungsi level modul agar bisa di-pickle ke worker.
+    """
+
+    def __init__(self, background=True, render=render_pdf):
+        self.background = background
+        self.render = render
+        self._executor = None
+        self._jobs = []
+        self._available = None
+
+    def submit(self, html_path, pdf_path, base_url):
+        if self._available is None:
+            self._available = weasyprint_available()
+            if not self._available:
+                log.warning("WeasyPrint tidak tersedia. Melewatkan pembuatan PDF.")
+        if not self._available:
+            return
+
+        if not self.background:
+            try:
+                self.render(html_path, pdf_path, base_url)
+                log.info(f"Laporan PDF (via WeasyPrint) berhasil disimpan di: {pdf_path}")
+            except Exception as e:
+                log.error(f"Gagal membuat PDF dengan WeasyPrint: {e}")
+            return
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=get_mp_context())
+        self._jobs.append((pdf_path, self._executor.submit(self.render, html_path, pdf_path, base_url)))
+        log.info(f"Pembuatan PDF {pdf_path} diserahkan ke worker latar belakang.")
+
+    def wait(self, timeout=None):
+        """
+        Menunggu semua PDF selesai. Mengembalikan jumlah PDF yang berhasil dibuat.
+        `timeout` (detik) berlaku untuk seluruh job sekaligus; job yang belum selesai
+        saat tenggat habis dibatalkan/ditinggalkan dan dicatat di log.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        succeeded, unfinished = 0, []
+        for pdf_path, future in self._jobs:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+                succeeded += 1
+                log.info(f"Laporan PDF (via WeasyPrint) berhasil disimpan di: {pdf_path}")
+            except Exception as e:
+                if not future.done():
+                    unfinished.append(str(pdf_path))
+                else:
+                    log.error(f"Gagal membuat PDF dengan WeasyPrint ({pdf_path}): {e}")
+        self._jobs = []
+        if self._executor is not None:
+            if unfinished:
+                log.error(f"Pembuatan PDF melewati batas waktu {timeout} detik; belum selesai: "
+                          f"{', '.join(unfinished)}")
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                self._executor.shutdown(wait=True)
+            self._executor = None
+        return succeeded
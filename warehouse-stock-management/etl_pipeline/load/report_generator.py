@@ -1,11 +1,9 @@
+import functools
 import logging
 import pandas as pd
-from jinja2 import Environment, FileSystemLoader
 from pathlib import Path
-import matplotlib.pyplot as plt
 import numpy as np
 import sys
-from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
@@ -14,155 +12,224 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 # PERUBAHAN: Impor fungsi dari model.py
-from model import generate_narrative_analysis
-
-# Impor untuk WeasyPrint
-try:
-    from weasyprint import HTML
-    WEASYPRINT_AVAILABLE = True
-except ImportError:
-    WEASYPRINT_AVAILABLE = False
-    log = logging.getLogger(__name__) 
-    log.warning("WeasyPrint tidak ditemukan. Laporan PDF tidak akan dibuat. Instal dengan `pip install WeasyPrint`.")
+from model import request_narrative_async
+from instrumentation import span
+from load.chart_renderer import DEFAULT_CACHE_MAX_ENTRIES, make_chart_spec, render_charts
+from load.pdf_worker import PdfRenderWorker
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
 
+MOVEMENT_TYPES = ['IN', 'OUT', 'TRANSFER', 'ADJUSTMENT', 'RETURN']
+
+# Template laporan disimpan di dalam paket (tidak lagi ditulis ulang setiap run)
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+
+
+# --- Fungsi Helper Formatting ---
+def format_rupiah(value):
+    """Format angka sebagai Rupiah, misal: 1.234.567,89"""
+    try:
+        s = f"{float(value):,.2f}"
+        s_swap = s.replace(",", "X").replace(".", ",").replace("X", ".")
+        return s_swap
+    except (ValueError, TypeError, AttributeError):
+        return str(value)
+
+def format_number(value, precision=1):
+    """Format angka biasa, misal: 3.590,8"""
+    try:
+        s = f"{float(value):,.{precision}f}"
+        s_swap = s.replace(",", "X").replace(".", ",").replace("X", ".")
+        return s_swap
+    except (ValueError, TypeError, AttributeError):
+        return str(value)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template_env(template_dir=str(TEMPLATE_DIR), bytecode_cache_dir=None):
+    """
+    Environment Jinja dibuat sekali per proses (template terkompilasi di-cache
+    di memori), dengan bytecode cache di disk agar proses berikutnya tidak perlu
+    mem-parse ulang template.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    bytecode_cache = None
+    if bytecode_cache_dir:
+        Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+
+    env = Environment(loader=FileSystemLoader(template_dir), bytecode_cache=bytecode_cache, auto_reload=False)
+    # Daftarkan filter kustom ke Jinja
+    env.filters['format_rupiah'] = format_rupiah
+    env.filters['format_number'] = format_number
+    return env
+
+
 class ReportGenerator:
-    def __init__(self, output_dir="reports", report_filename="warehouse_report"):
+    def __init__(self, output_dir="reports", report_filename="warehouse_report", chart_config=None,
+                 narrative_config=None, pdf_config=None, template_cache_dir=".cache/jinja"):
         self.output_dir = Path(output_dir)
         self.report_filename = report_filename
-        self.template_dir = Path(__file__).parent
-        plt.style.use('ggplot') 
-        
-        # Daftarkan filter kustom ke Jinja
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
-        self.env.filters['format_rupiah'] = self.format_rupiah
-        self.env.filters['format_number'] = self.format_number
+        self.template_dir = TEMPLATE_DIR
+
+        # Konfigurasi rendering chart (lihat 'output.charts' di config.yaml)
+        chart_config = chart_config or {}
+        self.chart_workers = chart_config.get('workers')
+        self.chart_cache = chart_config.get('cache', True)
+        self.chart_cache_max_entries = chart_config.get('cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES)
+        self.per_warehouse_charts = chart_config.get('per_warehouse', False)
+
+        # Konfigurasi narasi AI (lihat 'narrative' di config.yaml)
+        self.narrative_config = narrative_config or {}
         
+        # Template Jinja terkompilasi (di-cache per proses + bytecode cache di disk)
+        self.env = get_template_env(str(self.template_dir), template_cache_dir)
+
+        # Konversi HTML -> PDF di worker proses latar belakang
+        pdf_config = pdf_config or {}
+        self.pdf_worker = PdfRenderWorker(background=pdf_config.get('background', True))
+        self.pdf_timeout = pdf_config.get('timeout')
+
         self.charts_dir = self.output_dir / "charts"
         self.charts_dir.mkdir(parents=True, exist_ok=True)
         log.info(f"Direktori charts disiapkan di: {self.charts_dir}")
 
     # --- Fungsi Helper Formatting ---
-    def format_rupiah(self, value):
-        """Format angka sebagai Rupiah, misal: 1.234.567,89"""
-        try:
-            s = f"{float(value):,.2f}"
-            s_swap = s.replace(",", "X").replace(".", ",").replace("X", ".")
-            return s_swap
-        except (ValueError, TypeError, AttributeError):
-            return str(value)
-
-    def format_number(self, value, precision=1):
-        """Format angka biasa, misal: 3.590,8"""
-        try:
-            s = f"{float(value):,.{precision}f}"
-            s_swap = s.replace(",", "X").replace(".", ",").replace("X", ".")
-            return s_swap
-        except (ValueError, TypeError, AttributeError):
-            return str(value)
+    format_rupiah = staticmethod(format_rupiah)
+    format_number = staticmethod(format_number)
 
     # --- Menggunakan Jalur Relatif untuk Charts ---
+    def build_chart_specs(self, data_frames):
+        """Menyiapkan spesifikasi chart (data sudah diagregasi) untuk di-render."""
+        specs = []
+
+        # 1. Chart: Monthly Movements
+        if 'monthly_trends' in data_frames:
+            df = data_frames['monthly_trends'][['movement_date', 'monthly_movements']]
+            specs.append(make_chart_spec(
+                'monthly_movements', 'line', df, 'Monthly Sales Movements',
+                xlabel='Date', ylabel='Total Movements', figsize=(10, 6),
+                x='movement_date', y='monthly_movements'
+            ))
+
+        # 2. Chart: ABC Analysis
+        if 'abc_analysis' in data_frames:
+            df = data_frames['abc_analysis'].groupby('abc_class')['product_id'].count()
+            specs.append(make_chart_spec(
+                'abc_analysis_pie', 'donut', df, 'ABC Analysis (by Product Count)', figsize=(7, 7)
+            ))
+
+        # 3. Chart: Warehouse Activity
+        if 'warehouse_io_summary' in data_frames:
+            df_wh_plot = data_frames['warehouse_io_summary'].reindex(columns=MOVEMENT_TYPES, fill_value=0)
+            specs.append(make_chart_spec(
+                'warehouse_activity', 'stacked_bar', df_wh_plot, 'Warehouse Activity (Total Movements)',
+                xlabel='Warehouse ID', ylabel='Number of Movements', figsize=(12, 7),
+                legend_title='Movement Type'
+            ))
+
+        # 4. Chart: Top 10 Valuable Products
+        if 'stock_value_report' in data_frames:
+            specs.append(make_chart_spec(
+                'top_10_value_products', 'barh_rupiah', self._top_10_value(data_frames['stock_value_report']),
+                'Top 10 Most Valuable Products (by Current Stock Value)',
+                xlabel='Total Stock Value (Rp)', ylabel='Product ID', figsize=(10, 8),
+                x='stock_value', y='product_id'
+            ))
+
+        # 5. (Opsional) Set chart per gudang
+        if self.per_warehouse_charts:
+            specs.extend(self.build_warehouse_chart_specs(data_frames))
+
+        return specs
+
+    def build_warehouse_chart_specs(self, data_frames, warehouse_ids=None):
+        """
+        Spesifikasi chart untuk setiap gudang (aktivitas & top 10 produk bernilai).
+        `warehouse_ids` membatasi gudang yang dibuatkan chart (default: semua).
+        """
+        specs = []
+        df_io = data_frames.get('warehouse_io_summary')
+        df_val = data_frames.get('stock_value_report')
+
+        if warehouse_ids is None:
+            warehouse_ids = set()
+            if df_io is not None:
+                warehouse_ids.update(df_io.index.tolist())
+            if df_val is not None:
+                warehouse_ids.update(df_val['warehouse_id'].unique().tolist())
+
+        for wh_id in sorted(warehouse_ids):
+            if df_io is not None and wh_id in df_io.index:
+                df_wh = df_io.loc[[wh_id]].reindex(columns=MOVEMENT_TYPES, fill_value=0)
+                specs.append(make_chart_spec(
+                    f"warehouse_{wh_id}_activity", 'stacked_bar', df_wh,
+                    f"Warehouse {wh_id} Activity (Total Movements)",
+                    xlabel='Warehouse ID', ylabel='Number of Movements', figsize=(6, 6),
+                    legend_title='Movement Type'
+                ))
+            if df_val is not None:
+                df_top10 = self._top_10_value(df_val[df_val['warehouse_id'] == wh_id])
+                if not df_top10.empty:
+                    specs.append(make_chart_spec(
+                        f"warehouse_{wh_id}_top_10_value_products", 'barh_rupiah', df_top10,
+                        f"Warehouse {wh_id}: Top 10 Most Valuable Products",
+                        xlabel='Total Stock Value (Rp)', ylabel='Product ID', figsize=(10, 8),
+                        x='stock_value', y='product_id'
+                    ))
+        return specs
+
+    @staticmethod
+    def _top_10_value(df_val):
+        df_top10 = df_val.nlargest(10, 'stock_value').sort_values('stock_value', ascending=True)
+        return df_top10[['product_id', 'stock_value']].reset_index(drop=True)
+
     def create_charts(self, data_frames):
-        """Membuat visualisasi data (4 charts) dan menyimpannya sebagai gambar."""
+        """Membuat visualisasi data dan menyimpannya sebagai gambar (paralel + cache)."""
         log.info("Membuat visualisasi (charts)...")
-        chart_paths = {}
-        
         try:
-            # 1. Chart: Monthly Movements
-            if 'monthly_trends' in data_frames:
-                df = data_frames['monthly_trends']
-                plt.figure(figsize=(10, 6))
-                plt.plot(df['movement_date'], df['monthly_movements'], marker='o', linestyle='-')
-                plt.title('Monthly Sales Movements')
-                plt.xlabel('Date')
-                plt.ylabel('Total Movements')
-                plt.grid(True, linestyle='--', alpha=0.6)
-                plt.xticks(rotation=45)
-                plt.tight_layout()
-                path = self.charts_dir / "monthly_movements.png"
-                plt.savefig(path, bbox_inches='tight')
-                plt.close()
-                chart_paths['monthly_movements'] = "charts/monthly_movements.png" 
-
-            # 2. Chart: ABC Analysis
-            if 'abc_analysis' in data_frames:
-                df = data_frames['abc_analysis'].groupby('abc_class')['product_id'].count()
-                plt.figure(figsize=(7, 7))
-                df.plot(kind='pie', autopct='%1.1f%%', startangle=90, wedgeprops=dict(width=0.4), labels=df.index)
-                plt.title('ABC Analysis (by Product Count)')
-                plt.ylabel('')
-                path = self.charts_dir / "abc_analysis_pie.png"
-                plt.savefig(path, bbox_inches='tight')
-                plt.close()
-                chart_paths['abc_analysis_pie'] = "charts/abc_analysis_pie.png"
-            
-            # 3. Chart: Warehouse Activity
-            if 'warehouse_io_summary' in data_frames:
-                df_wh = data_frames['warehouse_io_summary']
-                df_wh_plot = df_wh[['IN', 'OUT', 'TRANSFER', 'ADJUSTMENT', 'RETURN']]
-                
-                plt.figure(figsize=(12, 7))
-                df_wh_plot.plot(kind='bar', stacked=True, figsize=(12, 7), ax=plt.gca())
-                plt.title('Warehouse Activity (Total Movements)')
-                plt.xlabel('Warehouse ID')
-                plt.ylabel('Number of Movements')
-                plt.xticks(rotation=0)
-                plt.legend(title='Movement Type')
-                plt.tight_layout()
-                path = self.charts_dir / "warehouse_activity.png"
-                plt.savefig(path, bbox_inches='tight')
-                plt.close('all') 
-                chart_paths['warehouse_activity'] = "charts/warehouse_activity.png"
-
-            # 4. Chart: Top 10 Valuable Products
-            if 'stock_value_report' in data_frames:
-                df_val = data_frames['stock_value_report']
-                df_top10 = df_val.nlargest(10, 'stock_value').sort_values('stock_value', ascending=True)
-                df_top10['product_id_str'] = df_top10['product_id'].astype(str)
-                
-                plt.figure(figsize=(10, 8))
-                plt.barh(df_top10['product_id_str'], df_top10['stock_value'], color='skyblue')
-                plt.title('Top 10 Most Valuable Products (by Current Stock Value)')
-                plt.xlabel('Total Stock Value (Rp)')
-                plt.ylabel('Product ID')
-                plt.gca().xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'Rp {x/1e9:,.1f} M'))
-                plt.grid(True, linestyle='--', axis='x', alpha=0.6)
-                plt.tight_layout()
-                path = self.charts_dir / "top_10_value_products.png"
-                plt.savefig(path, bbox_inches='tight')
-                plt.close()
-                chart_paths['top_10_value_products'] = "charts/top_10_value_products.png"
-            
+            specs = self.build_chart_specs(data_frames)
+            with span('report.charts', rows_in=len(specs), workers=self.chart_workers, cache=self.chart_cache) as s:
+                chart_paths = render_charts(
+                    specs, self.charts_dir,
+                    style={'style': 'ggplot'},
+                    workers=self.chart_workers,
+                    use_cache=self.chart_cache,
+                    cache_max_entries=self.chart_cache_max_entries
+                )
+                s.rows_out = len(chart_paths)
             log.info(f"Berhasil membuat {len(chart_paths)} charts.")
             return chart_paths
-            
+
         except Exception as e:
             log.error(f"Gagal membuat chart: {e}")
-            return chart_paths
+            return {}
 
     def generate_report(self, data_frames):
-        """Menggabungkan data dan charts ke dalam template HTML."""
+        """Menggabungkan data dan charts ke dalam template HTML, lalu antrekan PDF-nya."""
         log.info("Membuat laporan HTML...")
-        
-        self.create_template_if_not_exists()
-        chart_paths = self.create_charts(data_frames)
-        
-        # --- PERUBAHAN: Memanggil fungsi dari model.py untuk生成 narasi ---
-        log.info("Membuat narasi analitik menggunakan AI...")
+
+        # Narasi AI diminta di latar belakang agar tumpang-tindih dengan rendering chart
+        log.info("Membuat narasi analitik menggunakan AI (latar belakang)...")
         inv_summary = data_frames.get('inventory_summary', {})
         fin_summary = data_frames.get('financial_summary', {})
         total_items = data_frames.get('stock_value_report', pd.DataFrame()).shape[0]
-        
-        summary_narrative = generate_narrative_analysis(
+
+        narrative_request = request_narrative_async(
             inventory_summary=inv_summary,
             financial_summary=fin_summary,
-            total_items=total_items
+            total_items=total_items,
+            narrative_config=self.narrative_config
         )
-        # --- AKHIR PERUBAHAN ---
+
+        chart_paths = self.create_charts(data_frames)
+        # Waktu tunggu narasi setelah chart selesai (panggilan API sendiri: span 'report.narrative')
+        with span('report.narrative_wait'):
+            summary_narrative = narrative_request.result()
 
         template_data = {
             'run_date': pd.to_datetime('now').strftime('%Y-%m-%d %H:%M:%S'),
@@ -174,111 +241,98 @@ class ReportGenerator:
             'transfer_patterns': data_frames.get('transfer_patterns', pd.DataFrame()).head(10).to_html(index=False, classes='table table-sm'),
             'charts': chart_paths
         }
-        
+        self.render_reports([(self.report_filename, template_data)])
+
+    def generate_warehouse_reports(self, data_frames, warehouse_views):
+        """
+        Membuat laporan per gudang dalam satu batch.
+        `warehouse_views` = {warehouse_id: data_frames per gudang} (lihat
+        `transform.warehouse_performance.calculate_warehouse_views`). Semua chart
+        gudang di-render sekaligus (paralel + cache) dan semua laporan memakai
+        template terkompilasi yang sama. Narasi AI tidak dibuat per gudang.
+        """
+        log.info(f"Membuat {len(warehouse_views)} laporan per gudang (batch)...")
+        specs = self.build_warehouse_chart_specs(data_frames, warehouse_ids=warehouse_views.keys())
         try:
-            template = self.env.get_template('report_template.html')
-            html_content = template.render(template_data)
-            
-            html_path = self.output_dir / f"{self.report_filename}.html"
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            log.info(f"Laporan HTML berhasil disimpan di: {html_path}")
-            
-            if WEASYPRINT_AVAILABLE:
-                try:
-                    pdf_path = self.output_dir / f"{self.report_filename}.pdf"
-                    base_url = self.output_dir.resolve().as_uri() + "/"
-                    
-                    HTML(string=html_content, base_url=base_url).write_pdf(pdf_path)
-                    log.info(f"Laporan PDF (via WeasyPrint) berhasil disimpan di: {pdf_path}")
-                    
-                except Exception as e:
-                    log.error(f"Gagal membuat PDF dengan WeasyPrint: {e}")
+            with span('report.warehouse_charts', rows_in=len(specs), workers=self.chart_workers,
+                      cache=self.chart_cache) as s:
+                chart_paths = render_charts(specs, self.charts_dir, style={'style': 'ggplot'},
+                                            workers=self.chart_workers, use_cache=self.chart_cache,
+                                            cache_max_entries=self.chart_cache_max_entries)
+                s.rows_out = len(chart_paths)
+        except Exception as e:
+            log.error(f"Gagal membuat chart per gudang: {e}")
+            chart_paths = {}
+
+        run_date = pd.to_datetime('now').strftime('%Y-%m-%d %H:%M:%S')
+        df_transfers = data_frames.get('transfer_patterns', pd.DataFrame())
+        batch = []
+        for wh_id, view in sorted(warehouse_views.items()):
+            if not df_transfers.empty:
+                wh_transfers = df_transfers[
+                    (df_transfers['from_warehouse_id'] == wh_id) | (df_transfers['to_warehouse_id'] == wh_id)
+                ]
             else:
-                log.warning("WeasyPrint tidak tersedia. Melewatkan pembuatan PDF.")
-            
+                wh_transfers = df_transfers
+            df_dead = view.get('dead_stock_report', pd.DataFrame())
+            if 'stock_value_report' in view and not df_dead.empty:
+                df_dead = pd.merge(
+                    df_dead[['product_id', 'warehouse_id', 'quantity_on_hand', 'days_since_last_movement']],
+                    view['stock_value_report'][['product_id', 'warehouse_id', 'stock_value']],
+                    on=['product_id', 'warehouse_id']
+                ).nlargest(10, 'stock_value')
+
+            template_data = {
+                'report_title': f"Warehouse Analytics Report - Gudang {wh_id}",
+                'run_date': run_date,
+                'inventory_summary': view.get('inventory_summary', {}),
+                'financial_summary': view.get('financial_summary', {}),
+                'summary_narrative': None,
+                'transfer_patterns': wh_transfers.head(10).to_html(index=False, classes='table table-sm'),
+                'dead_stock_table': df_dead.to_html(index=False, classes='table table-sm') if not df_dead.empty else None,
+                'charts': {
+                    'warehouse_activity': chart_paths.get(f"warehouse_{wh_id}_activity"),
+                    'top_10_value_products': chart_paths.get(f"warehouse_{wh_id}_top_10_value_products"),
+                }
+            }
+            batch.append((f"{self.report_filename}_warehouse_{wh_id}", template_data))
+
+        self.render_reports(batch)
+
+    def render_reports(self, batch):
+        """
+        Me-render satu atau beberapa laporan [(nama_file, template_data), ...] dengan
+        template terkompilasi yang sama. HTML ditulis langsung; PDF diserahkan ke
+        worker latar belakang (tunggu dengan `wait_for_pdfs()`).
+        """
+        try:
+            template = self.env.get_template('report_template.html')
         except Exception as e:
-            log.error(f"Gagal me-render laporan HTML: {e}")
+            log.error(f"Gagal memuat template laporan: {e}")
+            return
 
-    def create_template_if_not_exists(self):
-        """Helper untuk membuat file template HTML baru yang dinamis untuk A4."""
-        template_path = self.template_dir / "report_template.html"
-        
-        if template_path.exists():
-            log.warning("Menghapus template HTML lama untuk regenerasi...")
-            template_path.unlink()
-        
-        log.info("Membuat template HTML baru yang dinamis untuk A4...")
-        
-        html_template = """
-<!DOCTYPE html>
-<html lang="id">
-<head>
-    <meta charset="UTF-8">
-    <title>Warehouse Analytics Report</title>
-    <style>
-        /* --- Gaya Umum --- */
-        body { font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif; background-color: #e0e0e0; margin: 0; padding: 20px; color: #333; }
-        .a4-page { width: 210mm; min-height: 297mm; padding: 20mm; margin: 20px auto; background-color: #ffffff; box-shadow: 0 0 10px rgba(0, 0, 0, 0.2); box-sizing: border-box; }
-        h1, h2, h3 { color: #2c3e50; }
-        h1 { text-align: center; margin-bottom: 15px; }
-        h2 { text-align: center; margin-top: 30px; margin-bottom: 20px; border-bottom: 2px solid #3498db; padding-bottom: 10px; page-break-after: avoid; }
-        .card { border: 1px solid #e0e0e0; border-radius: 8px; padding: 15px; margin-bottom: 20px; page-break-inside: avoid; background-color: #fdfdfd; }
-        .card h3 { margin-top: 0; color: #3498db; border-bottom: 1px solid #eee; padding-bottom: 8px; margin-bottom: 12px; text-align: center; }
-        .table { width: 100%; border-collapse: collapse; margin-top: 10px; font-size: 0.9em; }
-        .table th, .table td { padding: 10px 12px; text-align: left; border-bottom: 1px solid #ddd; }
-        .table th { background-color: #34495e; color: #ffffff; font-weight: 600; text-transform: uppercase; font-size: 0.8em; }
-        .table tr:nth-child(even) { background-color: #f9f9f9; }
-        .table tr:hover { background-color: #f1f1f1; }
-        .table td:not(:first-child), .table th:not(:first-child) { text-align: right; }
-        img { max-width: 100%; height: auto; display: block; margin: 10px auto; }
-        ul { list-style-type: none; padding-left: 0; }
-        li { margin-bottom: 8px; font-size: 1.1em; display: flex; justify-content: space-between;}
-        li b { color: #34495e; }
-        p { font-size: 1.0em; line-height: 1.6; text-align: justify; }
-        @media print {
-            body { background-color: #ffffff; padding: 0; }
-            @page { size: A4; margin: 20mm; }
-            .a4-page { width: 100%; min-height: 100vh; margin: 0; padding: 0; box-shadow: none; background: none; }
-            img { max-width: 100% !important; page-break-inside: avoid; }
-            .table tr:hover { background-color: transparent; }
-        }
-    </style>
-</head>
-<body>
-    <div class="a4-page">
-        <h1>Warehouse Analytics Report</h1>
-        <p style="text-align: center; font-size: 0.9em; color: #777;">Laporan ini dibuat pada: {{ run_date }}</p>
-        <h2>Executive Summary</h2>
-        <div class="card">
-            <h3>Inventory Summary</h3>
-            <ul>
-                <li><span>Total Nilai Inventori:</span> <span><b>Rp {{ financial_summary.total_inventory_value | format_rupiah }}</b></span></li>
-                <li><span>Rasio Stock Turnover:</span> <span><b>{{ inventory_summary.stock_turnover_ratio | format_number(1) }}</b></span></li>
-                <li><span>Hari Stok (DOH):</span> <span><b>{{ inventory_summary.days_of_inventory_on_hand | format_number(1) }} hari</b></span></li>
-                <li><span>Item Dead Stock:</span> <span><b>{{ inventory_summary.total_dead_stock_items | format_number(0) }} SKU</b></span></li>
-                <li><span>Nilai Dead Stock:</span> <span><b>Rp {{ inventory_summary.total_dead_stock_value | format_rupiah }}</b></span></li>
-            </ul>
-        </div>
-        <div class="card">
-            <h3>Analisis Naratif</h3>
-            <p>{{ summary_narrative|safe }}</p>
-        </div>
-        <h2>Movement Analytics</h2>
-        <div class="card"><h3>ABC Analysis (by Product Count)</h3><img src="{{ charts.abc_analysis_pie }}" alt="ABC Analysis Chart" style="max-width: 60%;"></div>
-        <div class="card"><h3>Monthly Sales Movements</h3><img src="{{ charts.monthly_movements }}" alt="Monthly Movements Chart"></div>
-        <div class="card"><h3>Peak Day of Week (Avg Movements)</h3>{{ peak_dow|safe }}</div>
-        <div class="card"><h3>Peak Month (Avg Movements)</h3>{{ peak_month|safe }}</div>
-        <h2>Warehouse & Financial Performance</h2>
-        <div class="card"><h3>Aktivitas Gudang (IN/OUT/TRANSFER)</h3><img src="{{ charts.warehouse_activity }}" alt="Warehouse Activity Chart"></div>
-        <div class="card"><h3>Top 10 Produk Bernilai (Berdasarkan Nilai Stok)</h3><img src="{{ charts.top_10_value_products }}" alt="Top 10 Value Products Chart"></div>
-        <div class="card"><h3>Top 10 Transfer Patterns</h3>{{ transfer_patterns|safe }}</div>
-    </div>
-</body>
-</html>
+        base_url = self.output_dir.resolve().as_uri() + "/"
+        for report_filename, template_data in batch:
+            try:
+                with span('report.render_html', file=report_filename):
+                    html_content = template.render(template_data)
+
+                    html_path = self.output_dir / f"{report_filename}.html"
+                    with open(html_path, 'w', encoding='utf-8') as f:
+                        f.write(html_content)
+                log.info(f"Laporan HTML berhasil disimpan di: {html_path}")
+
+                self.pdf_worker.submit(html_path, self.output_dir / f"{report_filename}.pdf", base_url)
+
+            except Exception as e:
+                log.error(f"Gagal me-render laporan HTML {report_filename}: {e}")
+
+    def wait_for_pdfs(self, timeout=None):
+        """
+        Menunggu semua PDF yang sedang dibuat oleh worker latar belakang
+        (batas waktu total default: `output.pdf.timeout`).
         """
-        with open(template_path, 'w', encoding='utf-8') as f:
-            f.write(html_template)
+        return self.pdf_worker.wait(timeout if timeout is not None else self.pdf_timeout)
 
 
 # --- Blok untuk menjalankan contoh ---
@@ -308,5 +362,6 @@ if __name__ == "__main__":
 
     generator = ReportGenerator()
     generator.generate_report(report_data)
+    generator.wait_for_pdfs()
     
     log.info("Proses selesai. Laporan HTML dan PDF telah dibuat di folder 'reports'.")
\ No newline at end of file
@@ -2,8 +2,10 @@ import yaml
 import logging
 import logging.config
 import argparse
+from contextlib import nullcontext
 from pathlib import Path
 import os
+import time
 
 # Setup logging
 try:
@@ -21,14 +23,22 @@ except Exception as e:
 log = logging.getLogger(__name__)
 
 # Impor modul-modul ETL
+# Catatan: modul laporan (matplotlib, Jinja2, WeasyPrint, OpenAI) sengaja TIDAK
+# diimpor di sini, melainkan di dalam tahap REPORT, agar run terjadwal tanpa
+# laporan (misal incremental) bisa start dengan cepat.
 from extract.data_extractor import DataExtractor
+from checkpoint import REQUIRES, RunCheckpoint, prune
+from extract.sources import get_source_type
+from instrumentation import count_rows, finish_run, span, start_run
 from load.data_loader import DataLoader
-from load.report_generator import ReportGenerator
 import transform.inventory_metrics as inv
 import transform.movement_analytics as mov
 import transform.financial_metrics as fin
 import transform.warehouse_performance as wh
 
+# Urutan tahap pipeline yang valid untuk '--stages'
+STAGES = ['extract', 'transform', 'load', 'report']
+
 def load_config(config_dir='config'):
     """Memuat file konfigurasi YAML."""
     try:
@@ -48,68 +58,303 @@ def load_config(config_dir='config'):
         log.error(f"Gagal memuat config.yaml: {e}")
         raise
 
-def run_pipeline(config, load_type='full'):
+def parse_stages(value):
+    """Mengubah argumen '--stages' (misal 'extract,transform') menjadi list tahap berurutan."""
+    stages = [s.strip().lower() for s in value.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"Tahap tidak dikenal: {', '.join(unknown)}. Pilihan: {','.join(STAGES)}"
+        )
+    return [s for s in STAGES if s in stages]
+
+def run_extract(config, load_type):
+    """Tahap EXTRACT: ambil data dan tangani data quality. Mengembalikan None jika tidak ada data."""
+    with span('extract', load_type=load_type) as stage:
+        extractor = DataExtractor(config['database'], config.get('source'))
+        with span('extract.read_tables', load_type=load_type) as s:
+            if load_type == 'incremental':
+                raw_data = extractor.extract_incremental(config['etl_settings']['last_run_timestamp'],
+                                                         config['etl_settings'].get('last_movement_id'))
+            else:
+                raw_data = extractor.extract_full()
+            s.rows_out = count_rows(raw_data)
+
+        # (Opsional) dead stock dihitung di database, bukan dari histori movements
+        if raw_data is not None and config['etl_settings'].get('dead_stock_source', 'pandas') == 'database':
+            with span('extract.dead_stock') as s:
+                dead_stock = extractor.extract_dead_stock(config['etl_settings']['dead_stock_days'])
+                s.rows_out = count_rows(dead_stock)
+            if dead_stock is not None:
+                raw_data['dead_stock'] = dead_stock
+
+        # Penanganan Data Quality [cite: 147]
+        with span('extract.data_quality', rows_in=len(raw_data['stock_movements'])) as s:
+            clean_data = extractor.handle_data_quality_issues(raw_data)
+            s.rows_out = len(clean_data['stock_movements'])
+        stage.rows_out = s.rows_out
+
+        # (Opsional) rata-rata inventori dari snapshot harian selama rentang movements yang lolos
+        # DQ (rentang yang sama dengan jumlah hari DOH/turnover di transform)
+        if config['etl_settings'].get('average_inventory_source', 'stock') == 'snapshot' \
+                and not clean_data['stock_movements'].empty:
+            with span('extract.average_inventory') as s:
+                average_inventory = extractor.extract_average_inventory(clean_data['stock_movements'])
+                s.rows_out = count_rows(average_inventory)
+            if average_inventory is not None:
+                clean_data['average_inventory'] = average_inventory
+
+    if clean_data['stock_movements'].empty:
+        log.warning("Tidak ada data baru untuk diproses. Pipeline berhenti.")
+        return None
+    return clean_data
+
+def run_transform(config, clean_data):
     """
-    Menjalankan pipeline E-T-L[cite: 179].
+    Tahap TRANSFORM: jalankan modul-modul transformasi secara sekuensial, atau
+    map-reduce per gudang di beberapa proses jika `transform.workers` > 1
+    (lihat transform/sharded.py).
     """
-    log.info(f"--- MEMULAI PIPELINE ETL (Mode: {load_type.upper()}) ---")
-    
-    # 1. EXTRACT [cite: 144]
-    try:
-        extractor = DataExtractor(config['database'])
-        if load_type == 'incremental':
-            raw_data = extractor.extract_incremental(config['etl_settings']['last_run_timestamp'])
+    log.info("Memulai tahap TRANSFORM...")
+    data = clean_data.copy()
+    steps = [
+        ('inventory_metrics', inv.calculate_inventory_metrics, config['etl_settings']['dead_stock_days']),
+        ('movement_analytics', mov.calculate_movement_analytics),
+        ('financial_metrics', fin.calculate_financial_metrics, config['etl_settings']['abc_analysis']),
+        ('warehouse_performance', wh.calculate_warehouse_performance),
+    ]
+
+    workers = int((config.get('transform') or {}).get('workers', 1))
+
+    with span('transform', rows_in=len(data['stock_movements']), workers=workers) as stage:
+        if workers > 1:
+            # Map-reduce per gudang di beberapa proses (pyarrow & process pool hanya diimpor di mode ini)
+            from transform.sharded import sharded_transform
+            data = sharded_transform(data, config['etl_settings']['dead_stock_days'],
+                                     config['etl_settings']['abc_analysis'], workers)
         else:
-            raw_data = extractor.extract_full()
-        
-        # Penanganan Data Quality [cite: 147]
-        clean_data = extractor.handle_data_quality_issues(raw_data)
-        
-        if clean_data['stock_movements'].empty:
-            log.warning("Tidak ada data baru untuk diproses. Pipeline berhenti.")
-            return
-            
-    except Exception as e:
-        log.error(f"FATAL: Gagal pada tahap EXTRACT: {e}")
-        return
+            for name, function, *args in steps:
+                # rows_out = total baris tabel analitik yang ditambahkan modul ini
+                existing = set(data)
+                with span(f'transform.{name}', rows_in=len(data['stock_movements'])) as s:
+                    data = function(data, *args)
+                    s.rows_out = count_rows({key: df for key, df in data.items() if key not in existing})
+        stage.rows_out = count_rows({key: df for key, df in data.items() if key not in clean_data})
 
-    # 2. TRANSFORM [cite: 148]
-    try:
-        log.info("Memulai tahap TRANSFORM...")
-        data = clean_data.copy()
-        
-        # Jalankan modul-modul transformasi secara sekuensial
-        data = inv.calculate_inventory_metrics(data, config['etl_settings']['dead_stock_days'])
-        data = mov.calculate_movement_analytics(data)
-        data = fin.calculate_financial_metrics(data, config['etl_settings']['abc_analysis'])
-        data = wh.calculate_warehouse_performance(data)
-        
-        log.info("Tahap TRANSFORM selesai.")
-        
-    except Exception as e:
-        log.error(f"FATAL: Gagal pada tahap TRANSFORM: {e}")
-        return
+    log.info("Tahap TRANSFORM selesai.")
+    return data
 
-    # 3. LOAD [cite: 171]
-    try:
-        log.info("Memulai tahap LOAD...")
-        loader = DataLoader(config['output'], config['database'])
-        
+def run_load(config, data):
+    """Tahap LOAD: simpan file analitik dan summary table."""
+    log.info("Memulai tahap LOAD...")
+    # Dengan sumber Parquet pipeline berjalan tanpa database: summary table dilewati
+    db_config = config['database'] if get_source_type(config.get('source')) == 'database' else None
+    loader = DataLoader(config['output'], db_config)
+
+    with span('load'):
         # Simpan ke file (Parquet/CSV)
         loader.save_to_file(data)
-        
+
         # Simpan ke summary table
-        loader.load_to_summary_table(data)
-        
-        # Buat Laporan
-        report_gen = ReportGenerator(config['output']['analytics_dir'], 
-                                     config['output']['report_filename'])
+        with span('load.summary_table'):
+            loader.load_to_summary_table(data)
+
+    log.info("Tahap LOAD selesai.")
+
+def run_report(config, data):
+    """Tahap REPORT: buat laporan HTML/PDF (dependensi berat diimpor di sini)."""
+    log.info("Memulai tahap REPORT...")
+    from load.report_generator import ReportGenerator
+
+    output_config = config['output']
+    with span('report'):
+        report_gen = ReportGenerator(output_config['analytics_dir'], 
+                                     output_config['report_filename'],
+                                     output_config.get('charts'),
+                                     config.get('narrative'),
+                                     output_config.get('pdf'),
+                                     output_config.get('template_cache_dir', '.cache/jinja'))
         report_gen.generate_report(data)
-        
-        log.info("Tahap LOAD selesai.")
-        
+
+        # Laporan per gudang dirender dalam satu batch dengan template yang sama
+        if output_config.get('per_warehouse_reports'):
+            with span('report.warehouse_views') as s:
+                views = wh.calculate_warehouse_views(data, config['etl_settings']['dead_stock_days'],
+                                                     config['etl_settings']['abc_analysis'])
+                s.rows_out = len(views)
+            report_gen.generate_warehouse_reports(data, views)
+
+    log.info("Tahap REPORT selesai (PDF diproses di latar belakang).")
+    return report_gen
+
+def create_profiler(config, mode, run_id=None):
+    """Profiler per tahap (`--profile`); artefak ditulis ke <analytics_dir>/profile/<run_id>/."""
+    # cProfile/tracemalloc hanya diimpor jika profiling diminta
+    from profiling import StageProfiler
+    run_id = run_id or time.strftime('%Y%m%dT%H%M%S')
+    return StageProfiler(mode, Path(config['output']['analytics_dir']) / 'profile' / f"{run_id}-{mode}")
+
+def prepare_checkpoint(config, run_id, load_type, stages, resume=None, from_stage=None):
+    """
+    Checkpoint hasil tahap untuk run ini (lihat checkpoint.py & `checkpoint` di config.yaml).
+      - resume     : lanjutkan checkpoint run `resume` (load_type & tahap mengikuti run tersebut);
+      - from_stage : run baru mulai dari tahap ini, memakai hasil tahap sebelumnya dari
+                     checkpoint terbaru yang memilikinya.
+    Mengembalikan (checkpoint atau None jika dinonaktifkan, load_type, stages).
+    """
+    checkpoint_config = config.get('checkpoint') or {}
+    root = checkpoint_config.get('dir', '.cache/checkpoints')
+    if resume:
+        checkpoint = RunCheckpoint.open(root, resume)
+        log.info(f"Melanjutkan run {resume}; tahap selesai: {','.join(checkpoint.completed) or '-'}")
+        return checkpoint, checkpoint.state['load_type'], checkpoint.state['stages']
+
+    source = None
+    if from_stage:
+        stages = [s for s in STAGES[STAGES.index(from_stage):] if s in stages]
+        source = RunCheckpoint.latest_with(root, REQUIRES[from_stage])
+        if source is None:
+            raise FileNotFoundError(f"Tidak ada checkpoint dengan tahap {REQUIRES[from_stage].upper()} "
+                                    f"yang selesai di {Path(root).resolve()}")
+        load_type = source.state['load_type']
+        log.info(f"Mulai dari tahap {from_stage.upper()} dengan hasil {REQUIRES[from_stage].upper()} "
+                 f"dari run {source.run_id}")
+    elif not checkpoint_config.get('enabled', True):
+        return None, load_type, stages
+
+    checkpoint = RunCheckpoint.create(root, run_id, load_type, stages)
+    if source is not None:
+        checkpoint.reuse(REQUIRES[from_stage], source)
+    return checkpoint, load_type, stages
+
+def save_checkpoint(checkpoint, stage, data=None):
+    """Mencatat tahap selesai (beserta hasilnya); kegagalan hanya menghilangkan kemampuan resume."""
+    if checkpoint is None:
+        return
+    try:
+        with span(f'checkpoint.{stage}', rows_in=count_rows(data) if data is not None else None):
+            checkpoint.save(stage, data)
     except Exception as e:
-        log.error(f"FATAL: Gagal pada tahap LOAD: {e}")
+        log.warning(f"Gagal menyimpan checkpoint tahap {stage.upper()}: {e}")
+
+def run_pipeline(config, load_type='full', stages=None, profile=None, resume=None, from_stage=None):
+    """
+    Menjalankan pipeline E-T-L[cite: 179].
+    `stages` membatasi tahap yang dijalankan (default: semua tahap).
+    Metrik setiap tahap dicatat per run (lihat instrumentation.py & `metrics` di config.yaml).
+    `profile` ('cprofile', 'sampling' atau 'memory') memprofil setiap tahap (lihat profiling.py).
+    Hasil setiap tahap di-checkpoint; `resume` (run_id) melanjutkan run yang gagal dari tahap
+    pertama yang belum selesai, `from_stage` menjalankan ulang tahap downstream dengan hasil
+    run terakhir (lihat prepare_checkpoint).
+    """
+    stages = stages or STAGES
+    metrics = start_run(config.get('metrics'))
+    run_id = metrics.run_id if metrics else time.strftime('%Y%m%dT%H%M%S')
+    profiler = create_profiler(config, profile, run_id) if profile else None
+    try:
+        with span('pipeline', load_type=load_type, stages=','.join(stages), profile=profile,
+                  resume=resume, from_stage=from_stage):
+            try:
+                checkpoint, load_type, stages = prepare_checkpoint(config, run_id, load_type, stages,
+                                                                   resume, from_stage)
+            except Exception as e:
+                log.error(f"FATAL: Checkpoint tidak dapat disiapkan: {e}")
+                return
+            _run_stages(config, load_type, stages, profiler, checkpoint)
+            if checkpoint is not None and set(checkpoint.state['stages']) <= set(checkpoint.completed):
+                checkpoint_config = config.get('checkpoint') or {}
+                prune(checkpoint.path.parent, checkpoint_config.get('keep', 3), protect={checkpoint.run_id})
+    finally:
+        # Seperti summary table: tabel metrik hanya ditulis jika sumbernya database
+        db_config = config['database'] if get_source_type(config.get('source')) == 'database' else None
+        finish_run(metrics, config.get('metrics'), db_config)
+        if profiler is not None:
+            profiler.log_summary()
+
+def _run_stages(config, load_type, stages, profiler=None, checkpoint=None):
+    stage = profiler.stage if profiler is not None else (lambda name: nullcontext())
+    # Tahap yang sudah selesai (checkpoint) tidak dijalankan ulang
+    done = set(checkpoint.completed) if checkpoint is not None else set()
+    pending = [s for s in stages if s not in done]
+    log.info(f"--- MEMULAI PIPELINE ETL (Mode: {load_type.upper()}, Tahap: {','.join(pending)}) ---")
+    if not pending:
+        log.info(f"Semua tahap run {checkpoint.run_id} sudah selesai.")
+        return
+
+    # Tahap downstream membutuhkan hasil tahap sebelumnya (dari run ini atau dari checkpoint)
+    available = set(done)
+    for name in pending:
+        if name in REQUIRES and REQUIRES[name] not in available:
+            log.error("FATAL: Tahap TRANSFORM membutuhkan EXTRACT, dan LOAD/REPORT membutuhkan TRANSFORM "
+                      "(dijalankan di run ini atau tersedia di checkpoint, lihat --resume/--from-stage).")
+            return
+        available.add(name)
+
+    # Input tahap pertama dari checkpoint
+    try:
+        if pending[0] == 'transform':
+            clean_data = checkpoint.load('extract')
+        elif pending[0] in ('load', 'report'):
+            data = checkpoint.load('transform')
+    except Exception as e:
+        log.error(f"FATAL: Gagal memuat checkpoint run {checkpoint.run_id}: {e}")
+        return
+
+    # 1. EXTRACT [cite: 144]
+    if 'extract' in pending:
+        try:
+            with stage('extract'):
+                clean_data = run_extract(config, load_type)
+            if clean_data is None:
+                return
+        except Exception as e:
+            log.error(f"FATAL: Gagal pada tahap EXTRACT: {e}")
+            return
+        save_checkpoint(checkpoint, 'extract', clean_data)
+
+    # 2. TRANSFORM [cite: 148]
+    if 'transform' in pending:
+        try:
+            with stage('transform'):
+                data = run_transform(config, clean_data)
+        except Exception as e:
+            log.error(f"FATAL: Gagal pada tahap TRANSFORM: {e}")
+            return
+
+    # 3. REPORT (laporan HTML/PDF) dijalankan sebelum checkpoint TRANSFORM & LOAD: HTML ditulis
+    #    dan PDF diserahkan ke worker latar belakang, sehingga konversi PDF berjalan bersamaan
+    #    dengan pekerjaan berikutnya dan baru ditunggu di akhir run.
+    report_gen, report_failed = None, False
+    if 'report' in pending:
+        try:
+            with stage('report'):
+                report_gen = run_report(config, data)
+        except Exception as e:
+            # LOAD tetap dijalankan; run dinyatakan gagal setelah LOAD
+            log.error(f"FATAL: Gagal pada tahap REPORT: {e}")
+            report_failed = True
+
+    if 'transform' in pending:
+        save_checkpoint(checkpoint, 'transform', data)
+
+    # 4. LOAD [cite: 171]
+    load_failed = False
+    if 'load' in pending:
+        try:
+            with stage('load'):
+                run_load(config, data)
+            save_checkpoint(checkpoint, 'load')
+        except Exception as e:
+            log.error(f"FATAL: Gagal pada tahap LOAD: {e}")
+            load_failed = True
+
+    if report_gen is not None:
+        # Tunggu PDF dari worker latar belakang sebelum pipeline selesai (juga jika LOAD gagal)
+        log.info("Menunggu pembuatan PDF selesai...")
+        with span('report.wait_for_pdfs'):
+            report_gen.wait_for_pdfs()
+        save_checkpoint(checkpoint, 'report')
+    if report_failed or load_failed:
         return
 
     log.info(f"--- PIPELINE ETL (Mode: {load_type.upper()}) SELESAI ---")
@@ -124,6 +369,54 @@ if __name__ == "__main__":
         default='full',
         help="Jenis ETL load: 'full' atau 'incremental'."
     )
+    parser.add_argument(
+        '--stages',
+        type=parse_stages,
+        default=STAGES,
+        help="Tahap yang dijalankan, dipisah koma (default: extract,transform,load,report). "
+             "Contoh run incremental tanpa laporan: --stages extract,transform,load"
+    )
+    resume_group = parser.add_mutually_exclusive_group()
+    resume_group.add_argument(
+        '--resume',
+        metavar='RUN_ID',
+        default=None,
+        help="Lanjutkan run yang gagal dari tahap pertama yang belum selesai "
+             "(checkpoint di checkpoint.dir; --load_type & --stages mengikuti run tersebut)."
+    )
+    resume_group.add_argument(
+        '--from-stage',
+        choices=['transform', 'load', 'report'],
+        default=None,
+        help="Jalankan ulang mulai tahap ini dengan hasil tahap sebelumnya dari checkpoint terakhir "
+             "(misal --from-stage transform memakai hasil EXTRACT terakhir yang berhasil)."
+    )
+    parser.add_argument(
+        '--transform-workers',
+        type=int,
+        default=None,
+        help="Jumlah shard/proses map-reduce per gudang tahap TRANSFORM (proses dibatasi jumlah CPU); "
+             "menimpa transform.workers di config.yaml."
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help="Jalankan sebagai daemon micro-batch: koneksi, cache stok/master dan agregat tetap di "
+             "memori, movement baru diproses setiap --interval (lihat serve.py & `serve` di config.yaml)."
+    )
+    parser.add_argument(
+        '--interval',
+        default=None,
+        help="Interval batch untuk --serve, misal 30s, 5m (default: serve.interval di config.yaml)."
+    )
+    parser.add_argument(
+        '--profile',
+        choices=['cprofile', 'sampling', 'memory'],
+        default=None,
+        help="Profil setiap tahap dan tulis artefaknya ke <analytics_dir>/profile/: "
+             "'sampling' (overhead rendah, stack collapsed untuk flame graph), "
+             "'cprofile' (.pstats) atau 'memory' (tracemalloc)."
+    )
     
     args = parser.parse_args()
     
@@ -131,4 +424,11 @@ if __name__ == "__main__":
     os.chdir(Path(__file__).parent)
     
     config = load_config(config_dir='config')
-    run_pipeline(config, args.load_type)
\ No newline at end of file
+    if args.transform_workers is not None:
+        config.setdefault('transform', {})['workers'] = args.transform_workers
+    if args.serve:
+        # Daemon diimpor hanya jika dipakai (start-up run terjadwal tetap ringan)
+        from serve import serve
+        serve(config, args.interval)
+    else:
+        run_pipeline(config, args.load_type, args.stages, args.profile, args.resume, args.from_stage)
\ No newline at end of file
@@ -1,29 +1,56 @@
 # model.py
 import os
+import json
+import hashlib
 import logging
-from openai import OpenAI
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-# Impor dan muat variabel dari file .env
-from dotenv import load_dotenv
-load_dotenv()
+from instrumentation import instrumented
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger(__name__)
 
 # --- Konfigurasi Pemotongan Narasi ---
-MAX_NARRATIVE_WORDS = 120 
+MAX_NARRATIVE_WORDS = 120
+
+# --- Konfigurasi Default Narasi ---
+DEFAULT_MODEL = "gpt-4o-mini"
+DEFAULT_TIMEOUT_SECONDS = 20
+DEFAULT_CACHE_DIR = ".cache/narrative"
+
+ERROR_CLIENT_TEXT = "<p><b>Error:</b> Klien OpenAI tidak dapat diinisialisasi. Periksa API Key di file .env.</p>"
+ERROR_GENERATE_TEXT = "<p><b>Error:</b> Gagal narasi analitik. Periksa log untuk detailnya (misal: kuota API key habis atau koneksi bermasalah).</p>"
+TIMEOUT_TEXT = "<p><b>Catatan:</b> Narasi analitik belum tersedia (waktu tunggu habis). Ringkasan angka di atas tetap valid.</p>"
 
 # --- Konfigurasi Klien OpenAI ---
-# Menggunakan API resmi OpenAI
-try:
-    client = OpenAI(
-      # Tidak perlu base_url, library openai akan menggunakan endpoint default
-      api_key=os.environ.get("OPENAI_API_KEY") # Membaca dari .env
-    )
-except Exception as e:
-    log.error(f"Gagal menginisialisasi klien OpenAI: {e}")
-    client = None
+# Klien (dan library openai/dotenv yang berat) baru dibuat saat narasi
+# pertama kali diminta, agar run tanpa laporan tidak membayar biaya impornya.
+_client = None
+_client_initialized = False
+
+def get_client():
+    """Mengembalikan klien OpenAI (dibuat sekali, saat pertama dibutuhkan)."""
+    global _client, _client_initialized
+    if _client_initialized:
+        return _client
+    _client_initialized = True
+
+    try:
+        # Impor dan muat variabel dari file .env
+        from dotenv import load_dotenv
+        load_dotenv()
+
+        from openai import OpenAI
+        _client = OpenAI(
+          # Tidak perlu base_url, library openai akan menggunakan endpoint default
+          api_key=os.environ.get("OPENAI_API_KEY") # Membaca dari .env
+        )
+    except Exception as e:
+        log.error(f"Gagal menginisialisasi klien OpenAI: {e}")
+        _client = None
+    return _client
 
 def truncate_text(text: str, max_words: int) -> str:
     """Memotong teks agar tidak melebihi jumlah kata maksimum."""
@@ -33,34 +60,31 @@ def truncate_text(text: str, max_words: int) -> str:
     truncated = " ".join(words[:max_words])
     return truncated + "..."
 
-def generate_narrative_analysis(inventory_summary: dict, financial_summary: dict, total_items: int) -> str:
-    """
-    Menghasilkan narasi analitik dari data gudang menggunakan model GPT-4o-mini dari OpenAI.
-    """
-    if not client:
-        log.error("Klien OpenAI tidak tersedia. Tidak dapat membuat narasi.")
-        return "<p><b>Error:</b> Klien OpenAI tidak dapat diinisialisasi. Periksa API Key di file .env.</p>"
-
-    log.info("Memulai pembuatan narasi analitik dengan AI (GPT-4o-mini)...")
-
-    total_inventory_value = financial_summary.get('total_inventory_value', 0)
-    stock_turnover_ratio = inventory_summary.get('stock_turnover_ratio', 0)
-    days_of_inventory_on_hand = inventory_summary.get('days_of_inventory_on_hand', 0)
+def build_metrics(inventory_summary: dict, financial_summary: dict, total_items: int) -> dict:
+    """Mengambil metrik yang dipakai narasi dari summary ETL."""
     total_dead_stock_items = inventory_summary.get('total_dead_stock_items', 0)
-    total_dead_stock_value = inventory_summary.get('total_dead_stock_value', 0)
-    
     if total_items == 0: total_items = 1
-    dead_stock_percentage = (total_dead_stock_items / total_items) * 100
 
-    prompt = f"""
+    return {
+        'total_inventory_value': float(financial_summary.get('total_inventory_value', 0)),
+        'stock_turnover_ratio': float(inventory_summary.get('stock_turnover_ratio', 0)),
+        'days_of_inventory_on_hand': float(inventory_summary.get('days_of_inventory_on_hand', 0)),
+        'total_dead_stock_items': int(total_dead_stock_items),
+        'total_dead_stock_value': float(inventory_summary.get('total_dead_stock_value', 0)),
+        'dead_stock_percentage': (total_dead_stock_items / total_items) * 100,
+    }
+
+def build_prompt(metrics: dict) -> str:
+    """Menyusun prompt narasi dari metrik."""
+    return f"""
     Anda adalah seorang analis bisnis ahli. Buatlah narasi analitik yang SANGAT RINGKAS dan BERDAMPAK dalam Bahasa Indonesia berdasarkan data gudang berikut.
 
     Data:
-    - Total Nilai Inventori: Rp {total_inventory_value:,.0f}
-    - Rasio Perputaran Stok: {stock_turnover_ratio:.2f}
-    - Hari Persediaan: {days_of_inventory_on_hand:.1f} hari
-    - Jumlah Item Dead Stock: {total_dead_stock_items} SKU ({dead_stock_percentage:.1f}%)
-    - Nilai Dead Stock: Rp {total_dead_stock_value:,.0f}
+    - Total Nilai Inventori: Rp {metrics['total_inventory_value']:,.0f}
+    - Rasio Perputaran Stok: {metrics['stock_turnover_ratio']:.2f}
+    - Hari Persediaan: {metrics['days_of_inventory_on_hand']:.1f} hari
+    - Jumlah Item Dead Stock: {metrics['total_dead_stock_items']} SKU ({metrics['dead_stock_percentage']:.1f}%)
+    - Nilai Dead Stock: Rp {metrics['total_dead_stock_value']:,.0f}
 
     Instruksi KRUSIAL:
     1.  Jawaban harus RINGKAS, tidak lebih dari 2 paragraf.
@@ -70,31 +94,193 @@ def generate_narrative_analysis(inventory_summary: dict, financial_summary: dict
     5.  Langsung ke intinya, tidak perpa kata pengantar.
     """
 
-    try:
+
+# --- Backend Narasi ---
+class NarrativeError(Exception):
+    """Backend gagal membuat narasi; `fallback_text` ditampilkan di laporan."""
+    def __init__(self, message, fallback_text=ERROR_GENERATE_TEXT):
+        super().__init__(message)
+        self.fallback_text = fallback_text
+
+class OpenAINarrativeBackend:
+    """Backend narasi menggunakan chat-completion OpenAI."""
+    name = 'openai'
+
+    def __init__(self, model=DEFAULT_MODEL, timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.model = model
+        self.timeout = timeout
+
+    def generate(self, prompt: str, metrics: dict) -> str:
+        client = get_client()
+        if not client:
+            raise NarrativeError("Klien OpenAI tidak tersedia. Tidak dapat membuat narasi.", ERROR_CLIENT_TEXT)
+
+        log.info(f"Memulai pembuatan narasi analitik dengan AI ({self.model})...")
         completion = client.chat.completions.create(
-            model="gpt-4o-mini", # Menggunakan model GPT-4o-mini
+            model=self.model,
             messages=[
                 {
                     "role": "user",
                     "content": prompt
                 }
-            ]
+            ],
+            # Timeout di sisi HTTP agar thread latar belakang tidak menggantung
+            timeout=self.timeout
+        )
+        return completion.choices[0].message.content
+
+class StubNarrativeBackend:
+    """
+    Backend lokal tanpa jaringan: narasi deterministik dari metrik.
+    Dipakai untuk CI, test, dan run offline.
+    """
+    name = 'stub'
+
+    def __init__(self, model=None, timeout=None):
+        # Parameter diabaikan; disediakan agar seragam dengan backend lain
+        self.model = 'stub'
+
+    def generate(self, prompt: str, metrics: dict) -> str:
+        return (
+            f"Total nilai inventori tercatat <b>Rp {metrics['total_inventory_value']:,.0f}</b> "
+            f"dengan rasio perputaran stok {metrics['stock_turnover_ratio']:.2f} "
+            f"dan {metrics['days_of_inventory_on_hand']:.1f} hari persediaan. "
+            f"Temuan utama: <b>{metrics['total_dead_stock_items']} SKU dead stock</b> "
+            f"({metrics['dead_stock_percentage']:.1f}%) senilai Rp {metrics['total_dead_stock_value']:,.0f}."
+            f"<br><br>Rekomendasi: prioritaskan likuidasi atau transfer dead stock bernilai tertinggi."
         )
-        
-        narrative = completion.choices[0].message.content
-        log.info(f"AI (GPT-4o-mini)  narasi dengan {len(narrative.split())} kata.")
-        
+
+NARRATIVE_BACKENDS = {
+    OpenAINarrativeBackend.name: OpenAINarrativeBackend,
+    StubNarrativeBackend.name: StubNarrativeBackend,
+}
+
+def register_backend(name, backend_cls):
+    """Mendaftarkan backend narasi kustom (harus punya method `generate(prompt, metrics)`)."""
+    NARRATIVE_BACKENDS[name] = backend_cls
+
+def get_backend(narrative_config=None):
+    """
+    Membuat backend dari konfigurasi 'narrative'.
+    Env var NARRATIVE_BACKEND (misal 'stub') menimpa nilai di config.
+    """
+    narrative_config = narrative_config or {}
+    name = os.environ.get('NARRATIVE_BACKEND') or narrative_config.get('backend', 'openai')
+    if name not in NARRATIVE_BACKENDS:
+        raise ValueError(f"Backend narasi '{name}' tidak dikenal. Pilihan: {', '.join(NARRATIVE_BACKENDS)}")
+    return NARRATIVE_BACKENDS[name](
+        model=narrative_config.get('model', DEFAULT_MODEL),
+        timeout=narrative_config.get('timeout_seconds', DEFAULT_TIMEOUT_SECONDS)
+    )
+
+
+# --- Cache Narasi di Disk ---
+class NarrativeCache:
+    """Cache narasi di disk, key = hash SHA-256 dari backend, model, metrik, dan prompt."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def make_key(backend, metrics: dict, prompt: str) -> str:
+        payload = json.dumps({
+            'backend': backend.name,
+            'model': getattr(backend, 'model', None),
+            'metrics': metrics,
+            'prompt': prompt,
+            'max_words': MAX_NARRATIVE_WORDS,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        path = self.cache_dir / f"{key}.json"
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))['narrative']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, narrative):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({'narrative': narrative}, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+
+@instrumented('report.narrative')
+def generate_narrative_analysis(inventory_summary: dict, financial_summary: dict, total_items: int,
+                                backend=None, cache=None) -> str:
+    """
+    Menghasilkan narasi analitik dari data gudang (default: model GPT-4o-mini dari OpenAI).
+    Hasil sukses disimpan di cache disk sehingga metrik + prompt yang sama tidak memanggil API lagi.
+    """
+    backend = backend or get_backend()
+    metrics = build_metrics(inventory_summary, financial_summary, total_items)
+    prompt = build_prompt(metrics)
+
+    key = NarrativeCache.make_key(backend, metrics, prompt)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            log.info("Narasi analitik diambil dari cache (metrik & prompt tidak berubah).")
+            return cached
+
+    try:
+        narrative = backend.generate(prompt, metrics)
+        log.info(f"AI ({backend.model})  narasi dengan {len(narrative.split())} kata.")
+
         final_narrative = truncate_text(narrative, MAX_NARRATIVE_WORDS)
-        
+
         if len(final_narrative.split()) < len(narrative.split()):
             log.warning(f"Narasi AI terlalu panjang dan telah dipotong menjadi {len(final_narrative.split())} kata.")
-        
+
+        if cache is not None:
+            cache.put(key, final_narrative)
+
         log.info("Narasi akhir siap digunakan.")
         return final_narrative
 
+    except NarrativeError as e:
+        log.error(str(e))
+        return e.fallback_text
     except Exception as e:
         log.error(f"Gagal narasi analitik: {e}")
-        return "<p><b>Error:</b> Gagal narasi analitik. Periksa log untuk detailnya (misal: kuota API key habis atau koneksi bermasalah).</p>"
+        return ERROR_GENERATE_TEXT
+
+
+class NarrativeRequest:
+    """
+    Permintaan narasi yang berjalan di thread latar belakang.
+    `result()` menunggu paling lama `timeout` detik lalu mengembalikan teks fallback.
+    """
+
+    def __init__(self, future, executor, timeout):
+        self._future = future
+        self._executor = executor
+        self.timeout = timeout
+
+    def result(self):
+        try:
+            return self._future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            log.warning(f"Narasi analitik belum selesai setelah {self.timeout} detik. Memakai teks fallback.")
+            return TIMEOUT_TEXT
+        finally:
+            # Jangan menunggu thread: jika respons datang terlambat, ia tetap masuk cache
+            self._executor.shutdown(wait=False)
+
+def request_narrative_async(inventory_summary: dict, financial_summary: dict, total_items: int,
+                            narrative_config=None) -> NarrativeRequest:
+    """Memulai pembuatan narasi di latar belakang agar tumpang-tindih dengan rendering chart."""
+    narrative_config = narrative_config or {}
+    backend = get_backend(narrative_config)
+    cache = NarrativeCache(narrative_config.get('cache_dir', DEFAULT_CACHE_DIR)) if narrative_config.get('cache', True) else None
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='narrative')
+    future = executor.submit(
+        generate_narrative_analysis, inventory_summary, financial_summary, total_items, backend, cache
+    )
+    return NarrativeRequest(future, executor, narrative_config.get('timeout_seconds', DEFAULT_TIMEOUT_SECONDS))
 
 
 # --- Blok untuk Testing ---
@@ -108,4 +294,4 @@ if __name__ == "__main__":
     print("\n--- Hasil Narasi Akhir ---")
     print(hasil_narasi)
     print(f"\nJumlah kata akhir: {len(hasil_narasi.split())}")
-    print("\n--- Selesai ---")
\ No newline at end of file
+    print("\n--- Selesai ---")
@@ -0,0 +1,416 @@
+"""
+Daemon micro-batch (`main.py --serve --interval 60s`).
+
+Berbeda dengan run terjadwal (setiap run membuat koneksi baru lalu membaca
+ulang stok, master data dan histori penjualan/PO), daemon menyimpan
+semuanya tetap hangat di memori:
+
+  - satu DataExtractor (pool koneksi SQLAlchemy) dan satu DataLoader untuk semua batch;
+  - cache tabel "keadaan saat ini" (stock, products, product_cost): setelah dimuat
+    sekali, setiap batch hanya membaca baris dengan `updated_at` >= terbaru di cache
+    dikurangi `cache_overlap` (transaksi yang commit terlambat). Tabel tanpa kolom
+    updated_at (categories, warehouses, sumber Parquet) dibaca ulang utuh. Baris yang
+    dihapus baru terlihat saat cache dimuat ulang penuh (`full_refresh_every` batch);
+  - agregat TRANSFORM (transform/aggregates.py) dari seluruh histori: setiap batch
+    hanya membaca baris baru tabel append-only (stock_movements, sales_order_details,
+    purchase_order_details) dengan ID > watermark, lalu menggabungkan agregatnya.
+    ID sequence dibagikan saat INSERT, bukan saat COMMIT: transaksi yang memegang
+    ID lebih kecil bisa commit setelah batch membaca ID yang lebih besar. ID yang
+    hilang di bawah watermark (maksimal `late_commit_ids` ID terakhir) disimpan
+    sebagai "lubang"; batch berikutnya membaca ulang mulai lubang terkecil dan hanya
+    memproses baris yang mengisi lubang atau di atas watermark (tanpa duplikat).
+    Lubang yang tetap kosong selama `late_commit_window` dianggap rollback.
+
+Hasil setiap batch yang membawa data baru ditulis seperti tahap LOAD (file
+analitik + summary table); REPORT tidak dijalankan daemon. Metrik per batch
+dicatat dengan instrumentation.py (span 'serve.batch'). Endpoint lokal:
+
+    GET /health   -> JSON status daemon (HTTP 503 jika belum siap atau batch
+                     terakhir yang berhasil sudah lebih dari 3 interval)
+    GET /metrics  -> metrik format teks Prometheus
+
+SIGTERM/SIGINT: batch yang sedang berjalan diselesaikan, lalu daemon berhenti.
+
+Catatan: baris yang difilter handle_data_quality_issues (misal 'future_date')
+tidak diproses ulang.
+"""
+import json
+import logging
+import re
+import signal
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from extract.data_extractor import DataExtractor
+from extract.sources import get_source_type
+from instrumentation import count_rows, finish_run, span, start_run
+from load.data_loader import DataLoader
+from transform.aggregates import TransformAggregates
+
+log = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = '60s'
+DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+# Tabel append-only -> kolom ID untuk watermark
+APPEND_ONLY = {
+    'stock_movements': 'movement_id',
+    'sales_order_details': 'so_detail_id',
+    'purchase_order_details': 'po_detail_id',
+}
+# Tabel "keadaan saat ini" -> kunci baris (None: selalu dibaca ulang utuh)
+CACHED_TABLES = {
+    'stock': ['product_id', 'warehouse_id'],
+    'products': ['product_id'],
+    'product_cost': ['product_id'],
+    'categories': None,
+    'warehouses': None,
+}
+VERSION_COLUMN = 'updated_at'
+
+
+def parse_duration(value):
+    """'60s', '5m', '1h', '500ms' atau angka (detik) -> detik (float)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h)?\s*', str(value))
+    if not match:
+        raise ValueError(f"Durasi tidak valid: {value!r} (contoh: 30s, 5m, 1h)")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or 's']
+
+
+class TableCache:
+    """Satu tabel di memori, diperbarui dari baris dengan updated_at terbaru."""
+
+    def __init__(self, source, name, keys, overlap_seconds=300):
+        self.source = source
+        self.name = name
+        self.keys = keys
+        self.overlap = pd.Timedelta(seconds=overlap_seconds)
+        self.frame = None
+        self.refreshes = 0
+
+    @property
+    def incremental(self):
+        return self.keys is not None and self.frame is not None and VERSION_COLUMN in self.frame.columns
+
+    def refresh(self, full=False):
+        """Memperbarui cache; True jika isinya berubah."""
+        if full or not self.incremental:
+            frame = self.source.read_table(self.name)
+            changed = self.frame is None or not frame.equals(self.frame)
+            self.frame = frame
+        else:
+            since = pd.to_datetime(self.frame[VERSION_COLUMN]).max() - self.overlap
+            delta = self.source.read_table(self.name, [(VERSION_COLUMN, '>=', since)])
+            changed = self._apply(delta)
+        if changed:
+            self.refreshes += 1
+        return changed
+
+    def _apply(self, delta):
+        if delta.empty:
+            return False
+        columns = list(self.frame.columns)
+        frame = self.frame.set_index(self.keys)
+        delta = delta[columns].set_index(self.keys)
+        if frame.reindex(delta.index).equals(delta):
+            # Baris di jendela overlap yang sudah ada di cache
+            return False
+        existing = delta.index.isin(frame.index)
+        frame.loc[delta.index[existing]] = delta[existing]
+        self.frame = pd.concat([frame, delta[~existing]]).reset_index()[columns]
+        return True
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        daemon = self.server.daemon
+        if self.path == '/health':
+            status = daemon.snapshot()
+            code = 200 if status['healthy'] else 503
+            body, content_type = json.dumps(status, default=str, indent=2), 'application/json'
+        elif self.path == '/metrics':
+            code, body, content_type = 200, daemon.prometheus_metrics(), 'text/plain; version=0.0.4'
+        else:
+            code, body, content_type = 404, 'not found\n', 'text/plain'
+        payload = body.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        log.debug(f"HTTP {self.address_string()} {format % args}")
+
+
+class MicroBatchDaemon:
+    def __init__(self, config, interval=None):
+        self.config = config
+        serve_config = config.get('serve') or {}
+        self.interval = parse_duration(interval or serve_config.get('interval', DEFAULT_INTERVAL))
+        self.full_refresh_every = serve_config.get('full_refresh_every', 60)
+        self.etl_settings = config['etl_settings']
+        # Seperti run_load: summary table & tabel metrik hanya jika sumbernya database
+        self.db_config = config['database'] if get_source_type(config.get('source')) == 'database' else None
+
+        self.extractor = DataExtractor(config['database'], config.get('source'))
+        self.loader = DataLoader(config['output'], self.db_config)
+        overlap = parse_duration(serve_config.get('cache_overlap', '5m'))
+        self.caches = {name: TableCache(self.extractor.source, name, keys, overlap)
+                       for name, keys in CACHED_TABLES.items()}
+        self.append_only = dict(APPEND_ONLY)
+        self.watermarks = {}
+        # {tabel: {id: waktu (monotonic) pertama terlihat hilang}} di bawah watermark
+        self.late_ids = {}
+        self.late_commit_ids = int(serve_config.get('late_commit_ids', 100_000))
+        self.late_commit_window = parse_duration(serve_config.get('late_commit_window', '5m'))
+        self.aggregates = None
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {
+            'state': 'starting',
+            'started_at': datetime.now(timezone.utc),
+            'batches': 0,
+            'idle_batches': 0,
+            'errors': 0,
+            'last_batch_at': None,
+            'last_batch_seconds': None,
+            'last_success_at': None,
+            'last_error': None,
+            'rows': Counter(),
+        }
+
+    def _update_stats(self, **values):
+        with self._lock:
+            self.stats.update(values)
+
+    def _read_new_rows(self):
+        """
+        Baris baru tabel append-only (semua baris saat bootstrap), beserta watermark
+        dan lubang ID barunya (berlaku setelah batch berhasil, lihat run_batch).
+        """
+        new_rows, watermarks, late_ids = {}, {}, {}
+        now = time.monotonic()
+        for table, id_column in self.append_only.items():
+            watermark = self.watermarks.get(table)
+            holes = self.late_ids.get(table, {})
+            if watermark is None:
+                filters = None
+            else:
+                # Baca ulang mulai lubang terkecil; baris di bawah watermark yang bukan lubang sudah diproses
+                filters = [(id_column, '>', min(holes) - 1 if holes else watermark)]
+            df = self.extractor.source.read_table(table, filters)
+            ids = df[id_column].to_numpy(dtype=np.int64)
+            filled = set()
+            if holes:
+                keep = (ids > watermark) | np.isin(ids, np.fromiter(holes, dtype=np.int64, count=len(holes)))
+                df, ids = df[keep], ids[keep]
+                filled = set(ids[ids <= watermark].tolist())
+                if filled:
+                    log.info(f"{table}: {len(filled)} baris commit terlambat (ID < watermark {watermark}) ikut diproses.")
+            new_rows[table] = df
+
+            # Lubang lama yang belum terisi & belum kedaluwarsa, plus lubang baru di bawah ID terbesar
+            remaining = {i: seen for i, seen in holes.items()
+                         if i not in filled and now - seen < self.late_commit_window}
+            new_watermark = max(watermark or 0, int(ids.max())) if len(ids) else watermark
+            if new_watermark is not None and new_watermark != watermark:
+                low = max(watermark if watermark is not None else int(ids.min()) - 1,
+                          new_watermark - self.late_commit_ids)
+                candidates = np.arange(low + 1, new_watermark + 1, dtype=np.int64)
+                missing = candidates[~np.isin(candidates, ids[ids > low])]
+                remaining.update(dict.fromkeys(missing.tolist(), now))
+                watermarks[table] = new_watermark
+            late_ids[table] = remaining
+        return new_rows, watermarks, late_ids
+
+    def _refresh_caches(self, full=False):
+        changed = []
+        for name, cache in self.caches.items():
+            if cache.refresh(full):
+                changed.append(name)
+        return changed
+
+    def _current_frames(self, aggregates):
+        """Input 'keadaan saat ini' untuk finalize: cache + (opsional) dead stock & rata-rata inventori dari database."""
+        frames = {name: cache.frame.copy() for name, cache in self.caches.items()}
+        if self.etl_settings.get('dead_stock_source', 'pandas') == 'database':
+            dead_stock = self.extractor.extract_dead_stock(self.etl_settings['dead_stock_days'])
+            if dead_stock is not None:
+                frames['dead_stock'] = dead_stock
+        if self.etl_settings.get('average_inventory_source', 'stock') == 'snapshot' \
+                and pd.notna(aggregates.first_date):
+            dates = pd.DataFrame({'movement_date': [aggregates.first_date, aggregates.last_date]})
+            average_inventory = self.extractor.extract_average_inventory(dates)
+            if average_inventory is not None:
+                frames['average_inventory'] = average_inventory
+        return frames
+
+    def bootstrap(self):
+        """Memuat cache (sekali, saat start); batch pertama membaca seluruh histori append-only."""
+        log.info("Daemon: memuat cache tabel stok & master data...")
+        start = time.perf_counter()
+        try:
+            self.caches['product_cost'].refresh()
+            # Biaya rata-rata dari product_cost: histori PO tidak perlu diikuti
+            del self.append_only['purchase_order_details']
+        except Exception as e:
+            log.info(f"Tabel product_cost tidak tersedia ({type(e).__name__}), memakai purchase_order_details.")
+            del self.caches['product_cost']
+        self._refresh_caches()
+        log.info(f"Cache dimuat dalam {time.perf_counter() - start:.1f}s: "
+                 f"{', '.join(f'{name} {len(cache.frame)}' for name, cache in self.caches.items())} baris.")
+        self._update_stats(state='running')
+
+    def run_batch(self):
+        """Satu micro-batch. Mengembalikan True jika ada data baru yang diproses dan dimuat."""
+        batch = self.stats['batches'] + 1
+        metrics = start_run(self.config.get('metrics'))
+        processed = False
+        start = time.perf_counter()
+        try:
+            with span('serve.batch', batch=batch) as s:
+                full = bool(self.full_refresh_every) and batch % self.full_refresh_every == 0
+                with span('serve.extract', full_refresh=full) as e:
+                    new_rows, watermarks, late_ids = self._read_new_rows()
+                    rows_read = {table: len(df) for table, df in new_rows.items()}
+                    changed = self._refresh_caches(full)
+                    e.rows_out = count_rows(new_rows)
+                    e.details['changed_tables'] = changed
+
+                if self.aggregates is not None and not e.rows_out and not changed:
+                    log.info(f"Batch {batch}: tidak ada data baru.")
+                    self.late_ids = late_ids  # lubang yang kedaluwarsa
+                    self._update_stats(idle_batches=self.stats['idle_batches'] + 1)
+                else:
+                    with span('serve.transform', rows_in=e.rows_out) as t:
+                        new_rows = self.extractor.handle_data_quality_issues(new_rows)
+                        aggregates = TransformAggregates.from_frames(new_rows)
+                        if self.aggregates is not None:
+                            aggregates = self.aggregates.merge(aggregates)
+                        data = aggregates.finalize(self._current_frames(aggregates), self.etl_settings['dead_stock_days'],
+                                                   self.etl_settings['abc_analysis'])
+                        t.rows_out = aggregates.movements
+                    # Agregat, watermark & lubang ID baru berlaku setelah TRANSFORM berhasil
+                    self.aggregates = aggregates
+                    self.watermarks.update(watermarks)
+                    self.late_ids = late_ids
+
+                    with span('load'):
+                        self.loader.save_to_file(data)
+                        with span('load.summary_table'):
+                            self.loader.load_to_summary_table(data)
+                    processed = True
+                    log.info(f"Batch {batch}: {e.rows_out} baris baru, cache berubah: {','.join(changed) or '-'}, "
+                             f"total {aggregates.movements} movements.")
+                s.rows_out = e.rows_out
+
+            now = datetime.now(timezone.utc)
+            with self._lock:
+                self.stats['rows'].update(rows_read)
+                self.stats.update(last_success_at=now, watermarks=dict(self.watermarks),
+                                  late_ids={table: len(holes) for table, holes in self.late_ids.items()})
+            return processed
+        except Exception as e:
+            log.error(f"Batch {batch} gagal: {e}")
+            self._update_stats(errors=self.stats['errors'] + 1, last_error=f"{type(e).__name__}: {e}")
+            return False
+        finally:
+            self._update_stats(batches=batch, last_batch_at=datetime.now(timezone.utc),
+                               last_batch_seconds=round(time.perf_counter() - start, 3))
+            # Batch tanpa data baru tidak ditulis ke tabel metrik (hanya JSON Lines)
+            finish_run(metrics, self.config.get('metrics'), engine=self.loader.engine if processed else None)
+
+    def snapshot(self):
+        """Status daemon untuk /health."""
+        with self._lock:
+            status = {key: (dict(value) if isinstance(value, Counter) else value) for key, value in self.stats.items()}
+        last_success = status['last_success_at']
+        status['healthy'] = status['state'] == 'running' and last_success is not None and \
+            (datetime.now(timezone.utc) - last_success).total_seconds() <= 3 * self.interval
+        status['interval_seconds'] = self.interval
+        status['movements_in_aggregates'] = self.aggregates.movements if self.aggregates is not None else 0
+        status['cache_rows'] = {name: len(cache.frame) for name, cache in self.caches.items() if cache.frame is not None}
+        return status
+
+    def prometheus_metrics(self):
+        """Metrik daemon dalam format teks Prometheus."""
+        status = self.snapshot()
+        lines = [
+            f"etl_serve_up {int(status['healthy'])}",
+            f"etl_serve_batches_total {status['batches']}",
+            f"etl_serve_idle_batches_total {status['idle_batches']}",
+            f"etl_serve_batch_errors_total {status['errors']}",
+            f"etl_serve_movements_in_aggregates {status['movements_in_aggregates']}",
+        ]
+        if status['last_batch_seconds'] is not None:
+            lines.append(f"etl_serve_last_batch_seconds {status['last_batch_seconds']}")
+        if status['last_success_at'] is not None:
+            lines.append(f"etl_serve_last_success_timestamp_seconds {status['last_success_at'].timestamp():.3f}")
+        lines += [f'etl_serve_rows_total{{table="{table}"}} {rows}' for table, rows in status['rows'].items()]
+        lines += [f'etl_serve_watermark{{table="{table}"}} {value}'
+                  for table, value in (status.get('watermarks') or {}).items()]
+        lines += [f'etl_serve_pending_late_ids{{table="{table}"}} {count}'
+                  for table, count in (status.get('late_ids') or {}).items()]
+        lines += [f'etl_serve_cache_rows{{table="{table}"}} {rows}' for table, rows in status['cache_rows'].items()]
+        lines += [f'etl_serve_cache_refreshes_total{{table="{name}"}} {cache.refreshes}'
+                  for name, cache in self.caches.items()]
+        return '\n'.join(lines) + '\n'
+
+    def start_http(self, host, port):
+        """Endpoint /health & /metrics di thread latar belakang."""
+        server = ThreadingHTTPServer((host, port), _HealthHandler)
+        server.daemon = self
+        threading.Thread(target=server.serve_forever, name='serve-http', daemon=True).start()
+        log.info(f"Endpoint health/metrics di http://{host}:{server.server_address[1]}/health")
+        return server
+
+    def stop(self, *_):
+        if not self._stop.is_set():
+            log.info("Sinyal berhenti diterima: daemon berhenti setelah batch yang sedang berjalan selesai.")
+            self._update_stats(state='stopping')
+            self._stop.set()
+
+    def serve_forever(self):
+        """Menjalankan batch setiap `interval` detik (dihitung dari awal batch) sampai stop()."""
+        log.info(f"--- DAEMON MICRO-BATCH (interval {self.interval:g}s) ---")
+        next_run = time.monotonic()
+        while not self._stop.is_set():
+            self.run_batch()
+            next_run += self.interval
+            # Batch yang lebih lama dari interval: batch berikutnya langsung, jadwal yang terlewat tidak dikejar
+            next_run = max(next_run, time.monotonic())
+            self._stop.wait(next_run - time.monotonic())
+
+    def close(self):
+        for engine in (getattr(self.extractor.source, 'engine', None), self.loader.engine):
+            if engine is not None:
+                engine.dispose()
+
+
+def serve(config, interval=None):
+    """Entry point `main.py --serve`: bootstrap, endpoint health, loop batch sampai SIGTERM/SIGINT."""
+    serve_config = config.get('serve') or {}
+    daemon = MicroBatchDaemon(config, interval)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, daemon.stop)
+
+    server = None
+    if serve_config.get('port') is not None:
+        server = daemon.start_http(serve_config.get('host', '127.0.0.1'), serve_config['port'])
+    try:
+        daemon.bootstrap()
+        daemon.serve_forever()
+    finally:
+        if server is not None:
+            server.shutdown()
+        daemon.close()
+        log.info("--- DAEMON MICRO-BATCH BERHENTI ---")
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from etl_pipeline.transform.financial_metrics import calculate_financial_metrics
+from etl_pipeline.transform.inventory_metrics import calculate_inventory_metrics
+from etl_pipeline.transform.movement_analytics import calculate_movement_analytics
+from etl_pipeline.transform.warehouse_performance import calculate_warehouse_performance
+
+
+@pytest.fixture
+def abc_config():
+    return {'A_percent': 0.8, 'B_percent': 0.15, 'C_percent': 0.05}
+
+
+@pytest.fixture
+def history():
+    """Factory movements (termasuk pasangan TRANSFER), detail SO & PO sintetis."""
+    def make(start_id=1, days=20):
+        dates = pd.date_range('2024-01-01', periods=days, freq='D', tz='UTC') + pd.Timedelta(hours=9)
+        rows = []
+        for i, date in enumerate(dates):
+            rows += [(i % 3 + 1, 1, 'OUT', -(i % 4 + 1), None, date), (i % 2 + 1, 2, 'IN', 5, None, date),
+                     (1, 1, 'TRANSFER', -2, 100 + i, date), (1, 2, 'TRANSFER', 2, 100 + i, date)]
+        movements = pd.DataFrame(rows, columns=['product_id', 'warehouse_id', 'movement_type', 'quantity',
+                                                'reference_id', 'movement_date'])
+        movements.insert(0, 'movement_id', range(start_id, start_id + len(movements)))
+        so_details = pd.DataFrame({'so_detail_id': range(start_id, start_id + days), 'warehouse_id': 1,
+                                   'product_id': [i % 3 + 1 for i in range(days)],
+                                   'quantity': [i % 4 + 1 for i in range(days)], 'unit_price': 10.5})
+        po_details = pd.DataFrame({'po_detail_id': [start_id, start_id + 1], 'product_id': [1, 2],
+                                   'quantity': [10, 20], 'unit_price': [4.0, 2.5]})
+        return {'stock_movements': movements, 'sales_order_details': so_details,
+                'purchase_order_details': po_details}
+    return make
+
+
+@pytest.fixture
+def current_state():
+    """Factory tabel state (stock & dimensi); setiap panggilan mengembalikan DataFrame baru."""
+    def make():
+        return {
+            'stock': pd.DataFrame({'product_id': [1, 2, 3, 1], 'warehouse_id': [1, 1, 1, 2],
+                                   'quantity_on_hand': [10, 5, 3, 7]}),
+            'products': pd.DataFrame({'product_id': [1, 2, 3]}),
+            'categories': pd.DataFrame({'category_id': [1]}),
+            'warehouses': pd.DataFrame({'warehouse_id': [1, 2]}),
+        }
+    return make
+
+
+@pytest.fixture
+def transform(abc_config):
+    """TRANSFORM satu proses (urutan yang sama dengan pipeline)."""
+    def run(data):
+        data = calculate_inventory_metrics(data, 180)
+        data = calculate_movement_analytics(data)
+        data = calculate_financial_metrics(data, abc_config)
+        return calculate_warehouse_performance(data)
+    return run
+
+
+@pytest.fixture
+def assert_same_analytics():
+    def check(expected, actual):
+        for name in ['daily_trends', 'weekly_trends', 'monthly_trends', 'peak_day_of_week', 'abc_analysis',
+                     'stock_value_report', 'transfer_patterns', 'warehouse_io_summary']:
+            pd.testing.assert_frame_equal(expected[name], actual[name], check_exact=False)
+        pd.testing.assert_frame_equal(expected['dead_stock_report'].reset_index(drop=True),
+                                      actual['dead_stock_report'].reset_index(drop=True))
+        assert expected['inventory_summary'] == actual['inventory_summary']
+    return check
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+from etl_pipeline.load.chart_renderer import chart_cache_key, make_chart_spec, render_charts
+
+@pytest.fixture
+def line_spec():
+    """Spesifikasi chart garis sederhana."""
+    df = pd.DataFrame({
+        'movement_date': pd.date_range('2024-01-31', periods=3, freq='ME'),
+        'monthly_movements': [10, 20, 15]
+    })
+    return make_chart_spec('monthly_movements', 'line', df, 'Monthly Sales Movements',
+                           x='movement_date', y='monthly_movements')
+
+def test_cache_key_follows_data_and_style(line_spec):
+    """Key cache stabil untuk input yang sama, berubah jika data atau style berubah."""
+    key = chart_cache_key(line_spec)
+    assert key == chart_cache_key(dict(line_spec))
+
+    changed = dict(line_spec, data=line_spec['data'].assign(monthly_movements=[10, 20, 16]))
+    assert chart_cache_key(changed) != key
+    assert chart_cache_key(line_spec, {'style': 'classic', 'dpi': 100}) != key
+
+def test_render_charts_reuses_cache(line_spec, tmp_path):
+    """Render kedua dengan data yang sama tidak menggambar ulang chart."""
+    paths = render_charts([line_spec], tmp_path, workers=1)
+    assert paths == {'monthly_movements': 'charts/monthly_movements.png'}
+    assert (tmp_path / 'monthly_movements.png').exists()
+
+    cache_file = tmp_path / '.cache' / f"{chart_cache_key(line_spec, {'style': 'ggplot', 'dpi': 100})}.png"
+    mtime = cache_file.stat().st_mtime_ns
+
+    render_charts([line_spec], tmp_path, workers=1)
+    assert cache_file.stat().st_mtime_ns == mtime
+
+def test_cache_evicts_least_recently_used(line_spec, tmp_path):
+    """Cache dibatasi jumlah file: chart yang paling lama tidak dipakai dihapus, chart run ini dipertahankan."""
+    def spec(value):
+        return dict(line_spec, data=line_spec['data'].assign(monthly_movements=[10, 20, value]))
+
+    render_charts([spec(1)], tmp_path, workers=1, cache_max_entries=2)
+    render_charts([spec(2)], tmp_path, workers=1, cache_max_entries=2)
+    render_charts([spec(1)], tmp_path, workers=1, cache_max_entries=2)  # cache hit: spec(1) baru dipakai
+    render_charts([spec(3)], tmp_path, workers=1, cache_max_entries=2)
+
+    cached = {path.stem for path in (tmp_path / '.cache').glob('*.png')}
+    style = {'style': 'ggplot', 'dpi': 100}
+    assert cached == {chart_cache_key(spec(1), style), chart_cache_key(spec(3), style)}
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from etl_pipeline.checkpoint import RunCheckpoint, prune
+
+
+def sample_data():
+    movements = pd.DataFrame({
+        'movement_id': [3, 1, 2],
+        'movement_date': pd.to_datetime(['2024-01-03', '2024-01-01', '2024-01-02'], utc=True),
+        'movement_type': pd.Categorical(['IN', 'OUT', 'IN']),
+    }, index=[10, 11, 12])
+    return {'stock_movements': movements,
+            'inventory_summary': {'total_dead_stock_items': 2, 'stock_turnover_ratio': 1.5}}
+
+
+def test_stage_round_trip_preserves_frames_and_objects(tmp_path):
+    """Hasil tahap dimuat kembali identik (index, dtype, dict summary) dan tahap tercatat selesai."""
+    checkpoint = RunCheckpoint.create(tmp_path, 'run-1', 'full', ['extract', 'transform', 'load'])
+    checkpoint.save('extract', sample_data())
+    checkpoint.save('load')
+
+    reopened = RunCheckpoint.open(tmp_path, 'run-1')
+    assert reopened.completed == ['extract', 'load']
+    loaded = reopened.load('extract')
+    assert list(loaded) == ['stock_movements', 'inventory_summary']
+    pd.testing.assert_frame_equal(loaded['stock_movements'], sample_data()['stock_movements'])
+    assert loaded['inventory_summary'] == sample_data()['inventory_summary']
+
+
+def test_reuse_latest_stage_and_prune(tmp_path):
+    """--from-stage memakai EXTRACT terbaru; prune menyisakan run terbaru & checkpoint EXTRACT terakhir."""
+    source = RunCheckpoint.create(tmp_path, 'run-1', 'incremental', ['extract'])
+    source.save('extract', sample_data())
+    for run_id in ['run-2', 'run-3']:
+        RunCheckpoint.create(tmp_path, run_id, 'full', ['extract'])
+
+    assert RunCheckpoint.latest_with(tmp_path, 'extract').run_id == 'run-1'
+    rerun = RunCheckpoint.create(tmp_path, 'run-4', 'incremental', ['transform'])
+    rerun.reuse('extract', source)
+    assert rerun.state['completed']['extract']['from_run'] == 'run-1'
+    assert RunCheckpoint.latest_with(tmp_path, 'extract').run_id == 'run-4'
+
+    prune(tmp_path, keep=1)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['run-4']
+    assert RunCheckpoint.open(tmp_path, 'run-4').load('extract')['inventory_summary']['total_dead_stock_items'] == 2
@@ -0,0 +1,62 @@
+import json
+
+import pandas as pd
+import pytest
+
+from etl_pipeline import instrumentation
+from etl_pipeline.instrumentation import finish_run, instrumented, span, start_run
+
+
+@pytest.fixture
+def run(tmp_path):
+    metrics = start_run({'jsonl_path': tmp_path / 'metrics.jsonl'})
+    yield metrics
+    finish_run(metrics)
+
+
+def test_span_is_noop_without_active_run():
+    """Tanpa start_run, span tetap bisa dipakai tetapi tidak mencatat apa pun."""
+    assert instrumentation._active is None
+    with span('transform', rows_in=10) as s:
+        s.rows_out = 5
+    assert s.span_id is None
+
+
+def test_nested_spans_written_as_json_lines(run):
+    """Span bersarang mencatat induk, baris, throughput & status; exception tetap diteruskan."""
+    @instrumented('transform.step', rows=True)
+    def step(df):
+        return df.head(2)
+
+    with span('transform', rows_in=4):
+        step(pd.DataFrame({'a': range(4)}))
+        with pytest.raises(ValueError):
+            with span('load.save_file', file='x'):
+                raise ValueError("gagal")
+
+    lines = [json.loads(line) for line in run.jsonl_path.read_text().splitlines()]
+    records = {r['span']: r for r in lines}
+    assert [r['span'] for r in lines] == ['transform.step', 'load.save_file', 'transform']
+    assert {r['run_id'] for r in lines} == {run.run_id}
+    assert records['transform.step']['parent_id'] == records['transform']['span_id']
+    assert (records['transform.step']['rows_in'], records['transform.step']['rows_out']) == (4, 2)
+    assert records['transform']['rows_per_second'] > 0
+    assert records['load.save_file']['status'] == 'error'
+    assert records['load.save_file']['details'] == {'file': 'x'}
+    assert list(run.to_frame()['span']) == ['transform', 'transform.step', 'load.save_file']
+
+
+def test_finish_run_writes_through_callers_engine(tmp_path):
+    """Dengan `engine` milik pemanggil, span ditulis lewat engine itu (tanpa engine baru per run)."""
+    sqlalchemy = pytest.importorskip('sqlalchemy')
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    for _ in range(2):
+        metrics = start_run({'jsonl_path': None})
+        with span('serve.batch', rows_in=3):
+            pass
+        finish_run(metrics, {'table_name': 'etl_run_metrics'}, engine=engine)
+
+    assert instrumentation._active is None
+    stored = pd.read_sql('SELECT span FROM etl_run_metrics', engine)
+    assert list(stored['span']) == ['serve.batch', 'serve.batch']
+    engine.dispose()
@@ -0,0 +1,64 @@
+import time
+import pytest
+from etl_pipeline import model
+from etl_pipeline.model import (
+    NarrativeCache, StubNarrativeBackend, TIMEOUT_TEXT,
+    generate_narrative_analysis, request_narrative_async
+)
+
+INVENTORY_SUMMARY = {'stock_turnover_ratio': 2.5, 'days_of_inventory_on_hand': 146.0,
+                     'total_dead_stock_items': 450, 'total_dead_stock_value': 2_500_000_000}
+FINANCIAL_SUMMARY = {'total_inventory_value': 5_100_000_000}
+
+class CountingBackend(StubNarrativeBackend):
+    """Backend stub yang menghitung jumlah pemanggilan."""
+    name = 'counting'
+    calls = 0
+
+    def generate(self, prompt, metrics):
+        CountingBackend.calls += 1
+        return super().generate(prompt, metrics)
+
+class SlowBackend(StubNarrativeBackend):
+    """Backend stub yang lebih lambat dari timeout."""
+    name = 'slow'
+
+    def generate(self, prompt, metrics):
+        time.sleep(0.2)
+        return super().generate(prompt, metrics)
+
+@pytest.fixture(autouse=True)
+def no_backend_env(monkeypatch):
+    monkeypatch.delenv('NARRATIVE_BACKEND', raising=False)
+
+def test_stub_backend_is_deterministic():
+    """Backend stub menghasilkan narasi yang sama untuk metrik yang sama, tanpa jaringan."""
+    first = generate_narrative_analysis(INVENTORY_SUMMARY, FINANCIAL_SUMMARY, 1000, backend=StubNarrativeBackend())
+    second = generate_narrative_analysis(INVENTORY_SUMMARY, FINANCIAL_SUMMARY, 1000, backend=StubNarrativeBackend())
+    assert first == second
+    assert '450 SKU dead stock' in first
+
+def test_cache_skips_backend_for_same_metrics(tmp_path):
+    """Metrik + prompt yang sama diambil dari cache disk, metrik berbeda memanggil backend lagi."""
+    cache = NarrativeCache(tmp_path)
+    CountingBackend.calls = 0
+
+    generate_narrative_analysis(INVENTORY_SUMMARY, FINANCIAL_SUMMARY, 1000, backend=CountingBackend(), cache=cache)
+    generate_narrative_analysis(INVENTORY_SUMMARY, FINANCIAL_SUMMARY, 1000, backend=CountingBackend(), cache=cache)
+    assert CountingBackend.calls == 1
+
+    generate_narrative_analysis(INVENTORY_SUMMARY, FINANCIAL_SUMMARY, 2000, backend=CountingBackend(), cache=cache)
+    assert CountingBackend.calls == 2
+
+def test_async_request_falls_back_on_timeout(tmp_path, monkeypatch):
+    """Permintaan asinkron yang melewati timeout mengembalikan teks fallback."""
+    monkeypatch.setitem(model.NARRATIVE_BACKENDS, SlowBackend.name, SlowBackend)
+    request = request_narrative_async(
+        INVENTORY_SUMMARY, FINANCIAL_SUMMARY, 1000,
+        narrative_config={'backend': 'slow', 'timeout_seconds': 0.05, 'cache_dir': str(tmp_path)}
+    )
+    try:
+        assert request.result() == TIMEOUT_TEXT
+    finally:
+        # Tunggu respons terlambat (masuk cache di tmp_path) agar thread tidak hidup melewati test
+        request._future.result()
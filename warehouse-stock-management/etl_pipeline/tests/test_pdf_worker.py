@@ -0,0 +1,73 @@
+import logging
+import time
+from pathlib import Path
+
+import pytest
+
+from etl_pipeline.load import pdf_worker
+from etl_pipeline.load.pdf_worker import PdfRenderWorker
+
+
+def fake_render(html_path, pdf_path, base_url):
+    Path(pdf_path).write_text(Path(html_path).read_text(encoding='utf-8'), encoding='utf-8')
+    return str(pdf_path)
+
+
+def failing_render(html_path, pdf_path, base_url):
+    raise ValueError(f"tidak bisa merender {html_path}")
+
+
+def slow_render(html_path, pdf_path, base_url):
+    time.sleep(1)
+    return fake_render(html_path, pdf_path, base_url)
+
+
+@pytest.fixture(autouse=True)
+def weasyprint_installed(monkeypatch):
+    monkeypatch.setattr(pdf_worker, 'weasyprint_available', lambda: True)
+
+
+@pytest.fixture
+def html_path(tmp_path):
+    path = tmp_path / 'report.html'
+    path.write_text('<h1>Laporan</h1>', encoding='utf-8')
+    return path
+
+
+def test_wait_collects_background_results(tmp_path, html_path, caplog):
+    """Job di worker latar belakang selesai setelah wait(); kegagalan satu job dicatat tanpa menghentikan yang lain."""
+    worker = PdfRenderWorker(render=fake_render)
+    worker.submit(html_path, tmp_path / 'ok.pdf', None)
+    worker.render = failing_render
+    worker.submit(html_path, tmp_path / 'gagal.pdf', None)
+
+    with caplog.at_level(logging.ERROR):
+        assert worker.wait() == 1
+    assert (tmp_path / 'ok.pdf').read_text(encoding='utf-8') == '<h1>Laporan</h1>'
+    assert 'gagal.pdf' in caplog.text and 'tidak bisa merender' in caplog.text
+    assert worker.wait() == 0
+
+
+def test_wait_timeout_covers_all_jobs(tmp_path, html_path, caplog):
+    """Batas waktu berlaku untuk semua job sekaligus; job yang belum selesai dicatat lalu ditinggalkan."""
+    worker = PdfRenderWorker(render=slow_render)
+    for name in ('a.pdf', 'b.pdf', 'c.pdf'):
+        worker.submit(html_path, tmp_path / name, None)
+
+    start = time.monotonic()
+    with caplog.at_level(logging.ERROR):
+        assert worker.wait(timeout=0.2) == 0
+    assert time.monotonic() - start < 1
+    assert all(name in caplog.text for name in ('a.pdf', 'b.pdf', 'c.pdf'))
+
+
+def test_foreground_render_reports_errors(tmp_path, html_path, caplog):
+    """Tanpa worker latar belakang PDF dibuat langsung saat submit."""
+    worker = PdfRenderWorker(background=False, render=fake_render)
+    worker.submit(html_path, tmp_path / 'ok.pdf', None)
+    assert (tmp_path / 'ok.pdf').exists()
+
+    worker.render = failing_render
+    with caplog.at_level(logging.ERROR):
+        worker.submit(html_path, tmp_path / 'gagal.pdf', None)
+    assert 'tidak bisa merender' in caplog.text
@@ -0,0 +1,43 @@
+import pstats
+
+import pytest
+
+from etl_pipeline.profiling import StageProfiler
+
+
+def busy_loop(seconds):
+    """Fungsi Python murni yang sibuk selama `seconds` detik."""
+    import time
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_sampling_writes_collapsed_stacks(tmp_path):
+    """Mode sampling menulis stack collapsed per tahap dengan fungsi sibuk sebagai hot function."""
+    profiler = StageProfiler('sampling', tmp_path, interval=0.001)
+    with profiler.stage('transform'):
+        busy_loop(0.2)
+
+    lines = (tmp_path / 'transform.collapsed').read_text().splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('test_profiling:busy_loop' in line.split(';')[-1] for line in lines)
+    label, own, inclusive = profiler.summaries['transform']['top'][0]
+    assert label.endswith(':busy_loop') and own > 50 and inclusive >= own
+
+
+@pytest.mark.parametrize('mode, artifact', [('cprofile', 'load.pstats'), ('memory', 'load.memory.txt')])
+def test_stage_artifacts(tmp_path, mode, artifact):
+    """Mode cprofile & memory menulis artefak per tahap, juga jika tahap gagal."""
+    profiler = StageProfiler(mode, tmp_path)
+    with pytest.raises(ValueError):
+        with profiler.stage('load'):
+            data = [bytes(1000) for _ in range(1000)]
+            raise ValueError(len(data))
+
+    assert (tmp_path / artifact).exists()
+    assert profiler.summaries['load']['seconds'] > 0
+    if mode == 'cprofile':
+        assert pstats.Stats(str(tmp_path / artifact)).total_calls > 0
@@ -0,0 +1,28 @@
+from etl_pipeline.load.report_generator import ReportGenerator, TEMPLATE_DIR, get_template_env
+
+INVENTORY_SUMMARY = {'stock_turnover_ratio': 2.5, 'days_of_inventory_on_hand': 146.0,
+                     'total_dead_stock_items': 450, 'total_dead_stock_value': 2_500_000_000}
+FINANCIAL_SUMMARY = {'total_inventory_value': 5_100_000_000}
+
+def test_template_env_is_compiled_once(tmp_path):
+    """Environment Jinja (dan template terkompilasinya) dipakai ulang dalam satu proses."""
+    env_a = get_template_env(str(TEMPLATE_DIR), str(tmp_path / 'jinja'))
+    env_b = get_template_env(str(TEMPLATE_DIR), str(tmp_path / 'jinja'))
+    assert env_a is env_b
+    assert env_a.get_template('report_template.html') is env_b.get_template('report_template.html')
+
+def test_render_reports_writes_batch(tmp_path):
+    """Satu batch menghasilkan satu file HTML per laporan dengan judul masing-masing."""
+    generator = ReportGenerator(tmp_path / 'reports', template_cache_dir=str(tmp_path / 'jinja'),
+                                pdf_config={'background': False})
+    batch = [
+        (f'report_{wh_id}', {'report_title': f'Gudang {wh_id}', 'run_date': '2024-01-01 00:00:00',
+                             'inventory_summary': INVENTORY_SUMMARY, 'financial_summary': FINANCIAL_SUMMARY,
+                             'charts': {}})
+        for wh_id in (1, 2)
+    ]
+    generator.render_reports(batch)
+
+    for wh_id in (1, 2):
+        html = (tmp_path / 'reports' / f'report_{wh_id}.html').read_text(encoding='utf-8')
+        assert f'Gudang {wh_id}' in html
@@ -0,0 +1,18 @@
+import pandas as pd
+
+from etl_pipeline.transform.sharded import assign_shards, sharded_transform
+
+
+def test_assign_shards_balances_rows():
+    """Gudang terbesar lebih dulu ke shard paling ringan; shard tidak melebihi jumlah gudang."""
+    rows = pd.Series({1: 50, 2: 30, 3: 25, 4: 5})
+    assert assign_shards(rows, 2) == {1: 0, 2: 1, 3: 1, 4: 0}
+    assert set(assign_shards(rows.iloc[:1], 4).values()) == {0}
+
+
+def test_sharded_transform_matches_single_process(abc_config, history, current_state, transform,
+                                                  assert_same_analytics):
+    """Map-reduce per gudang (2 proses) menghasilkan tabel analitik yang sama dengan transform satu proses."""
+    expected = transform({**current_state(), **history()})
+    actual = sharded_transform({**current_state(), **history()}, 180, abc_config, workers=2)
+    assert_same_analytics(expected, actual)
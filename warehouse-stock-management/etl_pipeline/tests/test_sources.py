@@ -0,0 +1,121 @@
+import pandas as pd
+import pytest
+
+from etl_pipeline.extract.data_extractor import DataExtractor, TABLES
+from etl_pipeline.extract.archive import closed_months, write_manifest
+from etl_pipeline.extract.sources import DataSource, ParquetSource, TieredSource
+
+def make_dataset(root):
+    """Dataset Parquet kecil dengan layout generator: satu folder per tabel, beberapa part."""
+    movements = pd.DataFrame({
+        'movement_id': range(1, 7),
+        'product_id': [1, 1, 2, 2, 1, 2],
+        'warehouse_id': [1] * 6,
+        'movement_type': ['IN', 'OUT', 'IN', 'OUT', 'IN', 'OUT'],
+        'quantity': [10, -2, 5, -1, 3, -1],
+        'reference_id': pd.array([1, 2, None, 4, 5, 6], dtype='Int64'),
+        'movement_date': pd.to_datetime(['2023-01-01', '2023-02-01', '2023-03-01',
+                                         '2023-04-01', '2023-05-01', '2023-06-01'], utc=True),
+    })
+    for name in TABLES:
+        (root / name).mkdir(parents=True)
+    # Dua part agar filter movement_id bisa melewati satu file
+    movements.iloc[:3].to_parquet(root / 'stock_movements' / 'part-00000.parquet', index=False)
+    movements.iloc[3:].to_parquet(root / 'stock_movements' / 'part-00001.parquet', index=False)
+    for name in TABLES:
+        if name != 'stock_movements':
+            pd.DataFrame({'product_id': [1, 2]}).to_parquet(root / name / 'part-00000.parquet', index=False)
+    return movements
+
+def test_parquet_source_filters(tmp_path):
+    """Filter tanggal (literal tanpa zona waktu = UTC) dan ID digabung dengan AND."""
+    make_dataset(tmp_path)
+    source = ParquetSource(tmp_path)
+
+    df = source.read_table('stock_movements', [('movement_date', '>', '2023-02-15 00:00:00'),
+                                               ('movement_id', '<=', 5)])
+    assert sorted(df['movement_id']) == [3, 4, 5]
+    # Tipe mengikuti pd.read_sql: INT nullable menjadi float, TIMESTAMPTZ tetap UTC
+    assert df['reference_id'].dtype == 'float64'
+    assert str(df['movement_date'].dt.tz) == 'UTC'
+
+def test_extractor_incremental_from_parquet(tmp_path):
+    """DataExtractor bisa berjalan tanpa database dengan sumber Parquet."""
+    make_dataset(tmp_path)
+    extractor = DataExtractor(None, {'type': 'parquet', 'path': str(tmp_path)})
+
+    tables = extractor.extract_incremental('2023-01-15 00:00:00', last_movement_id=4)
+    assert set(tables) == set(TABLES)
+    assert list(tables['stock_movements']['movement_id']) == [5, 6]
+    assert len(extractor.extract_full()['stock_movements']) == 6
+
+def test_extractor_prefers_derived_tables(tmp_path):
+    """Jika product_cost tersedia, histori detail PO tidak diambil."""
+    make_dataset(tmp_path)
+    (tmp_path / 'product_cost').mkdir()
+    pd.DataFrame({'product_id': [1, 2], 'avg_cost': [10.0, 20.0]}).to_parquet(
+        tmp_path / 'product_cost' / 'part-00000.parquet', index=False)
+    extractor = DataExtractor(None, {'type': 'parquet', 'path': str(tmp_path)})
+
+    tables = extractor.extract_full()
+    assert 'product_cost' in tables
+    assert 'purchase_order_details' not in tables
+
+def test_extractor_dead_stock_falls_back_without_database(tmp_path):
+    """Sumber Parquet tidak punya find_dead_stock(): transform memakai movements."""
+    make_dataset(tmp_path)
+    extractor = DataExtractor(None, {'type': 'parquet', 'path': str(tmp_path)})
+    assert extractor.extract_dead_stock(180) is None
+
+def test_closed_months_end_before_cutoff():
+    """Hanya bulan kalender UTC yang berakhir sebelum batas yang diarsip."""
+    months = closed_months('2023-01-20 10:00:00+07:00', pd.Timestamp('2023-04-15', tz='UTC'))
+    assert [(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')) for start, end in months] == [
+        ('2023-01-01', '2023-02-01'), ('2023-02-01', '2023-03-01'), ('2023-03-01', '2023-04-01')]
+
+def test_tiered_source_unions_archive_and_database(tmp_path):
+    """Baris sebelum archived_until dari arsip, sisanya dari database; tidak ada duplikat."""
+    movements = make_dataset(tmp_path / 'db')
+    # Arsip Januari-Maret (mode 'keep': baris yang sama masih ada di "database")
+    archive = tmp_path / 'archive'
+    (archive / 'stock_movements').mkdir(parents=True)
+    movements.iloc[:3].to_parquet(archive / 'stock_movements' / '2023-01.parquet', index=False)
+    write_manifest(archive, {'stock_movements': {
+        'date_column': 'movement_date', 'archived_until': '2023-04-01T00:00:00+00:00', 'rows': 3, 'parts': []}})
+    source = TieredSource(ParquetSource(tmp_path / 'db'), archive)
+
+    assert list(source.read_table('stock_movements')['movement_id']) == [1, 2, 3, 4, 5, 6]
+    recent = source.read_table('stock_movements', [('movement_date', '>', '2023-02-15 00:00:00')])
+    assert list(recent['movement_id']) == [3, 4, 5, 6]
+    # Tabel lain langsung dari database
+    assert len(source.read_table('products')) == 2
+
+def test_source_without_read_table_fails_on_construction():
+    """Sumber yang tidak mengimplementasikan read_table ditolak saat dibuat, bukan di tengah extract."""
+    class IncompleteSource(DataSource):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteSource()
+
+def test_average_inventory_window_excludes_future_movements(tmp_path):
+    """Rentang snapshot rata-rata inventori mengikuti movements yang lolos DQ, tanpa tanggal masa depan."""
+    class SnapshotSource(ParquetSource):
+        def call_function(self, function_name, *args):
+            self.calls.append((function_name, *args))
+            return pd.DataFrame({'product_id': [1], 'warehouse_id': [1], 'avg_quantity': [5.0]})
+
+    movements = make_dataset(tmp_path)
+    future = movements.iloc[[0]].assign(movement_id=7, movement_date=pd.Timestamp.now(tz='UTC') + pd.Timedelta(days=30))
+    future.to_parquet(tmp_path / 'stock_movements' / 'part-00002.parquet', index=False)
+    extractor = DataExtractor(None, {'type': 'parquet', 'path': str(tmp_path)})
+    extractor.source = SnapshotSource(tmp_path)
+    extractor.source.calls = []
+
+    raw = extractor.extract_full()
+    assert raw['stock_movements']['movement_id'].max() == 7
+    expected = ('average_stock_quantity', pd.Timestamp('2023-01-01').date(), pd.Timestamp('2023-06-01').date())
+    extractor.extract_average_inventory(raw['stock_movements'])
+    clean = extractor.handle_data_quality_issues(raw)
+    assert extractor.extract_average_inventory(clean['stock_movements']) is not None
+    assert extractor.source.calls == [expected, expected]
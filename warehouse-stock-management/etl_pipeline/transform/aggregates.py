@@ -0,0 +1,123 @@
+"""
+Agregat parsial TRANSFORM yang bisa digabung (merge) antar potongan data.
+
+Metrik di transform/* dihitung dari sedikit agregat movements, penjualan dan
+PO. Agregat ini bisa dihitung per potongan data (misal batch movement baru)
+lalu digabung tanpa menyimpan baris mentahnya:
+
+    out_daily      jumlah movement OUT per hari            -> SUM
+    last_movement  movement terakhir per (produk, gudang)  -> MAX
+    io_counts      jumlah movement per (gudang, tipe)      -> SUM
+    transfers      baris movement TRANSFER                 -> CONCAT (dipasangkan saat finalize)
+    first/last     rentang tanggal movements               -> MIN / MAX
+    qty_sold       total kuantitas terjual                 -> SUM
+    revenue        revenue per produk                      -> SUM
+    po_totals      kuantitas & biaya PO per produk         -> SUM
+
+`finalize` menghasilkan tabel analitik yang sama dengan run_transform di
+main.py (fungsi *_from_aggregates di setiap modul transform), dengan data
+"keadaan saat ini" (stok, master, product_cost, dead_stock/average_inventory
+dari database) diambil dari `data_frames`. Satu-satunya perbedaan dengan
+menghitung dari seluruh baris adalah urutan penjumlahan float (revenue &
+biaya PO), sehingga nilai bisa berbeda di digit terakhir.
+"""
+import logging
+
+import pandas as pd
+
+from .financial_metrics import financial_metrics_from_aggregates, po_cost_totals, product_revenue
+from .inventory_metrics import inventory_metrics_from_aggregates, last_movement_dates
+from .movement_analytics import daily_out_counts, movement_analytics_from_daily
+from .warehouse_performance import movement_io_counts, transfer_movements, warehouse_performance_from_aggregates
+
+log = logging.getLogger(__name__)
+
+
+def _concat(parts, **kwargs):
+    """
+    Concat bagian yang tidak kosong: bagian kosong (batch tanpa baris baru) bisa
+    bertipe lain (misal tanggal tanpa zona waktu) dan mengubah tipe hasil concat.
+    """
+    non_empty = [part for part in parts if part is not None and len(part)]
+    if not non_empty:
+        return next((part for part in parts if part is not None), None)
+    return non_empty[0] if len(non_empty) == 1 else pd.concat(non_empty, **kwargs)
+
+
+def _combine_by_index(parts, how):
+    """Menggabungkan Series/DataFrame per index (urut) dengan `how` ('sum'/'max'); tipe integer tetap."""
+    if sum(part is not None and len(part) > 0 for part in parts) < 2:
+        return _concat(parts)
+    combined = _concat(parts)
+    return combined.groupby(level=list(range(combined.index.nlevels))).agg(how)
+
+
+class TransformAggregates:
+    def __init__(self, out_daily, last_movement, io_counts, transfers, first_date, last_date,
+                 qty_sold, revenue, po_totals=None, movements=0):
+        self.out_daily = out_daily
+        self.last_movement = last_movement
+        self.io_counts = io_counts
+        self.transfers = transfers
+        self.first_date = first_date
+        self.last_date = last_date
+        self.qty_sold = qty_sold
+        self.revenue = revenue
+        self.po_totals = po_totals
+        self.movements = movements
+
+    @classmethod
+    def from_frames(cls, data_frames):
+        """
+        Agregat dari `data_frames` (setelah handle_data_quality_issues): stock_movements,
+        sales_order_details dan (opsional) purchase_order_details.
+        """
+        df_movements = data_frames['stock_movements']
+        df_movements['movement_date'] = pd.to_datetime(df_movements['movement_date'])
+        df_so_details = data_frames['sales_order_details']
+        po_totals = None
+        if 'purchase_order_details' in data_frames:
+            po_totals = po_cost_totals(data_frames['purchase_order_details'])
+        return cls(
+            out_daily=daily_out_counts(df_movements),
+            last_movement=last_movement_dates(df_movements),
+            io_counts=movement_io_counts(df_movements),
+            # Salinan: tidak menahan seluruh DataFrame movements di memori
+            transfers=transfer_movements(df_movements).copy(),
+            first_date=df_movements['movement_date'].min(),
+            last_date=df_movements['movement_date'].max(),
+            qty_sold=df_so_details['quantity'].sum(),
+            revenue=product_revenue(df_so_details),
+            po_totals=po_totals,
+            movements=len(df_movements),
+        )
+
+    def merge(self, other):
+        """Agregat gabungan `self` dan `other` (objek baru; keduanya tidak diubah)."""
+        dates = [d for d in (self.first_date, self.last_date, other.first_date, other.last_date) if pd.notna(d)]
+        return TransformAggregates(
+            out_daily=_combine_by_index([self.out_daily, other.out_daily], 'sum'),
+            last_movement=_combine_by_index([self.last_movement, other.last_movement], 'max'),
+            io_counts=_combine_by_index([self.io_counts, other.io_counts], 'sum'),
+            transfers=_concat([self.transfers, other.transfers], ignore_index=True),
+            first_date=min(dates, default=pd.NaT),
+            last_date=max(dates, default=pd.NaT),
+            qty_sold=self.qty_sold + other.qty_sold,
+            revenue=_combine_by_index([self.revenue, other.revenue], 'sum'),
+            po_totals=_combine_by_index([self.po_totals, other.po_totals], 'sum'),
+            movements=self.movements + other.movements,
+        )
+
+    def finalize(self, data_frames, dead_stock_days, abc_config):
+        """
+        Tabel analitik (kunci sama dengan hasil run_transform) dari agregat ini dan
+        `data_frames` keadaan saat ini (stock, products, ...). `data_frames` tidak diubah.
+        """
+        data = dict(data_frames)
+        last_movement = None if 'dead_stock' in data else self.last_movement
+        data = inventory_metrics_from_aggregates(data, last_movement, self.qty_sold,
+                                                 self.first_date, self.last_date, dead_stock_days)
+        data = movement_analytics_from_daily(data, self.out_daily)
+        data = financial_metrics_from_aggregates(data, self.revenue, abc_config, self.po_totals)
+        data = warehouse_performance_from_aggregates(data, self.transfers, self.io_counts)
+        return data
@@ -4,23 +4,47 @@ import numpy as np
 
 log = logging.getLogger(__name__)
 
+def product_revenue(df_so_details):
+    """
+    Revenue per produk (Series, index product_id); juga menambah kolom 'revenue'
+    di `df_so_details`. Hasil dari potongan data digabung dengan SUM.
+    """
+    df_so_details['revenue'] = df_so_details['quantity'] * df_so_details['unit_price']
+    return df_so_details.groupby('product_id')['revenue'].sum()
+
+def po_cost_totals(df_po_details):
+    """Total kuantitas & biaya (qty * harga) PO per produk; digabung dengan SUM."""
+    return df_po_details.assign(
+        cost=df_po_details['quantity'] * df_po_details['unit_price']
+    ).groupby('product_id')[['quantity', 'cost']].sum()
+
 def calculate_financial_metrics(data_frames, abc_config):
     """
     Menghitung metrik finansial[cite: 168].
     """
     log.info("Menghitung metrik finansial...")
-    
-    df_so_details = data_frames['sales_order_details']
+
+    # Hitung revenue per produk (untuk ABC Analysis)
+    revenue = product_revenue(data_frames['sales_order_details'])
+    # Total biaya PO hanya dibutuhkan jika tabel product_cost tidak tersedia
+    po_totals = None
+    if 'product_cost' not in data_frames and 'purchase_order_details' in data_frames:
+        po_totals = po_cost_totals(data_frames['purchase_order_details'])
+    return financial_metrics_from_aggregates(data_frames, revenue, abc_config, po_totals)
+
+def financial_metrics_from_aggregates(data_frames, revenue, abc_config, po_totals=None):
+    """
+    Metrik finansial dari agregat penjualan & PO: `revenue` (hasil product_revenue)
+    dan `po_totals` (hasil po_cost_totals, dipakai jika tidak ada 'product_cost').
+    Dipakai juga oleh daemon micro-batch (serve.py).
+    """
     df_stock = data_frames['stock']
-    df_products = data_frames['products']
     
     # 1. ABC Analysis (Pareto) [cite: 175]
     # Berdasarkan volume penjualan (revenue)
     log.info("  -> Menghitung ABC Analysis...")
     
-    # Hitung revenue per produk
-    df_so_details['revenue'] = df_so_details['quantity'] * df_so_details['unit_price']
-    product_revenue = df_so_details.groupby('product_id')['revenue'].sum().sort_values(ascending=False).reset_index()
+    product_revenue = revenue.sort_values(ascending=False).reset_index()
     
     # Hitung cumulative percentage
     product_revenue['total_revenue'] = product_revenue['revenue'].sum()
@@ -50,16 +74,16 @@ def calculate_financial_metrics(data_frames, abc_config):
     
     log.info("  -> Menghitung nilai inventori saat ini...")
     
-    # Asumsikan kita perlu mengambil data PO
-    if 'purchase_order_details' not in data_frames:
+    # Biaya rata-rata per produk: dari tabel `product_cost` (dipelihara trigger
+    # database saat PO selesai) jika ada, jika tidak dihitung dari detail PO
+    if 'product_cost' in data_frames:
+        product_avg_cost = data_frames['product_cost'][['product_id', 'avg_cost']].astype({'avg_cost': float})
+    elif po_totals is None:
         log.warning("Data PO tidak ada, nilai inventori tidak dapat dihitung akurat.")
         product_avg_cost = pd.DataFrame(columns=['product_id', 'avg_cost'])
     else:
-        df_po_details = data_frames['purchase_order_details']
-        # Hitung biaya rata-rata per produk
-        product_avg_cost = df_po_details.groupby('product_id').apply(
-            lambda x: np.average(x['unit_price'], weights=x['quantity'])
-        ).reset_index(name='avg_cost')
+        # Rata-rata tertimbang = SUM(qty * harga) / SUM(qty), satu groupby tanpa apply per grup
+        product_avg_cost = (po_totals['cost'] / po_totals['quantity']).replace([np.inf, -np.inf], np.nan).reset_index(name='avg_cost')
 
     # Gabung biaya rata-rata dengan stok saat ini
     df_stock_value = pd.merge(df_stock, product_avg_cost, on='product_id', how='left')
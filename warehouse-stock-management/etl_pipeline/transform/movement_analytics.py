@@ -3,25 +3,36 @@ import logging
 
 log = logging.getLogger(__name__)
 
+def daily_out_counts(df_movements):
+    """
+    Jumlah movement OUT per hari (UTC), Series ber-index 'movement_date'. Hasil dari
+    potongan data yang berbeda digabung dengan SUM (lihat transform/aggregates.py).
+    """
+    df_out = df_movements.loc[df_movements['movement_type'] == 'OUT', ['movement_date', 'quantity']]
+    df_out = df_out.assign(movement_date=pd.to_datetime(df_out['movement_date'])).set_index('movement_date')
+    return df_out.resample('D')['quantity'].count()
+
 def calculate_movement_analytics(data_frames):
     """
     Menghitung analitik pergerakan stok[cite: 154].
     """
     log.info("Menghitung analitik pergerakan...")
     
-    df_movements = data_frames['stock_movements'].copy()
-    
-    # Pastikan 'movement_date' adalah datetime
-    df_movements['movement_date'] = pd.to_datetime(df_movements['movement_date'])
-    df_movements = df_movements.set_index('movement_date')
-
     # 1. Movement Trends (Daily, Weekly, Monthly) [cite: 158]
     # Kita hitung jumlah pergerakan (IN/OUT)
-    df_out = df_movements[df_movements['movement_type'] == 'OUT']
-    
-    daily_trends = df_out.resample('D')['quantity'].count().reset_index(name='daily_movements')
-    weekly_trends = df_out.resample('W')['quantity'].count().reset_index(name='weekly_movements')
-    monthly_trends = df_out.resample('ME')['quantity'].count().reset_index(name='monthly_movements')
+    return movement_analytics_from_daily(data_frames, daily_out_counts(data_frames['stock_movements']))
+
+def movement_analytics_from_daily(data_frames, daily_counts):
+    """
+    Tren & periode puncak dari jumlah movement OUT harian (hasil daily_out_counts).
+    Tren mingguan/bulanan adalah jumlah dari tren harian, sama dengan menghitung
+    ulang dari baris movements.
+    """
+    # Hari tanpa movement OUT bernilai 0 (hasil gabungan potongan data bisa bolong)
+    daily_counts = daily_counts.resample('D').sum()
+    daily_trends = daily_counts.reset_index(name='daily_movements')
+    weekly_trends = daily_counts.resample('W').sum().reset_index(name='weekly_movements')
+    monthly_trends = daily_counts.resample('ME').sum().reset_index(name='monthly_movements')
     
     # 2. Peak Periods Identification [cite: 157]
     # Kita cari hari dalam seminggu (Day of Week) yang paling sibuk
@@ -0,0 +1,128 @@
+"""
+TRANSFORM map-reduce per gudang di beberapa proses (`transform.workers` > 1).
+
+  1. shard  : stock_movements & sales_order_details dipecah per warehouse_id ke
+              `workers` shard (gudang dibagi ke shard dengan jumlah baris paling
+              sedikit), hanya kolom yang dibutuhkan, ditulis sebagai file Arrow IPC
+              tanpa kompresi di /dev/shm (memori bersama; fallback direktori temp).
+  2. map    : process pool (maksimal sebanyak CPU yang tersedia, context yang
+              sama dengan render chart); worker me-memory-map file shard dan
+              menghitung TransformAggregates (transform/aggregates.py). DataFrame
+              shard tidak pernah di-pickle; yang dikirim balik hanya agregat parsial.
+  3. reduce : proses utama menggabungkan agregat parsial dan menghitung tabel
+              analitik (TransformAggregates.finalize). Metrik yang tidak bisa
+              dihitung per gudang dikerjakan global di sini: ABC dari revenue per
+              produk gabungan semua gudang dan pasangan transfer antar gudang (baris
+              TRANSFER dari semua shard). Stok (satu baris per produk & gudang) dan
+              detail PO (tanpa warehouse_id) tidak dikirim ke worker.
+
+Hasilnya sama dengan run_transform satu proses; nilai float hasil penjumlahan
+(revenue, biaya PO) bisa berbeda di digit terakhir karena urutan penjumlahan.
+"""
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+from instrumentation import span
+from load.chart_renderer import available_cpus, get_mp_context
+
+from .aggregates import TransformAggregates
+from .financial_metrics import po_cost_totals
+
+log = logging.getLogger(__name__)
+
+# Tabel yang di-shard per gudang -> kolom yang dibutuhkan TransformAggregates.from_frames
+SHARDED_COLUMNS = {
+    'stock_movements': ['product_id', 'warehouse_id', 'movement_type', 'quantity', 'reference_id', 'movement_date'],
+    'sales_order_details': ['product_id', 'warehouse_id', 'quantity', 'unit_price'],
+}
+SHARED_MEMORY_DIR = Path('/dev/shm')
+
+
+def assign_shards(rows_per_warehouse, shards):
+    """
+    {warehouse_id: shard}: gudang terbesar lebih dulu, masing-masing ke shard
+    dengan total baris paling sedikit (shard tanpa gudang tidak dibuat).
+    """
+    load = [0] * min(shards, len(rows_per_warehouse))
+    assignment = {}
+    for warehouse_id, rows in rows_per_warehouse.sort_values(ascending=False, kind='stable').items():
+        shard = load.index(min(load))
+        assignment[warehouse_id] = shard
+        load[shard] += rows
+    return assignment
+
+
+def write_shards(data_frames, assignment, directory):
+    """Menulis setiap tabel ter-shard ke `<directory>/<shard>/<tabel>.arrow`; mengembalikan path per shard."""
+    shards = max(assignment.values()) + 1
+    paths = [{} for _ in range(shards)]
+    for table, columns in SHARDED_COLUMNS.items():
+        df = data_frames[table]
+        shard_ids = df['warehouse_id'].map(assignment).fillna(0).to_numpy(dtype=np.int64)
+        # Satu take() mengurutkan baris per shard (urutan asli dalam shard dipertahankan),
+        # lalu setiap shard adalah slice tanpa salinan
+        order = np.argsort(shard_ids, kind='stable')
+        bounds = np.searchsorted(shard_ids[order], np.arange(shards + 1))
+        table_sorted = pa.Table.from_pandas(df[columns], preserve_index=False).take(order)
+        for shard in range(shards):
+            path = Path(directory) / str(shard) / f"{table}.arrow"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            part = table_sorted.slice(bounds[shard], bounds[shard + 1] - bounds[shard])
+            with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, part.schema) as writer:
+                writer.write_table(part)
+            paths[shard][table] = path
+    return paths
+
+
+def map_shard(paths):
+    """Worker: agregat parsial satu shard dari file Arrow IPC (memory map)."""
+    frames = {}
+    for table, path in paths.items():
+        with pa.memory_map(str(path)) as source:
+            frames[table] = pa.ipc.open_file(source).read_all().to_pandas()
+    start = time.perf_counter()
+    aggregates = TransformAggregates.from_frames(frames)
+    return aggregates, time.perf_counter() - start
+
+
+def _shard_root():
+    return str(SHARED_MEMORY_DIR) if SHARED_MEMORY_DIR.is_dir() and os.access(SHARED_MEMORY_DIR, os.W_OK) else None
+
+
+def sharded_transform(data_frames, dead_stock_days, abc_config, workers):
+    """
+    Tabel analitik seperti run_transform (calculate_* berurutan), dihitung map-reduce
+    per gudang dengan `workers` proses. `data_frames` = hasil EXTRACT (setelah DQ).
+    """
+    rows_per_warehouse = data_frames['stock_movements']['warehouse_id'].value_counts()
+    assignment = assign_shards(rows_per_warehouse, workers)
+    shards = max(assignment.values()) + 1
+    # Seperti render_charts: proses melebihi CPU hanya menambah overhead start-up
+    processes = min(shards, available_cpus())
+    log.info(f"TRANSFORM map-reduce: {len(assignment)} gudang dalam {shards} shard, {processes} proses.")
+
+    with tempfile.TemporaryDirectory(prefix='etl-shards-', dir=_shard_root()) as directory:
+        with span('transform.shard', rows_in=sum(len(data_frames[t]) for t in SHARDED_COLUMNS), shards=shards) as s:
+            paths = write_shards(data_frames, assignment, directory)
+            s.details['bytes'] = sum(path.stat().st_size for shard in paths for path in shard.values())
+
+        with span('transform.map', shards=shards, processes=processes) as s:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=get_mp_context()) as pool:
+                results = list(pool.map(map_shard, paths))
+            s.details['worker_seconds'] = [round(seconds, 3) for _, seconds in results]
+
+    with span('transform.reduce', shards=shards):
+        aggregates = results[0][0]
+        for partial, _ in results[1:]:
+            aggregates = aggregates.merge(partial)
+        # Detail PO tidak memiliki warehouse_id: dijumlahkan sekali di proses utama
+        if 'product_cost' not in data_frames and 'purchase_order_details' in data_frames:
+            aggregates.po_totals = po_cost_totals(data_frames['purchase_order_details'])
+        return aggregates.finalize(data_frames, dead_stock_days, abc_config)
@@ -1,8 +1,23 @@
 import pandas as pd
 import logging
+from .inventory_metrics import calculate_inventory_metrics
+from .financial_metrics import calculate_financial_metrics
 
 log = logging.getLogger(__name__)
 
+def transfer_movements(df_movements):
+    """
+    Baris movement TRANSFER (kolom yang dibutuhkan analisis pola transfer). Kedua
+    sisi transfer (keluar & masuk) bisa berada di gudang/potongan data berbeda,
+    sehingga baris ini digabung (concat) dulu sebelum dipasangkan.
+    """
+    return df_movements.loc[df_movements['movement_type'] == 'TRANSFER',
+                            ['reference_id', 'warehouse_id', 'product_id', 'quantity']]
+
+def movement_io_counts(df_movements):
+    """Jumlah movement per (gudang, tipe movement); digabung dengan SUM."""
+    return df_movements.groupby(['warehouse_id', 'movement_type'])['quantity'].count()
+
 def calculate_warehouse_performance(data_frames):
     """
     Menghitung metrik kinerja gudang[cite: 160].
@@ -10,18 +25,24 @@ def calculate_warehouse_performance(data_frames):
     log.info("Menghitung kinerja gudang...")
     
     df_movements = data_frames['stock_movements']
-    
+    return warehouse_performance_from_aggregates(data_frames, transfer_movements(df_movements),
+                                                 movement_io_counts(df_movements))
+
+def warehouse_performance_from_aggregates(data_frames, df_transfers, io_counts):
+    """
+    Kinerja gudang dari baris transfer (hasil transfer_movements) dan jumlah
+    movement per gudang & tipe (hasil movement_io_counts). Dipakai juga oleh
+    daemon micro-batch (serve.py).
+    """
     # 1. Transfer Patterns Between Warehouses [cite: 166]
     log.info("  -> Menganalisis pola transfer...")
     
-    df_transfers = df_movements[df_movements['movement_type'] == 'TRANSFER'].copy()
-    
     # Pisahkan IN dan OUT
     transfers_out = df_transfers[df_transfers['quantity'] < 0][['reference_id', 'warehouse_id', 'product_id', 'quantity']]
-    transfers_out.rename(columns={'warehouse_id': 'from_warehouse_id', 'quantity': 'qty_out'}, inplace=True)
+    transfers_out = transfers_out.rename(columns={'warehouse_id': 'from_warehouse_id', 'quantity': 'qty_out'})
     
     transfers_in = df_transfers[df_transfers['quantity'] > 0][['reference_id', 'warehouse_id', 'product_id', 'quantity']]
-    transfers_in.rename(columns={'warehouse_id': 'to_warehouse_id', 'quantity': 'qty_in'}, inplace=True)
+    transfers_in = transfers_in.rename(columns={'warehouse_id': 'to_warehouse_id', 'quantity': 'qty_in'})
     
     # Gabungkan berdasarkan reference_id
     # Kita asumsikan reference_id unik per transfer
@@ -38,11 +59,52 @@ def calculate_warehouse_performance(data_frames):
 
     # 2. In/Out Efficiency [cite: 164]
     # Kita definisikan sebagai total pergerakan IN vs OUT per gudang
-    warehouse_io = df_movements.groupby(['warehouse_id', 'movement_type'])['quantity'].count().unstack(fill_value=0)
+    warehouse_io = io_counts.unstack(fill_value=0)
     
     
     # Simpan hasil kalkulasi
     data_frames['transfer_patterns'] = transfer_patterns
     data_frames['warehouse_io_summary'] = warehouse_io
     
-    return data_frames
\ No newline at end of file
+    return data_frames
+
+def calculate_warehouse_views(data_frames, dead_stock_days=180, abc_config=None):
+    """
+    Menghitung metrik inventori & finansial untuk setiap gudang secara terpisah
+    (dipakai untuk laporan per gudang). Data PO tetap global karena biaya
+    rata-rata produk tidak bergantung pada gudang.
+    """
+    log.info("Menghitung metrik per gudang...")
+    abc_config = abc_config or {'A_percent': 0.8, 'B_percent': 0.15, 'C_percent': 0.05}
+
+    stock_by_wh = dict(tuple(data_frames['stock'].groupby('warehouse_id')))
+    movements_by_wh = dict(tuple(data_frames['stock_movements'].groupby('warehouse_id')))
+    so_by_wh = dict(tuple(data_frames['sales_order_details'].groupby('warehouse_id')))
+
+    views = {}
+    for wh_id, df_stock in stock_by_wh.items():
+        if wh_id not in movements_by_wh:
+            log.warning(f"  -> Gudang {wh_id} tidak memiliki pergerakan. Dilewati.")
+            continue
+
+        view = {
+            'stock': df_stock.copy(),
+            'stock_movements': movements_by_wh[wh_id].copy(),
+            'sales_order_details': so_by_wh.get(wh_id, data_frames['sales_order_details'].iloc[0:0]).copy(),
+            'products': data_frames['products'],
+        }
+        for cost_table in ('product_cost', 'purchase_order_details'):
+            if cost_table in data_frames:
+                view[cost_table] = data_frames[cost_table]
+        if 'dead_stock' in data_frames:
+            view['dead_stock'] = data_frames['dead_stock'][data_frames['dead_stock']['warehouse_id'] == wh_id]
+        if 'average_inventory' in data_frames:
+            view['average_inventory'] = data_frames['average_inventory'][
+                data_frames['average_inventory']['warehouse_id'] == wh_id]
+
+        view = calculate_inventory_metrics(view, dead_stock_days)
+        view = calculate_financial_metrics(view, abc_config)
+        views[int(wh_id)] = view
+
+    log.info(f"Metrik per gudang selesai untuk {len(views)} gudang.")
+    return views